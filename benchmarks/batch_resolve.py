@@ -0,0 +1,77 @@
+"""
+Compare resolving symbols with one batch request against one request per symbol.
+
+This requires a migrated database configured via SAGE_DATABASE_BIND, with an ingested package to
+resolve symbols of. Requests are sent to the app in-process, so no network round trips are
+measured, only the work done per request.
+Usage: `python benchmarks/batch_resolve.py PACKAGE [COUNT ...]`
+"""
+
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+import httpx
+
+from sage.app import app
+from sage.core.database.crud import symbols as crud_symbols
+from sage.core.dependencies.database import SessionLocal
+from sage.core.inventory.index import get_symbol_indexes
+
+
+DEFAULT_COUNTS = (1, 20, 50, 100)
+REPEATS = 50
+
+
+async def time_singles(client: httpx.AsyncClient, package: str, names: list[str]) -> float:
+    """Resolve the names with one request each, returning the seconds taken."""
+    start = time.perf_counter()
+    for name in names:
+        response = await client.get(f"/api/docs/packages/{package}/symbols/{name}")
+        response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def time_batch(client: httpx.AsyncClient, package: str, names: list[str]) -> float:
+    """Resolve the names with one batch request, returning the seconds taken."""
+    body = {"symbols": [{"package": package, "name": name} for name in names]}
+    start = time.perf_counter()
+    response = await client.post("/api/docs/symbols/resolve", json=body)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def main(package: str, counts: list[int]) -> None:
+    """Run the benchmark."""
+    indexes = get_symbol_indexes()
+    async with SessionLocal() as db:  # type: ignore
+        version = await indexes.default_source(db, package)
+        if version is None or version.generation is None:
+            raise SystemExit(f"Package {package} does not exist or has no symbols.")
+        async with db.begin():
+            entries = await crud_symbols.get_symbols(db, version.source_id, version.generation)
+    # the index is used by both methods, so build it before measuring
+    await indexes.build(version)
+    # names which are not url safe would need quoting for the single lookups
+    names = [entry.name for entry in entries if entry.name.isidentifier() or "." in entry.name]
+
+    header = f"{'symbols':>8} {'method':>8} {'p50 ms':>8} {'p99 ms':>8}"
+    print(header)  # noqa: T201
+    async with httpx.AsyncClient(app=app, base_url="http://sage") as client:
+        for count in counts:
+            for method, measure in (("single", time_singles), ("batch", time_batch)):
+                timings = [
+                    await measure(client, package, random.sample(names, count)) * 1000
+                    for _ in range(REPEATS)
+                ]
+                quantiles = statistics.quantiles(timings, n=100, method="inclusive")
+                row = f"{count:>8} {method:>8} {quantiles[49]:>8.2f} {quantiles[98]:>8.2f}"
+                print(row)  # noqa: T201
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        raise SystemExit(__doc__)
+    asyncio.run(main(sys.argv[1], [int(count) for count in sys.argv[2:]] or list(DEFAULT_COUNTS)))
@@ -0,0 +1,96 @@
+"""
+Measure how many bytes each inventory entry costs in memory, in each of its representations.
+
+Entries are generated to look like those of real inventories: most are python objects using the
+`$` shorthand on a shared page, and some are labels with their own anchor and display name.
+No database is needed, but the settings must still be configured via the environment.
+Usage: `python benchmarks/entry_memory.py [SIZE ...]`
+"""
+
+import gc
+import sys
+import tracemalloc
+from typing import Any, Callable
+
+from sage.core.inventory import InventoryEntry
+from sage.core.inventory.columns import EntryColumns
+from sage.core.inventory.index import SourceVersion, SymbolIndex
+
+
+DEFAULT_SIZES = (100_000, 1_000_000)
+
+
+def generate_entries(count: int) -> list[InventoryEntry]:
+    """Generate realistic looking inventory entries."""
+    entries = []
+    for i in range(count):
+        if i % 20 == 0:
+            entries.append(
+                InventoryEntry(
+                    name=f"guide-section-{i}",
+                    domain="std",
+                    role="label",
+                    priority=-1,
+                    uri=f"guide/page{i % 50}.html#section-{i}",
+                    display_name=f"Guide Section {i}",
+                )
+            )
+            continue
+        entries.append(
+            InventoryEntry(
+                name=f"package.module{i % 200}.Class{i // 10}.method{i % 10}",
+                domain="py",
+                role="method" if i % 10 else "class",
+                priority=1,
+                uri=f"api/module{i % 200}.html#$",
+                display_name=None,
+            )
+        )
+    return entries
+
+
+def as_dicts(entries: list[InventoryEntry]) -> list[dict[str, Any]]:
+    """Convert entries to dicts shaped like those of `DocSymbol.to_dict`."""
+    return [entry._asdict() for entry in entries]
+
+
+def as_index(entries: list[InventoryEntry]) -> SymbolIndex:
+    """Build the in-process index used for lookups and completion."""
+    version = SourceVersion(source_id=1, generation=1, refreshed_at=None, base_url="")
+    return SymbolIndex(version, entries)
+
+
+REPRESENTATIONS: dict[str, Callable[[list[InventoryEntry]], Any]] = {
+    "tuples": lambda entries: entries,
+    "dicts": as_dicts,
+    "columns": EntryColumns,
+    "index": as_index,
+}
+
+
+def measure(size: int, convert: Callable[[list[InventoryEntry]], Any]) -> int:
+    """Get the bytes retained by converting freshly generated entries."""
+    gc.collect()
+    tracemalloc.start()
+    # every representation is built from new strings, as they would be when read from a database
+    result = convert(generate_entries(size))
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return retained
+
+
+def main(sizes: list[int]) -> None:
+    """Run the benchmark."""
+    header = f"{'entries':>9} {'representation':>15} {'MiB':>9} {'bytes/entry':>12}"
+    print(header)  # noqa: T201
+    for size in sizes:
+        for name, convert in REPRESENTATIONS.items():
+            retained = measure(size, convert)
+            row = f"{size:>9} {name:>15} {retained / 2**20:>9.1f} {retained / size:>12.1f}"
+            print(row)  # noqa: T201
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or list(DEFAULT_SIZES))
@@ -0,0 +1,149 @@
+"""
+Compare the throughput of listing packages with their sources, from ORM models and from columns.
+
+This requires a migrated database configured via SAGE_DATABASE_BIND, and creates (then deletes)
+throwaway packages with two sources each to list. The ORM method is how the listing used to be
+rendered, and the endpoint method sends `/api/docs/packages?with_sources=true` requests to the app
+in-process with the response cache disabled.
+Usage: `python benchmarks/package_listing.py [PAGE SIZE ...]`
+"""
+
+import asyncio
+import sys
+import time
+from typing import Awaitable, Callable
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from starlette.responses import JSONResponse
+
+from sage.app import app
+from sage.cache import ResponseCache, get_response_cache
+from sage.core.database import models
+from sage.core.database.crud import docs as crud_docs
+from sage.core.dependencies.database import SessionLocal
+from sage.database import engine
+from sage.enums import LanguageCode, ProgrammingLanguage
+from sage.responses import render_json
+from sage.settings import CacheSettings
+
+
+DEFAULT_PAGE_SIZES = (100, 1000)
+PACKAGES = 1000
+SECONDS = 3.0
+NAME_PREFIX = "benchmark-listing-"
+
+
+async def render_orm(db: AsyncSession, limit: int) -> bytes:
+    """Load a page of models with their sources, and render their dicts with FastAPI's encoder."""
+    stmt = (
+        select(models.DocPackage)
+        .where(models.DocPackage.name.startswith(NAME_PREFIX))
+        .order_by(models.DocPackage.id)
+        .limit(limit)
+        .options(selectinload(models.DocPackage.sources))
+    )
+    packages = [package.to_dict(include_sources=True) for package in await db.scalars(stmt)]
+    return JSONResponse(jsonable_encoder(packages)).body
+
+
+async def render_columns(db: AsyncSession, limit: int) -> bytes:
+    """Read a page of the columns of packages and sources as rows, and render them with orjson."""
+    packages = await crud_docs.get_all_doc_packages(
+        db, with_sources=True, limit=limit, name_prefix=NAME_PREFIX
+    )
+    return render_json(packages)
+
+
+async def create_packages() -> None:
+    """Create the packages to list, with two sources each."""
+    async with SessionLocal() as db:  # type: ignore
+        async with db.begin():
+            packages = [
+                {
+                    "name": f"{NAME_PREFIX}{i}",
+                    "homepage": f"https://example.com/{i}",
+                    "programming_language": ProgrammingLanguage.python,
+                }
+                for i in range(PACKAGES)
+            ]
+            package_ids = (
+                await db.scalars(
+                    insert(models.DocPackage).values(packages).returning(models.DocPackage.id)
+                )
+            ).all()
+            await db.execute(
+                insert(models.DocSource),
+                [
+                    {
+                        "package_id": package_id,
+                        "default": language_code is LanguageCode.en_US,
+                        "inventory_url": f"https://example.com/{package_id}/objects.inv",
+                        "human_friendly_url": f"https://example.com/{package_id}",
+                        "version": "1.0.0",
+                        "language_code": language_code,
+                    }
+                    for package_id in package_ids
+                    for language_code in (LanguageCode.en_US, LanguageCode.de)
+                ],
+            )
+            await db.commit()
+
+
+async def main(page_sizes: list[int]) -> None:
+    """Run the benchmark."""
+    await create_packages()
+    app.dependency_overrides[get_response_cache] = lambda: ResponseCache(
+        CacheSettings(max_entries=0)
+    )
+    client = httpx.AsyncClient(app=app, base_url="http://sage")
+
+    def render_with(method: Callable[[AsyncSession, int], Awaitable[bytes]]) -> Callable:
+        async def render(limit: int) -> None:
+            async with SessionLocal() as db:  # type: ignore
+                async with db.begin():
+                    await method(db, limit)
+
+        return render
+
+    async def request(limit: int) -> None:
+        params = {"with_sources": "true", "limit": limit, "name_prefix": NAME_PREFIX}
+        response = await client.get("/api/docs/packages", params=params)
+        response.raise_for_status()
+
+    methods: dict[str, Callable[[int], Awaitable[None]]] = {
+        "orm": render_with(render_orm),
+        "columns": render_with(render_columns),
+        "endpoint": request,
+    }
+    print(f"{'page size':>9} {'method':>9} {'pages/s':>9} {'ms/page':>9}")  # noqa: T201
+    try:
+        for limit in page_sizes:
+            for name, method in methods.items():
+                # warm up the connection pool and statement caches
+                await method(limit)
+                pages = 0
+                start = time.perf_counter()
+                while (elapsed := time.perf_counter() - start) < SECONDS:
+                    await method(limit)
+                    pages += 1
+                row = f"{limit:>9} {name:>9} {pages / elapsed:>9.1f} {elapsed / pages * 1000:>9.2f}"
+                print(row)  # noqa: T201
+    finally:
+        await client.aclose()
+        async with SessionLocal() as db:  # type: ignore
+            async with db.begin():
+                await db.execute(
+                    delete(models.DocPackage)
+                    .where(models.DocPackage.name.startswith(NAME_PREFIX))
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main([int(size) for size in sys.argv[1:]] or list(DEFAULT_PAGE_SIZES)))
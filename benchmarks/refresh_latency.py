@@ -0,0 +1,97 @@
+"""
+Measure api latency while an inventory is parsed, with each parse mode.
+
+A synthetic inventory is parsed by the parse executor while requests are continuously sent to the
+metadata endpoint, and the latency percentiles of those requests are reported. No database is
+needed, but the settings must still be configured via the environment.
+Usage: `python benchmarks/refresh_latency.py [ENTRIES]`
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+import zlib
+
+import httpx
+
+from sage.app import app
+from sage.core.inventory.executor import ParseExecutor
+from sage.enums import ParseMode
+
+
+DEFAULT_ENTRIES = 200_000
+# how many times the inventory is parsed per mode, so enough requests are measured
+ROUNDS = 3
+# seconds between requests
+PROBE_INTERVAL = 0.002
+
+
+def make_inventory(count: int) -> bytes:
+    """Build a compressed v2 inventory with realistic looking entries."""
+    header = (
+        "# Sphinx inventory version 2\n"
+        "# Project: benchmark\n"
+        "# Version: 1.0\n"
+        "# The remainder of this file is compressed using zlib.\n"
+    )
+    lines = (
+        f"package.module{i % 200}.Class{i}.method py:method 1 api/module{i % 200}.html#$ -\n"
+        for i in range(count)
+    )
+    return header.encode() + zlib.compress("".join(lines).encode())
+
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Event) -> list[float]:
+    """Request the metadata endpoint until stopped, returning the latencies in milliseconds."""
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        # a request arriving over the network first waits for the event loop to be free
+        await asyncio.sleep(0)
+        response = await client.get("/api/")
+        latencies.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+        await asyncio.sleep(PROBE_INTERVAL)
+    return latencies
+
+
+async def measure(mode: ParseMode | None, body: bytes) -> tuple[list[float], float]:
+    """Measure request latencies while parsing the body with the mode, or while idle if None."""
+    executor = ParseExecutor(mode or ParseMode.inline)
+    try:
+        async with httpx.AsyncClient(app=app, base_url="http://sage") as client:
+            stop = asyncio.Event()
+            prober = asyncio.create_task(probe(client, stop))
+            start = time.perf_counter()
+            for _ in range(ROUNDS):
+                if mode is None:
+                    await asyncio.sleep(0.5)
+                    continue
+                async for _batch in executor.copy_batches(body, 1):
+                    pass
+            elapsed = time.perf_counter() - start
+            stop.set()
+            return await prober, elapsed
+    finally:
+        executor.shutdown()
+
+
+async def main(count: int) -> None:
+    """Run the benchmark."""
+    body = make_inventory(count)
+    header = f"{'mode':>8} {'seconds':>8} {'requests':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    print(header)  # noqa: T201
+    for mode in (None, *ParseMode):
+        latencies, elapsed = await measure(mode, body)
+        quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+        name = mode.value if mode else "idle"
+        row = (
+            f"{name:>8} {elapsed / ROUNDS:>8.2f} {len(latencies):>9} "
+            f"{quantiles[49]:>8.2f} {quantiles[98]:>8.2f} {max(latencies):>8.2f}"
+        )
+        print(row)  # noqa: T201
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ENTRIES))
@@ -0,0 +1,62 @@
+"""
+Measure the latency of completing symbol names from an in-process index.
+
+No database is needed, but the settings must still be configured via the environment.
+Usage: `python benchmarks/symbol_complete.py [SIZE ...]`
+"""
+
+import statistics
+import sys
+import time
+
+from sage.core.inventory import InventoryEntry
+from sage.core.inventory.index import SourceVersion, SymbolIndex
+
+
+DEFAULT_SIZES = (100_000, 1_000_000)
+# prefixes matching everything, many, few and no names
+PREFIXES = ("p", "package.module1", "package.module12.Class5", "package.module20.Class42.m", "zzz")
+REPEATS = 1000
+LIMIT = 10
+
+
+def generate_entries(count: int) -> list[InventoryEntry]:
+    """Generate realistic looking inventory entries."""
+    return [
+        InventoryEntry(
+            name=f"package.module{i % 200}.Class{i // 10}.method{i % 10}",
+            domain="py",
+            role="method" if i % 10 else "class",
+            priority=1,
+            uri=f"api/module{i % 200}.html#$",
+            display_name=None,
+        )
+        for i in range(count)
+    ]
+
+
+def main(sizes: list[int]) -> None:
+    """Run the benchmark."""
+    version = SourceVersion(source_id=1, generation=1, refreshed_at=None, base_url="")
+    header = f"{'symbols':>9} {'prefix':>26} {'matches':>8} {'p50 us':>8} {'p99 us':>8}"
+    print(header)  # noqa: T201
+    for size in sizes:
+        entries = generate_entries(size)
+        start = time.perf_counter()
+        index = SymbolIndex(version, entries)
+        built = f"{size:>9} built in {time.perf_counter() - start:.2f} seconds"
+        print(built)  # noqa: T201
+        for prefix in PREFIXES:
+            matches = sum(1 for entry in entries if entry.name.startswith(prefix))
+            timings = []
+            for _ in range(REPEATS):
+                start = time.perf_counter()
+                index.complete(prefix, LIMIT)
+                timings.append((time.perf_counter() - start) * 1e6)
+            quantiles = statistics.quantiles(timings, n=100, method="inclusive")
+            row = f"{size:>9} {prefix:>26} {matches:>8} {quantiles[49]:>8.1f} {quantiles[98]:>8.1f}"
+            print(row)  # noqa: T201
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or list(DEFAULT_SIZES))
@@ -0,0 +1,122 @@
+"""
+Compare the ORM and COPY write paths for inventory symbols.
+
+This requires a migrated database configured via SAGE_DATABASE_BIND, and creates (then deletes) a
+throwaway package to write symbols for. Usage: `python benchmarks/symbol_writes.py [SIZE ...]`
+"""
+
+import asyncio
+import sys
+import time
+from typing import AsyncIterator, Awaitable, Callable
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from sage.core.database import models
+from sage.core.database.crud import symbols as crud_symbols
+from sage.core.inventory import InventoryEntry
+from sage.core.inventory.executor import encode_rows
+from sage.enums import LanguageCode, ProgrammingLanguage
+from sage.settings import get_settings
+
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+
+async def generate_entries(count: int) -> AsyncIterator[InventoryEntry]:
+    """Generate realistic looking inventory entries."""
+    for i in range(count):
+        yield InventoryEntry(
+            name=f"package.module{i % 200}.Class{i}.method",
+            domain="py",
+            role="method",
+            priority=1,
+            uri=f"api/module{i % 200}.html#$",
+            display_name=None,
+        )
+
+
+async def write_orm(db: AsyncSession, source_id: int, count: int) -> None:
+    """Write with ORM objects and add_all, the way the rest of the crud layer writes."""
+    async with db.begin():
+        db.add_all(
+            [
+                models.DocSymbol(source_id=source_id, generation=0, **entry._asdict())
+                async for entry in generate_entries(count)
+            ]
+        )
+        await db.commit()
+
+
+async def encode_batches(source_id: int, count: int) -> AsyncIterator[bytes]:
+    """Encode the generated entries into batches of binary COPY rows."""
+    batch = []
+    async for entry in generate_entries(count):
+        batch.append(entry)
+        if len(batch) >= 5000:
+            yield encode_rows(source_id, batch)
+            batch.clear()
+    if batch:
+        yield encode_rows(source_id, batch)
+
+
+async def write_copy(db: AsyncSession, source_id: int, count: int) -> None:
+    """Write with COPY into the staging table and one INSERT ... SELECT."""
+    async with db.begin():
+        await crud_symbols.copy_symbols(db, 0, encode_batches(source_id, count))
+        await db.commit()
+
+
+async def main(sizes: list[int]) -> None:
+    """Run the benchmark."""
+    engine = create_async_engine(get_settings().database_bind, future=True)
+    Session = sessionmaker(bind=engine, expire_on_commit=False, future=True, class_=AsyncSession)
+
+    async with Session() as db:
+        async with db.begin():
+            package = models.DocPackage(
+                name="benchmark",
+                homepage="https://example.com",
+                programming_language=ProgrammingLanguage.python,
+            )
+            source = models.DocSource(
+                package=package,
+                human_friendly_url="https://example.com",
+                language_code=LanguageCode.en_US,
+            )
+            db.add_all([package, source])
+            await db.commit()
+
+    methods: dict[str, Callable[[AsyncSession, int, int], Awaitable[None]]] = {
+        "orm add_all": write_orm,
+        "copy": write_copy,
+    }
+    print(f"{'rows':>10} {'method':>12} {'seconds':>10} {'rows/s':>12}")  # noqa: T201
+    try:
+        for size in sizes:
+            for name, method in methods.items():
+                async with Session() as db:
+                    start = time.perf_counter()
+                    await method(db, source.id, size)  # type: ignore
+                    elapsed = time.perf_counter() - start
+                    async with db.begin():
+                        await db.execute(
+                            delete(models.DocSymbol).where(models.DocSymbol.source_id == source.id)
+                        )
+                        await db.commit()
+                row = f"{size:>10} {name:>12} {elapsed:>10.2f} {size / elapsed:>12.0f}"
+                print(row)  # noqa: T201
+    finally:
+        async with Session() as db:
+            async with db.begin():
+                await db.execute(
+                    delete(models.DocPackage).where(models.DocPackage.id == package.id)
+                )
+                await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main([int(size) for size in sys.argv[1:]] or list(DEFAULT_SIZES)))
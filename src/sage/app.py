@@ -2,7 +2,10 @@ from fastapi import FastAPI
 from starlette import status
 from starlette.responses import RedirectResponse
 
-from sage.endpoints import docs, meta
+from sage.core.inventory.executor import shutdown_parse_executor
+from sage.core.inventory.scheduler import RefreshScheduler
+from sage.endpoints import docs, meta, redirect
+from sage.http import close_http_client, start_http_client
 from sage.logging import configure_logging
 from sage.settings import get_settings
 
@@ -36,9 +39,46 @@ async def setup_logging() -> None:
     configure_logging()
 
 
+@app.on_event("startup")
+async def setup_http_client() -> None:
+    """Create the http client shared by all outbound requests."""
+    start_http_client()
+
+
+@app.on_event("startup")
+async def setup_refresh_scheduler() -> None:
+    """Refresh inventories in the background, if configured to run within the api process."""
+    settings = get_settings().refresh
+    if settings.in_process:
+        app.state.refresh_scheduler = RefreshScheduler(settings, start_http_client())
+        app.state.refresh_scheduler.start()
+
+
+@app.on_event("shutdown")
+async def teardown_refresh_scheduler() -> None:
+    """Stop the in-process refresh scheduler, if it was started."""
+    scheduler: RefreshScheduler | None = getattr(app.state, "refresh_scheduler", None)
+    if scheduler is not None:
+        await scheduler.stop()
+
+
+@app.on_event("shutdown")
+async def teardown_http_client() -> None:
+    """Close the connections of the shared http client."""
+    await close_http_client()
+
+
+@app.on_event("shutdown")
+async def teardown_parse_executor() -> None:
+    """Shut down the workers used to parse inventories."""
+    shutdown_parse_executor()
+
+
 # we want to include no prefix on the root router
 # and a prefix on the non-root router
 # this means we currently serve meta from both `/` and `/api`
 prefix = "/api"
 app.include_router(meta.router, prefix=prefix)
 app.include_router(docs.router, prefix=prefix)
+# redirects are kept short, as they are meant to be shared as links
+app.include_router(redirect.router)
@@ -0,0 +1,168 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Mapping
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from sage.responses import render_json
+from sage.settings import CacheSettings, get_settings
+
+
+__all__ = (
+    "PACKAGES_TAG",
+    "SOURCES_TAG",
+    "ResponseCache",
+    "etag_matches",
+    "get_response_cache",
+    "make_etag",
+    "not_modified",
+    "package_tag",
+    "source_tag",
+)
+
+# responses rendered from every package, or every source
+PACKAGES_TAG = "packages"
+SOURCES_TAG = "sources"
+
+
+def package_tag(package_id: int) -> str:
+    """Get the tag of responses rendered from a package, including any of its sources."""
+    return f"package:{package_id}"
+
+
+def source_tag(source_id: int) -> str:
+    """Get the tag of responses rendered from a source."""
+    return f"source:{source_id}"
+
+
+def make_etag(*parts: Any) -> str:
+    """Get a strong etag of a response, from the versions of everything it was rendered from."""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's `If-None-Match` header matches the etag of the current response."""
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so a weak validator matches its strong etag
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    """Get the response telling the client its cached response with the etag is current."""
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+class ResponseCache:
+    """
+    Cache of rendered json responses to reads, keyed by route and parameters.
+
+    Every response is stored with the tags of the rows it was rendered from, such as
+    `package:1`, and mutations invalidate exactly the responses with the tags they affect.
+    At most `max_entries` responses are kept, evicting the least recently used first.
+
+    Invalidation only reaches the process the mutation was made in, so responses also expire
+    after `ttl` seconds to bound how stale other processes may be.
+    """
+
+    def __init__(self, settings: CacheSettings) -> None:
+        self.settings = settings
+        self._entries: OrderedDict[
+            Hashable, tuple[float, bytes, frozenset[str], Mapping[str, str] | None]
+        ] = OrderedDict()
+        self._tagged: dict[str, set[Hashable]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, tags, _ = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tagged[tag]
+            keys.discard(key)
+            if not keys:
+                del self._tagged[tag]
+
+    def get(self, key: Hashable) -> Response | None:
+        """Get the cached response for the key, if there is one which has not expired."""
+        cached = self._entries.get(key)
+        if cached is not None and time.monotonic() - cached[0] >= self.settings.ttl:
+            self._remove(key)
+            cached = None
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return Response(cached[1], headers=cached[3], media_type="application/json")
+
+    def set(
+        self,
+        key: Hashable,
+        content: Any,
+        tags: Iterable[str],
+        headers: Mapping[str, str] | None = None,
+    ) -> Response:
+        """
+        Render the content, and cache it with the tags of the rows it was rendered from.
+
+        The content is rendered with `render_json`, so it must not contain models.
+        Any headers are cached and sent along with the content.
+        """
+        body = render_json(content)
+        if self.settings.max_entries <= 0:
+            return Response(body, headers=headers, media_type="application/json")
+        if key in self._entries:
+            self._remove(key)
+        tags = frozenset(tags)
+        self._entries[key] = (time.monotonic(), body, tags, headers)
+        for tag in tags:
+            self._tagged.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.settings.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        return Response(body, headers=headers, media_type="application/json")
+
+    def invalidate(self, *tags: str) -> None:
+        """Drop every response with any of the tags."""
+        for tag in tags:
+            for key in list(self._tagged.get(tag, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        """Drop every response."""
+        self._entries.clear()
+        self._tagged.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Get statistics on how effective the cache is."""
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.settings.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+_RESPONSE_CACHE: ResponseCache | None = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Get the global response cache, creating it on first use."""
+    global _RESPONSE_CACHE
+    if _RESPONSE_CACHE is None:
+        _RESPONSE_CACHE = ResponseCache(get_settings().cache)
+    return _RESPONSE_CACHE
@@ -1,12 +1,72 @@
+from typing import Any, AsyncIterator, Iterator, Sequence, TypeVar
+
 from fastapi import HTTPException
-from sqlalchemy import and_, delete, update
-from sqlalchemy.engine import CursorResult
-from sqlalchemy.exc import NoResultFound
+from sqlalchemy import (
+    Integer,
+    String,
+    and_,
+    column,
+    delete,
+    exists,
+    func,
+    literal,
+    literal_column,
+    or_,
+    tuple_,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError, NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload, subqueryload
+from sqlalchemy.orm import selectinload
 
+from sage.cache import PACKAGES_TAG, SOURCES_TAG, get_response_cache, package_tag, source_tag
 from sage.core.database import models, schemas
+from sage.enums import ImportStatus, ProgrammingLanguage
+
+
+T = TypeVar("T")
+
+
+# the names of the counters of changes to the docs tables
+PACKAGES_VERSION = "doc_packages"
+# only changes to the columns of sources which are shown alongside their packages
+SOURCES_VERSION = "doc_sources"
+# any change to sources, including their refresh state
+SOURCE_REFRESHES_VERSION = "doc_source_refreshes"
+
+# the unique constraints of the names of packages, and of the inventory urls of their sources
+PACKAGE_NAME_CONSTRAINT = "uq_doc_packages_name"
+SOURCE_URL_CONSTRAINT = "uq_doc_sources_package_id_inventory_url"
+
+# rows are imported with one statement per batch, as statements are limited to 32767 parameters
+IMPORT_BATCH_SIZE = 1000
+
+# the columns of the dict representations of packages and sources, see their `to_dict` methods
+PACKAGE_COLUMNS = (
+    models.DocPackage.id,
+    models.DocPackage.name,
+    models.DocPackage.homepage,
+    models.DocPackage.programming_language,
+)
+SOURCE_COLUMNS = (
+    models.DocSource.id,
+    models.DocSource.package_id,
+    models.DocSource.preview,
+    models.DocSource.inventory_url,
+    models.DocSource.human_friendly_url,
+    models.DocSource.version,
+    models.DocSource.language_code,
+)
+
+
+async def get_table_versions(db: AsyncSession) -> dict[str, int]:
+    """Get how many times each of the docs tables has been changed."""
+    stmt = select(models.DocTableVersion.name, models.DocTableVersion.version)
+    return dict((await db.execute(stmt)).all())  # type: ignore
 
 
 async def get_doc_package(
@@ -35,84 +95,401 @@ async def get_doc_package_by_name(db: AsyncSession, name: str) -> models.DocPack
     return resp
 
 
+async def _get_source_dicts(
+    db: AsyncSession, package_ids: list[int]
+) -> dict[int, list[dict[str, Any]]]:
+    """Get the dict representations of the sources of each of the packages."""
+    sources: dict[int, list[dict[str, Any]]] = {package_id: [] for package_id in package_ids}
+    if not package_ids:
+        return sources
+    stmt = (
+        select(*SOURCE_COLUMNS)
+        .where(models.DocSource.package_id.in_(package_ids))
+        .order_by(models.DocSource.id)
+    )
+    for row in await db.execute(stmt):
+        sources[row.package_id].append(row._asdict())
+    return sources
+
+
+async def get_doc_package_dict(db: AsyncSession, id: int) -> dict[str, Any] | None:
+    """
+    Get the dict representation of a package and its sources by its primary key.
+
+    Only the columns of the representation are read, and no models are created.
+    """
+    row = (await db.execute(select(*PACKAGE_COLUMNS).where(models.DocPackage.id == id))).first()
+    if row is None:
+        return None
+    package = row._asdict()
+    package["sources"] = (await _get_source_dicts(db, [id]))[id]
+    return package
+
+
 async def get_all_doc_packages(
     db: AsyncSession,
     *,
     with_sources: bool = False,
-) -> list[models.DocPackage]:
-    """Fetch *all* documentation packages from the database."""
-    stmt = select(models.DocPackage)
+    after: int | None = None,
+    limit: int | None = None,
+    programming_language: ProgrammingLanguage | None = None,
+    name_prefix: str | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Fetch the dict representations of documentation packages, in order of id.
+
+    Packages are paged through by passing the id of the last package of the previous page as
+    `after`, which the primary key seeks to directly, so every page is as fast as the first.
+    Names are filtered by prefix case-insensitively.
+
+    Only the columns of the representations are read, and no models are created.
+    """
+    stmt = select(*PACKAGE_COLUMNS).order_by(models.DocPackage.id)
+    if after is not None:
+        stmt = stmt.where(models.DocPackage.id > after)
+    if programming_language is not None:
+        stmt = stmt.where(models.DocPackage.programming_language == programming_language)
+    if name_prefix:
+        stmt = stmt.where(
+            func.lower(models.DocPackage.name).startswith(name_prefix.lower(), autoescape=True)
+        )
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    packages = [row._asdict() for row in await db.execute(stmt)]
     if with_sources:
-        stmt = stmt.options(subqueryload(models.DocPackage.sources))
-    resp = (await db.execute(stmt)).all()
-    if not resp:
-        return []
-    return [row[0] for row in resp]
+        # loads the sources of only the packages on the page, by their ids
+        sources = await _get_source_dicts(db, [package["id"] for package in packages])
+        for package in packages:
+            package["sources"] = sources[package["id"]]
+    return packages
+
+
+async def stream_doc_packages(db: AsyncSession) -> AsyncIterator[dict[str, Any]]:
+    """
+    Stream the dict representation of every package and its sources, through a server-side cursor.
+
+    Packages are streamed in order of id, so only one package is held in memory at a time.
+    Sources also include the generation of symbols they currently serve, as `current_generation`.
+    This must be used within a transaction.
+    """
+    source_columns = (*SOURCE_COLUMNS, models.DocSource.current_generation)
+    stmt = (
+        select(*PACKAGE_COLUMNS, *source_columns)
+        .outerjoin(models.DocSource, models.DocSource.package_id == models.DocPackage.id)
+        .order_by(models.DocPackage.id, models.DocSource.id)
+        .execution_options(yield_per=1000)
+    )
+    package: dict[str, Any] | None = None
+    async for row in await db.stream(stmt):
+        if package is None or package["id"] != row[0]:
+            if package is not None:
+                yield package
+            package = {column.key: row[i] for i, column in enumerate(PACKAGE_COLUMNS)}
+            package["sources"] = []
+        # packages without sources are joined to a row of nulls
+        if row[len(PACKAGE_COLUMNS)] is not None:
+            package["sources"].append(
+                {
+                    column.key: row[len(PACKAGE_COLUMNS) + i]
+                    for i, column in enumerate(source_columns)
+                }
+            )
+    if package is not None:
+        yield package
+
+
+def _violated_constraint(error: IntegrityError) -> str | None:
+    """Get the name of the constraint which a statement violated."""
+    # the error of asyncpg is the cause of the error of its dbapi adapter
+    return getattr(error.orig.__cause__, "constraint_name", None)
+
+
+def _conflict(error: IntegrityError, doc_package_name: str | None = None) -> HTTPException:
+    """Get the response to a statement which violated a unique constraint of packages or sources."""
+    constraint = _violated_constraint(error)
+    if constraint == PACKAGE_NAME_CONSTRAINT:
+        return HTTPException(409, f"A package named '{doc_package_name}' already exists.")
+    if constraint == SOURCE_URL_CONSTRAINT:
+        return HTTPException(409, "The package already has a source with this inventory url.")
+    raise error
 
 
 async def create_doc_package(
     db: AsyncSession, doc_package: schemas.DocPackageCreationRequest
-) -> models.DocPackage:
-    """Create a new documentation object with the provided schema."""
-    db_doc_package = models.DocPackage(
-        name=doc_package.name,
-        homepage=str(doc_package.homepage),
-        programming_language=doc_package.programming_language,
+) -> dict[str, Any]:
+    """
+    Create a new documentation object with the provided schema.
+
+    The package and its sources are inserted with one statement, and the dict representation of
+    the package and its sources is returned from it.
+    """
+    if not doc_package.sources:
+        raise HTTPException(400, "At least one source must be provided.")
+    if sum(source.default for source in doc_package.sources) > 1:
+        raise HTTPException(400, "Only one source may be set as default.")
+    if len({source.inventory_url for source in doc_package.sources}) < len(doc_package.sources):
+        raise HTTPException(400, "Every source of a package must have a different inventory url.")
+    # add the default source if not already provided, we use the first source
+    explicit_default = any(source.default for source in doc_package.sources)
+    package = (
+        insert(models.DocPackage)
+        .values(
+            name=doc_package.name,
+            homepage=str(doc_package.homepage),
+            programming_language=doc_package.programming_language,
+        )
+        .returning(models.DocPackage.id)
+        .cte("package")
+    )
+    package_id = select(package.c.id).scalar_subquery()
+    stmt = (
+        insert(models.DocSource)
+        .values(
+            [
+                {
+                    "package_id": package_id,
+                    "inventory_url": source.inventory_url,
+                    "version": source.version,
+                    # todo: use yarl for this and do validation elsewhere
+                    "human_friendly_url": source.inventory_url.removesuffix("/objects.inv"),
+                    "language_code": source.language_code,
+                    "default": source.default if explicit_default else position == 0,
+                }
+                for position, source in enumerate(doc_package.sources)
+            ]
+        )
+        .add_cte(package)
+        .returning(*SOURCE_COLUMNS)
     )
-    default_source: models.DocSource | None = None
+    try:
+        async with db.begin():
+            sources = [row._asdict() for row in await db.execute(stmt)]
+            await db.commit()
+    except IntegrityError as e:
+        raise _conflict(e, doc_package.name) from None
+    get_response_cache().invalidate(PACKAGES_TAG)
+    sources.sort(key=lambda source: source["id"])
+    return {
+        "id": sources[0]["package_id"],
+        "name": doc_package.name,
+        "homepage": str(doc_package.homepage),
+        "programming_language": doc_package.programming_language,
+        "sources": sources,
+    }
+
+
+def _batches(items: Sequence[T]) -> Iterator[Sequence[T]]:
+    for start in range(0, len(items), IMPORT_BATCH_SIZE):
+        yield items[start : start + IMPORT_BATCH_SIZE]
+
+
+def _import_status(inserted: bool) -> ImportStatus:
+    return ImportStatus.created if inserted else ImportStatus.updated
+
+
+async def import_doc_packages(
+    db: AsyncSession, doc_packages: Sequence[schemas.DocPackageCreationRequest]
+) -> list[dict[str, Any]]:
+    """
+    Create or update packages and their sources by name and inventory url, in one transaction.
+
+    Packages and sources are upserted with one `INSERT ... ON CONFLICT DO UPDATE` per batch, which
+    skips rows that are already stored as imported, so importing the same packages again is
+    idempotent and writes nothing. A source marked as default replaces the default of its package,
+    and otherwise the first source becomes the default of packages which do not have one.
+
+    The packages must have distinct names, and each must have sources with distinct inventory
+    urls, at most one of which is marked as default.
+    Returns the id and status of every package and source, in the order they were provided.
+    """
+    package_ids: dict[str, int] = {}
+    package_statuses: dict[str, ImportStatus] = {}
+    source_ids: dict[tuple[int, str], int] = {}
+    source_statuses: dict[tuple[int, str], ImportStatus] = {}
     async with db.begin():
-        sources: list[models.DocSource] = []
-        for source in doc_package.sources:
-            # todo: use yarl for this and do validation elsewhere
-            human_friendly_url = source.inventory_url.removesuffix("/objects.inv")
-            db_source_model = models.DocSource(
-                package=db_doc_package,
-                inventory_url=source.inventory_url,
-                version=source.version,
-                human_friendly_url=human_friendly_url,
-                language_code=source.language_code,
+        for batch in _batches(doc_packages):
+            stmt = insert(models.DocPackage).values(
+                [
+                    {
+                        "name": package.name,
+                        "homepage": str(package.homepage) if package.homepage else "",
+                        "programming_language": package.programming_language,
+                    }
+                    for package in batch
+                ]
             )
-            if source.default:
-                if default_source is not None:
-                    raise HTTPException(400, "Only one source may be set as default.")
-                default_source = db_source_model
-
-            sources.append(db_source_model)
-        # add the default source if not already provided, we use the first source
-        if not sources:
-            raise HTTPException(400, "At least one source must be provided.")
-        if not default_source:
-            sources[0].default = True  # type: ignore
-
-        db.add(db_doc_package, True)
-        db.add_all(sources)
+            stmt = stmt.on_conflict_do_update(
+                constraint=PACKAGE_NAME_CONSTRAINT,
+                set_={
+                    "homepage": stmt.excluded.homepage,
+                    "programming_language": stmt.excluded.programming_language,
+                },
+                where=tuple_(
+                    models.DocPackage.homepage, models.DocPackage.programming_language
+                ).is_distinct_from(
+                    tuple_(stmt.excluded.homepage, stmt.excluded.programming_language)
+                ),
+            ).returning(
+                models.DocPackage.id,
+                models.DocPackage.name,
+                # rows which were inserted rather than updated have not been deleted by anything
+                literal_column("doc_packages.xmax = 0"),
+            )
+            for id, name, inserted in await db.execute(stmt):
+                package_ids[name] = id
+                package_statuses[name] = _import_status(inserted)
+
+        # unchanged packages are not returned by the upserts
+        has_default = exists().where(
+            and_(
+                models.DocSource.package_id == models.DocPackage.id,
+                models.DocSource.default == True,  # noqa: E712
+            )
+        )
+        names = [package.name for package in doc_packages]
+        defaulted: set[int] = set()
+        for batch in _batches(names):
+            stmt = select(models.DocPackage.id, models.DocPackage.name, has_default).where(
+                models.DocPackage.name.in_(batch)
+            )
+            for id, name, default in await db.execute(stmt):
+                package_ids[name] = id
+                package_statuses.setdefault(name, ImportStatus.unchanged)
+                if default:
+                    defaulted.add(id)
+
+        rows = []
+        replaced_defaults = []
+        for package in doc_packages:
+            package_id = package_ids[package.name]
+            explicit_default = any(source.default for source in package.sources)
+            for position, source in enumerate(package.sources):
+                if explicit_default:
+                    default = source.default
+                else:
+                    default = position == 0 and package_id not in defaulted
+                if source.default:
+                    replaced_defaults.append(
+                        {"package_id": package_id, "inventory_url": source.inventory_url}
+                    )
+                rows.append(
+                    {
+                        "package_id": package_id,
+                        "inventory_url": source.inventory_url,
+                        "version": source.version,
+                        # todo: use yarl for this and do validation elsewhere
+                        "human_friendly_url": source.inventory_url.removesuffix("/objects.inv"),
+                        "language_code": source.language_code,
+                        "default": default,
+                    }
+                )
+
+        # unset the defaults which are being replaced first, as a package may only have one
+        for batch in _batches(replaced_defaults):
+            new_defaults = values(
+                column("package_id", Integer), column("inventory_url", String), name="new_defaults"
+            ).data([(row["package_id"], row["inventory_url"]) for row in batch])
+            stmt = (
+                update(models.DocSource)
+                .where(
+                    and_(
+                        models.DocSource.package_id == new_defaults.c.package_id,
+                        models.DocSource.default == True,  # noqa: E712
+                        models.DocSource.inventory_url.is_distinct_from(
+                            new_defaults.c.inventory_url
+                        ),
+                    )
+                )
+                .values(default=False)
+                .returning(models.DocSource.package_id, models.DocSource.inventory_url)
+                .execution_options(synchronize_session=False)
+            )
+            for package_id, inventory_url in await db.execute(stmt):
+                source_statuses[package_id, inventory_url] = ImportStatus.updated
+
+        for batch in _batches(rows):
+            stmt = insert(models.DocSource).values(batch)
+            # sources which are not marked as default keep being the default of their package
+            default = or_(models.DocSource.default, stmt.excluded.default)
+            columns = ("version", "human_friendly_url", "language_code")
+            stmt = stmt.on_conflict_do_update(
+                constraint=SOURCE_URL_CONSTRAINT,
+                set_={**{name: stmt.excluded[name] for name in columns}, "default": default},
+                where=tuple_(
+                    *(models.DocSource.__table__.c[name] for name in columns),
+                    models.DocSource.default,
+                ).is_distinct_from(tuple_(*(stmt.excluded[name] for name in columns), default)),
+            ).returning(
+                models.DocSource.id,
+                models.DocSource.package_id,
+                models.DocSource.inventory_url,
+                literal_column("doc_sources.xmax = 0"),
+            )
+            for id, package_id, inventory_url, inserted in await db.execute(stmt):
+                source_ids[package_id, inventory_url] = id
+                source_statuses[package_id, inventory_url] = _import_status(inserted)
+
+        # unchanged sources are not returned by the upserts either
+        if len(source_ids) < len(rows):
+            for batch in _batches(list(package_ids.values())):
+                stmt = select(
+                    models.DocSource.id, models.DocSource.package_id, models.DocSource.inventory_url
+                ).where(models.DocSource.package_id.in_(batch))
+                for id, package_id, inventory_url in await db.execute(stmt):
+                    source_ids.setdefault((package_id, inventory_url), id)
         await db.commit()
-    return db_doc_package
+
+    changed = any(status is not ImportStatus.unchanged for status in package_statuses.values())
+    if changed or source_statuses:
+        get_response_cache().invalidate(
+            PACKAGES_TAG, SOURCES_TAG, *(package_tag(id) for id in package_ids.values())
+        )
+
+    results = []
+    for package in doc_packages:
+        package_id = package_ids[package.name]
+        sources = []
+        for source in package.sources:
+            key = (package_id, source.inventory_url)
+            sources.append(
+                {
+                    "inventory_url": source.inventory_url,
+                    "id": source_ids[key],
+                    "status": source_statuses.get(key, ImportStatus.unchanged),
+                }
+            )
+        results.append(
+            {
+                "name": package.name,
+                "id": package_id,
+                "status": package_statuses[package.name],
+                "sources": sources,
+            }
+        )
+    return results
 
 
 async def modify_doc_package(
     db: AsyncSession, id: int, doc_package: schemas.DocPackagePatchRequest
-) -> models.DocPackage:
-    """Modify the existing doc_package with the newly provided request."""
+) -> dict[str, Any]:
+    """Modify the existing doc_package with the newly provided request, returning its dict."""
     stmt = (
         update(models.DocPackage)
         .where(models.DocPackage.id == id)
         .values(**doc_package.dict(exclude_unset=True))
-        .execution_options(synchronize_session="fetch")
+        .returning(*PACKAGE_COLUMNS)
+        .execution_options(synchronize_session=False)
     )
-    async with db.begin():
-        result: CursorResult = await db.execute(stmt)
-        if result.rowcount == 0:
-            raise HTTPException(status_code=404, detail=f"No package with id '{id}' was found.")
-        if result.rowcount != 1:
-            await db.rollback()
-            raise RuntimeError(
-                "updated more than one package based on primary key. This code is unreachable."
-            )
-        # fetch the new package
-        package = await get_doc_package(db, id)
-        await db.commit()
-    return package
+    try:
+        async with db.begin():
+            package = (await db.execute(stmt)).first()
+            if package is None:
+                raise HTTPException(status_code=404, detail=f"No package with id '{id}' was found.")
+            await db.commit()
+    except IntegrityError as e:
+        raise _conflict(e, doc_package.name) from None
+    get_response_cache().invalidate(PACKAGES_TAG, package_tag(id))
+    return package._asdict()
 
 
 async def delete_doc_package(
@@ -120,17 +497,17 @@ async def delete_doc_package(
     id: int,
 ) -> None:
     """Delete documentation package based on ID."""
-    stmt = delete(models.DocPackage).where(models.DocPackage.id == id)
+    stmt = (
+        delete(models.DocPackage)
+        .where(models.DocPackage.id == id)
+        .returning(models.DocPackage.id)
+        .execution_options(synchronize_session=False)
+    )
     async with db.begin():
-        result: CursorResult = await db.execute(stmt)
-        if result.rowcount == 0:
+        if (await db.execute(stmt)).first() is None:
             raise HTTPException(status_code=404, detail=f"No package with id '{id}' was found.")
-        if result.rowcount != 1:
-            await db.rollback()
-            raise RuntimeError(
-                "deleted more than one package based on primary key. This code is unreachable."
-            )
         await db.commit()
+    get_response_cache().invalidate(PACKAGES_TAG, package_tag(id))
     return
 
 
@@ -150,81 +527,172 @@ async def get_doc_source(db: AsyncSession, id: int) -> models.DocSource | None:
     return resp
 
 
-async def get_all_sources_for_package(db: AsyncSession, package_id: int) -> list[models.DocSource]:
-    """Get all sources for a specific package."""
-    stmt = select(models.DocSource).where(models.DocSource.package_id == package_id)
-    resp = await db.execute(stmt)
-    if not resp:
-        return []
-    return [row[0] for row in resp]
+def _source_with_package(row: Row) -> dict[str, Any]:
+    """Get the dict of a source and its package from a row of their columns, source first."""
+    source = {column.key: row[i] for i, column in enumerate(SOURCE_COLUMNS)}
+    source["package"] = {
+        column.key: row[len(SOURCE_COLUMNS) + i] for i, column in enumerate(PACKAGE_COLUMNS)
+    }
+    return source
+
+
+async def get_doc_source_dict(db: AsyncSession, id: int) -> dict[str, Any] | None:
+    """
+    Get the dict representation of a source and its package by its primary key.
+
+    Only the columns of the representation are read, and no models are created.
+    """
+    stmt = (
+        select(*SOURCE_COLUMNS, *PACKAGE_COLUMNS)
+        .join(models.DocPackage, models.DocPackage.id == models.DocSource.package_id)
+        .where(models.DocSource.id == id)
+    )
+    row = (await db.execute(stmt)).first()
+    if row is None:
+        return None
+    return _source_with_package(row)
+
+
+async def get_default_doc_source(db: AsyncSession, package_name: str) -> models.DocSource | None:
+    """Get the default source of the package with the provided name."""
+    stmt = (
+        select(models.DocSource)
+        .join(models.DocPackage)
+        .where(
+            and_(
+                models.DocPackage.name == package_name,
+                models.DocSource.default == True,  # noqa: E712
+            )
+        )
+    )
+    return (await db.execute(stmt)).scalar_one_or_none()
+
+
+async def get_module_owners(db: AsyncSession) -> list[tuple[str, int, str, int, int]]:
+    """
+    Get the python modules documented by the default source of every package.
+
+    Each row is the module, package id, package name, source id, and the amount of symbols the
+    source documents within the module. Rows of a module are ordered by the amount of symbols
+    descending, then by package id.
+    """
+    stmt = (
+        select(
+            models.DocModule.name,
+            models.DocPackage.id,
+            models.DocPackage.name,
+            models.DocSource.id,
+            models.DocModule.symbols,
+        )
+        .join(models.DocSource, models.DocSource.id == models.DocModule.source_id)
+        .join(models.DocPackage, models.DocPackage.id == models.DocSource.package_id)
+        .where(models.DocSource.default == True)  # noqa: E712
+        .order_by(models.DocModule.name, models.DocModule.symbols.desc(), models.DocPackage.id)
+    )
+    return [tuple(row) for row in await db.execute(stmt)]  # type: ignore
+
+
+async def get_doc_source_dicts(db: AsyncSession, package_id: int) -> list[dict[str, Any]]:
+    """
+    Get the dict representations of all sources of a specific package, in order of id.
+
+    Only the columns of the representation are read, and no models are created.
+    """
+    return (await _get_source_dicts(db, [package_id]))[package_id]
 
 
 async def create_doc_source(
     db: AsyncSession, doc_source: schemas.DocSourceCreationRequest
-) -> models.DocPackage:
-    """Create a documentation source using the package_id provided in the request."""
-    package_id = doc_source.package_id
+) -> dict[str, Any]:
+    """
+    Create a documentation source using the package_id provided in the request.
 
-    async with db.begin():
-        # validate the package exists
-        doc_package = await get_doc_package(db, package_id)
-        if not doc_package:
-            raise HTTPException(400, "documentation package does not exist")
-
-        human_friendly_url = doc_source.inventory_url.removesuffix("/objects.inv")
-
-        db_doc_source = models.DocSource(
-            package_id=package_id,
-            inventory_url=doc_source.inventory_url,
-            version=doc_source.version,
-            human_friendly_url=human_friendly_url,
-            language_code=doc_source.language_code,
-            default=doc_source.default,
+    The source is inserted with one statement, which checks the package exists. If the source is
+    the new default of its package, the previous default is unset first in the same transaction.
+    The dict of the source is returned, with whether it is the default of its package.
+    """
+    package_id = doc_source.package_id
+    stmt = (
+        insert(models.DocSource)
+        .from_select(
+            [
+                "package_id",
+                "inventory_url",
+                "version",
+                "human_friendly_url",
+                "language_code",
+                "default",
+            ],
+            select(
+                models.DocPackage.id,
+                literal(doc_source.inventory_url, String),
+                literal(doc_source.version, String),
+                # todo: use yarl for this and do validation elsewhere
+                literal(doc_source.inventory_url.removesuffix("/objects.inv"), String),
+                literal(doc_source.language_code, models.DocSource.language_code.type),
+                literal(doc_source.default),
+            ).where(models.DocPackage.id == package_id),
         )
-        if db_doc_source.default:
-            # assume there is another default and we need to change to this one as the default
-            stmt = select(models.DocSource).where(
-                and_(
-                    models.DocSource.package_id == package_id,
-                    models.DocSource.default == True,  # noqa: E712
+        .returning(*SOURCE_COLUMNS, models.DocSource.default)
+    )
+    try:
+        async with db.begin():
+            if doc_source.default:
+                # a package may only have one default, so the previous one is unset first
+                await db.execute(
+                    update(models.DocSource)
+                    .where(
+                        and_(
+                            models.DocSource.package_id == package_id,
+                            models.DocSource.default == True,  # noqa: E712
+                        )
+                    )
+                    .values(default=False)
+                    .execution_options(synchronize_session=False)
                 )
-            )
-            result = await db.execute(stmt)
-            other_doc_source = result.one_or_none()
-            if other_doc_source:
-                other_doc_source = other_doc_source[0]
-                other_doc_source.default = False
-                db.add(other_doc_source)
-
-        db.add(db_doc_source, True)
+            source = (await db.execute(stmt)).first()
+            # validate the package exists
+            if source is None:
+                raise HTTPException(400, "documentation package does not exist")
+            await db.commit()
+    except IntegrityError as e:
+        raise _conflict(e) from None
 
-        await db.commit()
-
-    return db_doc_source
+    get_response_cache().invalidate(SOURCES_TAG, package_tag(package_id))
+    return source._asdict()
 
 
 async def modify_doc_source(
     db: AsyncSession, id: int, doc_source: schemas.DocSourcePatchRequest
-) -> schemas.DocSource:
-    """Modify the provided source."""
+) -> dict[str, Any]:
+    """
+    Modify the provided source, returning the dict of it and its package.
+
+    The dict also has whether the source is the default of its package, which may be modified.
+    """
     stmt = (
         update(models.DocSource)
-        .where(models.DocSource.id == id)
+        .where(
+            and_(
+                models.DocSource.id == id,
+                models.DocPackage.id == models.DocSource.package_id,
+            )
+        )
         .values(**doc_source.dict(exclude_unset=True))
-        .execution_options(synchronize_session="fetch")
+        .returning(*SOURCE_COLUMNS, *PACKAGE_COLUMNS, models.DocSource.default)
+        .execution_options(synchronize_session=False)
     )
-    async with db.begin():
-        result: CursorResult = await db.execute(stmt)
-        if result.rowcount == 0:
-            raise HTTPException(status_code=404, detail=f"No source with id '{id}' was found.")
-        if result.rowcount != 1:
-            await db.rollback()
-            raise RuntimeError(
-                "updated more than one source based on primary key. This code is unreachable."
-            )
-        # fetch the new package
-        source = await get_doc_source(db, id)
-        await db.commit()
+    try:
+        async with db.begin():
+            row = (await db.execute(stmt)).first()
+            if row is None:
+                raise HTTPException(status_code=404, detail=f"No source with id '{id}' was found.")
+            await db.commit()
+    except IntegrityError as e:
+        raise _conflict(e) from None
+    source = _source_with_package(row)
+    source["default"] = row[-1]
+    get_response_cache().invalidate(SOURCES_TAG, package_tag(source["package_id"]), source_tag(id))
     return source
 
 
@@ -233,15 +701,16 @@ async def delete_doc_source(
     id: int,
 ) -> None:
     """Delete documentation source based on ID."""
-    stmt = delete(models.DocSource).where(models.DocSource.id == id)
+    stmt = (
+        delete(models.DocSource)
+        .where(models.DocSource.id == id)
+        .returning(models.DocSource.package_id)
+        .execution_options(synchronize_session=False)
+    )
     async with db.begin():
-        result: CursorResult = await db.execute(stmt)
-        if result.rowcount == 0:
+        package_id = (await db.execute(stmt)).scalar_one_or_none()
+        if package_id is None:
             raise HTTPException(status_code=404, detail=f"No source with id '{id}' was found.")
-        if result.rowcount != 1:
-            await db.rollback()
-            raise RuntimeError(
-                "deleted more than one source based on primary key. This code is unreachable."
-            )
         await db.commit()
+    get_response_cache().invalidate(SOURCES_TAG, package_tag(package_id), source_tag(id))
     return
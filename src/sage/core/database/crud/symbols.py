@@ -0,0 +1,474 @@
+from datetime import timedelta
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, NamedTuple
+
+import asyncpg
+from sqlalchemy import (
+    BigInteger,
+    Table,
+    and_,
+    column,
+    delete,
+    exists,
+    func,
+    insert,
+    literal,
+    literal_column,
+    or_,
+    table,
+    text,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from sage.core.database import models
+from sage.core.inventory.executor import COPY_HEADER, COPY_TRAILER
+from sage.core.inventory.fetch import InventoryValidators
+from sage.core.inventory.parser import InventoryEntry
+
+
+STAGING_TABLE = "doc_symbols_staging"
+# the order of the columns in each row encoded by the parse executor
+STAGING_COLUMNS = ("source_id", "name", "domain", "role", "priority", "uri", "display_name")
+# how many rows of old generations are deleted per transaction
+GC_BATCH_SIZE = 10_000
+# how many symbols are fetched from a server-side cursor at once
+STREAM_BATCH_SIZE = 5_000
+
+staging_table = table(STAGING_TABLE, *(column(name) for name in STAGING_COLUMNS))
+symbols_table: Table = models.DocSymbol.__table__  # type: ignore
+
+
+class SymbolDiff(NamedTuple):
+    """The changes a refresh made to the symbols of a source."""
+
+    added: int
+    removed: int
+    changed: int
+
+
+async def get_driver_connection(db: AsyncSession) -> asyncpg.Connection:
+    """Get the asyncpg connection underlying the session's current connection."""
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    return raw_connection.driver_connection  # type: ignore
+
+
+async def stage_symbols(db: AsyncSession, batches: AsyncIterable[bytes]) -> int:
+    """
+    Stream batches of encoded rows into a temporary staging table with a binary COPY.
+
+    Each batch holds rows of the staging columns in the binary COPY format, as produced by
+    `sage.core.inventory.executor.encode_rows`. Rows that repeat the name, domain and role of an
+    earlier row are discarded. The staging table is dropped at the end of the transaction, so this
+    must be called within a transaction. Returns the amount of staged rows.
+    """
+    # executing through the session first ensures the transaction has started on the connection
+    await db.execute(
+        text(
+            f"CREATE TEMPORARY TABLE {STAGING_TABLE} ON COMMIT DROP AS "  # noqa: S608
+            f"SELECT {', '.join(STAGING_COLUMNS)} FROM doc_symbols WITH NO DATA"
+        )
+    )
+
+    async def source() -> AsyncIterator[bytes]:
+        yield COPY_HEADER
+        async for batch in batches:
+            yield batch
+        yield COPY_TRAILER
+
+    driver_connection = await get_driver_connection(db)
+    status = await driver_connection.copy_to_table(
+        STAGING_TABLE, source=source(), columns=STAGING_COLUMNS, format="binary"
+    )
+    copied = int(status.rpartition(" ")[2])
+
+    duplicates = await db.execute(
+        text(
+            f"DELETE FROM {STAGING_TABLE} a USING {STAGING_TABLE} b "
+            "WHERE a.name = b.name AND a.domain = b.domain AND a.role = b.role "
+            "AND a.ctid > b.ctid"
+        )
+    )
+    # temporary tables are never analyzed automatically, and the planner needs row estimates
+    await db.execute(text(f"ANALYZE {STAGING_TABLE}"))
+    return copied - duplicates.rowcount  # type: ignore
+
+
+async def copy_symbols(db: AsyncSession, generation: int, batches: AsyncIterable[bytes]) -> int:
+    """
+    Bulk write the encoded rows as symbols of the generation, returning how many were written.
+
+    Rows are streamed with a binary COPY into a temporary staging table, and then moved into
+    doc_symbols with a single INSERT ... SELECT. This must be called within a transaction, and the
+    staging table remains until the transaction ends.
+    """
+    await stage_symbols(db, batches)
+    stmt = insert(symbols_table).from_select(
+        ["generation", *STAGING_COLUMNS],
+        select(literal(generation, BigInteger), *staging_table.c),
+    )
+    result = await db.execute(stmt)
+    return result.rowcount  # type: ignore
+
+
+async def store_modules(db: AsyncSession, source_id: int, generation: int) -> None:
+    """
+    Replace the top-level python modules of the source with those of a generation of its symbols.
+
+    This must be called within the transaction which makes the generation the served one, so the
+    modules never describe a generation which is not served.
+    """
+    s = symbols_table
+    # the arguments are inlined, as postgres does not consider bound parameters to be equal
+    module = func.split_part(s.c.name, literal_column("'.'"), literal_column("1"))
+    await db.execute(delete(models.DocModule).where(models.DocModule.source_id == source_id))
+    await db.execute(
+        insert(models.DocModule).from_select(
+            ["source_id", "name", "symbols"],
+            select(literal(source_id), module, func.count())
+            .where(
+                and_(s.c.source_id == source_id, s.c.generation == generation, s.c.domain == "py")
+            )
+            .group_by(module),
+        )
+    )
+
+
+async def count_symbols(db: AsyncSession, source_id: int, generation: int) -> int:
+    """Count the symbols of a generation of the source."""
+    stmt = select(func.count()).where(
+        and_(
+            models.DocSymbol.source_id == source_id,
+            models.DocSymbol.generation == generation,
+        )
+    )
+    return (await db.execute(stmt)).scalar_one()
+
+
+async def get_symbols(db: AsyncSession, source_id: int, generation: int) -> list[InventoryEntry]:
+    """Get every symbol of a generation of the source."""
+    stmt = select(*(symbols_table.c[field] for field in InventoryEntry._fields)).where(
+        and_(symbols_table.c.source_id == source_id, symbols_table.c.generation == generation)
+    )
+    return [InventoryEntry(*row) for row in await db.execute(stmt)]
+
+
+async def stream_symbols(
+    db: AsyncSession, source_id: int, generation: int
+) -> AsyncIterator[InventoryEntry]:
+    """
+    Stream every symbol of a generation of the source by name, through a server-side cursor.
+
+    Symbols are fetched in batches as they are consumed, so no more than a batch is held in memory.
+    This must be used within a transaction.
+    """
+    stmt = (
+        select(*(symbols_table.c[field] for field in InventoryEntry._fields))
+        .where(
+            and_(symbols_table.c.source_id == source_id, symbols_table.c.generation == generation)
+        )
+        .order_by(symbols_table.c.name)
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+    async for row in await db.stream(stmt):
+        yield InventoryEntry(*row)
+
+
+async def find_symbols(
+    db: AsyncSession, source_id: int, generation: int, names: Iterable[str]
+) -> list[InventoryEntry]:
+    """Get the symbols of a generation of the source which have any of the provided names."""
+    stmt = select(*(symbols_table.c[field] for field in InventoryEntry._fields)).where(
+        and_(
+            symbols_table.c.source_id == source_id,
+            symbols_table.c.generation == generation,
+            symbols_table.c.name.in_(list(names)),
+        )
+    )
+    return [InventoryEntry(*row) for row in await db.execute(stmt)]
+
+
+async def complete_symbols(
+    db: AsyncSession, source_id: int, generation: int, prefix: str, limit: int
+) -> list[InventoryEntry]:
+    """
+    Get up to `limit` symbols of a generation of the source which start with the prefix.
+
+    Names are compared case-insensitively, and the shortest names are returned.
+    """
+    stmt = (
+        select(*(symbols_table.c[field] for field in InventoryEntry._fields))
+        .where(
+            and_(
+                symbols_table.c.source_id == source_id,
+                symbols_table.c.generation == generation,
+                func.lower(symbols_table.c.name).startswith(prefix.lower(), autoescape=True),
+            )
+        )
+        .order_by(func.length(symbols_table.c.name), symbols_table.c.name)
+        .limit(limit)
+    )
+    return [InventoryEntry(*row) for row in await db.execute(stmt)]
+
+
+async def load_generation(
+    db: AsyncSession, source_id: int, batches: AsyncIterable[bytes]
+) -> tuple[int, int]:
+    """
+    Write the encoded rows, which must all belong to the source, as a new generation of its symbols.
+
+    The new generation is not served until it is activated with `activate_generation`, so this
+    only inserts rows and never locks those which are being read. Batches are consumed lazily and
+    streamed to the database. If consuming them fails, nothing is written.
+
+    Returns the new generation and the amount of symbols written.
+    """
+    async with db.begin():
+        generation = (
+            await db.execute(select(models.symbol_generation_seq.next_value()))
+        ).scalar_one()
+        count = await copy_symbols(db, generation, batches)
+        await db.commit()
+    return generation, count
+
+
+async def activate_generation(db: AsyncSession, source_id: int, generation: int) -> bool:
+    """
+    Atomically make the provided generation the one served for the source.
+
+    This will not replace a newer generation, in which case False is returned. The modules of the
+    source are replaced along with the generation.
+    """
+    stmt = (
+        update(models.DocSource)
+        .where(
+            and_(
+                models.DocSource.id == source_id,
+                or_(
+                    models.DocSource.current_generation == None,  # noqa: E711
+                    models.DocSource.current_generation < generation,
+                ),
+            )
+        )
+        .values(current_generation=generation)
+        .execution_options(synchronize_session=False)
+    )
+    async with db.begin():
+        result = await db.execute(stmt)
+        activated = result.rowcount == 1  # type: ignore
+        if activated:
+            await store_modules(db, source_id, generation)
+        await db.commit()
+    return activated
+
+
+async def apply_diff(
+    db: AsyncSession, source_id: int, batches: AsyncIterable[bytes]
+) -> tuple[int, int, SymbolDiff]:
+    """
+    Update the current generation of the source's symbols in place to match the encoded rows.
+
+    The rows, which must all belong to the source, are staged, then compared by name, domain and
+    role against the stored symbols. Only symbols which were removed, added or had their priority,
+    uri or display name changed are written, all in one transaction so readers never observe a
+    partially applied diff. If the source has no current generation, one is created.
+
+    Returns the generation, the amount of staged rows, and the diff which was applied.
+    """
+    t = staging_table
+    s = symbols_table
+    async with db.begin():
+        staged = await stage_symbols(db, batches)
+
+        # lock the source only now, so concurrent refreshes are serialised without holding the
+        # lock for as long as the inventory takes to download
+        stmt = (
+            select(models.DocSource.current_generation)
+            .where(models.DocSource.id == source_id)
+            .with_for_update()
+        )
+        generation = (await db.execute(stmt)).scalar_one()
+        if generation is None:
+            generation = (
+                await db.execute(select(models.symbol_generation_seq.next_value()))
+            ).scalar_one()
+            await db.execute(
+                update(models.DocSource)
+                .where(models.DocSource.id == source_id)
+                .values(current_generation=generation)
+                .execution_options(synchronize_session=False)
+            )
+
+        current = and_(s.c.source_id == source_id, s.c.generation == generation)
+        same_key = and_(s.c.name == t.c.name, s.c.domain == t.c.domain, s.c.role == t.c.role)
+
+        removed = await db.execute(delete(s).where(and_(current, ~exists().where(same_key))))
+        changed = await db.execute(
+            update(s)
+            .where(
+                and_(
+                    current,
+                    same_key,
+                    or_(
+                        s.c.priority != t.c.priority,
+                        s.c.uri != t.c.uri,
+                        s.c.display_name.is_distinct_from(t.c.display_name),
+                    ),
+                )
+            )
+            .values(priority=t.c.priority, uri=t.c.uri, display_name=t.c.display_name)
+        )
+        added = await db.execute(
+            insert(s).from_select(
+                ["generation", *STAGING_COLUMNS],
+                select(literal(generation, BigInteger), *t.c).where(
+                    ~exists().where(and_(current, same_key))
+                ),
+            )
+        )
+        await store_modules(db, source_id, generation)
+        await db.commit()
+
+    diff = SymbolDiff(
+        added=added.rowcount,  # type: ignore
+        removed=removed.rowcount,  # type: ignore
+        changed=changed.rowcount,  # type: ignore
+    )
+    return generation, staged, diff
+
+
+async def record_refresh(
+    db: AsyncSession,
+    source_id: int,
+    diff: SymbolDiff | None,
+    validators: InventoryValidators,
+) -> None:
+    """
+    Store the outcome of a refresh on the source.
+
+    The diff is None if the inventory was unchanged, in which case only the validators are stored.
+    """
+    values: dict[str, Any] = {
+        "inventory_etag": validators.etag,
+        "inventory_last_modified": validators.last_modified,
+        "inventory_sha256": validators.sha256,
+    }
+    if diff is not None:
+        values.update(
+            last_refreshed_at=func.now(),
+            last_refresh_added=diff.added,
+            last_refresh_removed=diff.removed,
+            last_refresh_changed=diff.changed,
+        )
+    stmt = (
+        update(models.DocSource)
+        .where(models.DocSource.id == source_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    async with db.begin():
+        await db.execute(stmt)
+        await db.commit()
+
+
+async def claim_due_sources(
+    db: AsyncSession, *, limit: int, lease: timedelta
+) -> list[models.DocSource]:
+    """
+    Claim up to `limit` sources which are due to be refreshed.
+
+    Claimed sources are rescheduled `lease` into the future, so other schedulers skip them while
+    they are refreshed. Sources locked by another scheduler are skipped rather than waited on.
+    """
+    stmt = (
+        select(models.DocSource)
+        .where(
+            and_(
+                models.DocSource.inventory_url != None,  # noqa: E711
+                or_(
+                    models.DocSource.next_refresh_at == None,  # noqa: E711
+                    models.DocSource.next_refresh_at <= func.now(),
+                ),
+            )
+        )
+        .order_by(models.DocSource.next_refresh_at.asc().nullsfirst())
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    async with db.begin():
+        sources = list((await db.execute(stmt)).scalars())
+        if sources:
+            await db.execute(
+                update(models.DocSource)
+                .where(models.DocSource.id.in_([source.id for source in sources]))
+                .values(next_refresh_at=func.now() + lease)
+                .execution_options(synchronize_session=False)
+            )
+        await db.commit()
+    return sources
+
+
+async def schedule_refresh(
+    db: AsyncSession, source_id: int, *, delay: timedelta, error: str | None = None
+) -> None:
+    """
+    Schedule the next refresh of a source after one has finished.
+
+    If the refresh failed, the error is stored and the failure count of the source is increased,
+    otherwise the failure count is reset.
+    """
+    failures = models.DocSource.refresh_failures + 1 if error else 0
+    stmt = (
+        update(models.DocSource)
+        .where(models.DocSource.id == source_id)
+        .values(
+            next_refresh_at=func.now() + delay,
+            refresh_failures=failures,
+            last_refresh_error=error,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    async with db.begin():
+        await db.execute(stmt)
+        await db.commit()
+
+
+async def collect_old_generations(
+    db: AsyncSession, source_id: int, *, batch_size: int = GC_BATCH_SIZE
+) -> int:
+    """
+    Delete the symbols of every generation older than the source's current generation.
+
+    Rows are deleted in batches, each in their own short transaction, so the deletion never holds
+    many row locks at once. Returns the amount of deleted symbols.
+    """
+    current_generation = (
+        select(models.DocSource.current_generation)
+        .where(models.DocSource.id == source_id)
+        .scalar_subquery()
+    )
+    batch = (
+        select(models.DocSymbol.id)
+        .where(
+            and_(
+                models.DocSymbol.source_id == source_id,
+                models.DocSymbol.generation < current_generation,
+            )
+        )
+        .limit(batch_size)
+        .scalar_subquery()
+    )
+    stmt = (
+        delete(models.DocSymbol)
+        .where(models.DocSymbol.id.in_(batch))
+        .execution_options(synchronize_session=False)
+    )
+    total = 0
+    while True:
+        async with db.begin():
+            result = await db.execute(stmt)
+            await db.commit()
+        total += result.rowcount  # type: ignore
+        if result.rowcount < batch_size:  # type: ignore
+            return total
@@ -0,0 +1,36 @@
+"""add doc package listing indexes
+
+Revision ID: 58aef9bc2f10
+Revises: b4e1c9d27f05
+Create Date: 2026-10-18 20:14:40.411489
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "58aef9bc2f10"
+down_revision = "b4e1c9d27f05"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_doc_packages_programming_language_id",
+        "doc_packages",
+        ["programming_language", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_doc_packages_lower_name",
+        "doc_packages",
+        [sa.text("lower(name) text_pattern_ops")],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_doc_packages_lower_name", table_name="doc_packages")
+    op.drop_index("ix_doc_packages_programming_language_id", table_name="doc_packages")
@@ -0,0 +1,58 @@
+"""add symbol generations
+
+Revision ID: 5be3c7a1d82f
+Revises: a9cf21e0955e
+Create Date: 2026-10-18 11:24:09.502117
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "5be3c7a1d82f"
+down_revision = "a9cf21e0955e"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(sa.schema.CreateSequence(sa.Sequence("doc_symbols_generation_seq")))
+    op.add_column("doc_sources", sa.Column("current_generation", sa.BigInteger(), nullable=True))
+    # existing symbols become generation 0, which is served by every source that has symbols
+    op.add_column(
+        "doc_symbols",
+        sa.Column("generation", sa.BigInteger(), nullable=False, server_default="0"),
+    )
+    op.alter_column("doc_symbols", "generation", server_default=None)
+    op.execute(
+        "UPDATE doc_sources SET current_generation = 0 "
+        "WHERE EXISTS (SELECT 1 FROM doc_symbols WHERE doc_symbols.source_id = doc_sources.id)"
+    )
+
+    op.drop_index("ix_doc_symbols_source_id_name", table_name="doc_symbols")
+    op.create_index(
+        "ix_doc_symbols_source_id_generation_name",
+        "doc_symbols",
+        ["source_id", "generation", "name"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_doc_symbols_source_id_generation_name", table_name="doc_symbols")
+    # only the current generation of each source is kept
+    op.execute(
+        "DELETE FROM doc_symbols USING doc_sources "
+        "WHERE doc_symbols.source_id = doc_sources.id "
+        "AND doc_symbols.generation IS DISTINCT FROM doc_sources.current_generation"
+    )
+    op.create_index(
+        "ix_doc_symbols_source_id_name",
+        "doc_symbols",
+        ["source_id", "name"],
+        unique=False,
+    )
+    op.drop_column("doc_symbols", "generation")
+    op.drop_column("doc_sources", "current_generation")
+    op.execute(sa.schema.DropSequence(sa.Sequence("doc_symbols_generation_seq")))
@@ -1,4 +1,18 @@
-from sage.core.database.models.docs import DocPackage, DocSource
+from sage.core.database.models.docs import (
+    DocModule,
+    DocPackage,
+    DocSource,
+    DocSymbol,
+    DocTableVersion,
+    symbol_generation_seq,
+)
 
 
-__all__ = ("DocPackage", "DocSource")
+__all__ = (
+    "DocModule",
+    "DocPackage",
+    "DocSource",
+    "DocSymbol",
+    "DocTableVersion",
+    "symbol_generation_seq",
+)
@@ -1,13 +1,38 @@
 from typing import Any
 
-from sqlalchemy import Boolean, Column, Enum, ForeignKey, Index, Integer, String
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Index,
+    Integer,
+    Sequence,
+    String,
+    Text,
+    UniqueConstraint,
+    text,
+)
 from sqlalchemy.orm import relationship
 
 from sage.core.database.models.base import Base
 from sage.enums import LanguageCode, ProgrammingLanguage
 
 
-__all__ = ("DocPackage", "DocSource")
+__all__ = (
+    "DocModule",
+    "DocPackage",
+    "DocSource",
+    "DocSymbol",
+    "DocTableVersion",
+    "symbol_generation_seq",
+)
+
+
+# generations are allocated globally so a newer load of a source always has a larger number
+symbol_generation_seq = Sequence("doc_symbols_generation_seq", metadata=Base.metadata)
 
 
 # todo: CheckConstraint for url data
@@ -15,6 +40,14 @@ class DocPackage(Base):
     """Represents a Package which can have multiple sources."""
 
     __tablename__ = "doc_packages"
+    __table_args__ = (
+        # filtering by language pages through the matching packages in order of id
+        Index("ix_doc_packages_programming_language_id", "programming_language", "id"),
+        # the pattern ops support case-insensitive prefix filters regardless of the collation
+        Index("ix_doc_packages_lower_name", text("lower(name) text_pattern_ops")),
+        # packages are imported by name
+        UniqueConstraint("name", name="uq_doc_packages_name"),
+    )
 
     id = Column(Integer, primary_key=True)
     name = Column(String(100), nullable=False)
@@ -51,6 +84,15 @@ class DocSource(Base):
             unique=True,
             postgresql_where=Column("default"),
         ),
+        Index(
+            "ix_doc_sources_next_refresh_at",
+            "next_refresh_at",
+            postgresql_where=Column("inventory_url").isnot(None),
+        ),
+        # sources are imported by the inventory they serve
+        UniqueConstraint(
+            "package_id", "inventory_url", name="uq_doc_sources_package_id_inventory_url"
+        ),
     )
 
     id = Column(Integer, primary_key=True)
@@ -66,6 +108,23 @@ class DocSource(Base):
     human_friendly_url = Column(String(250), nullable=False)
     version = Column(String(30), nullable=True)
     language_code = Column(Enum(LanguageCode), nullable=False)
+    # the generation of doc_symbols which is currently served, null if never ingested
+    current_generation = Column(BigInteger, nullable=True)
+    # the outcome of the most recent successful refresh
+    last_refreshed_at = Column(DateTime(timezone=True), nullable=True)
+    last_refresh_added = Column(Integer, nullable=True)
+    last_refresh_removed = Column(Integer, nullable=True)
+    last_refresh_changed = Column(Integer, nullable=True)
+    # validators of the last fetched inventory, used to skip unchanged inventories
+    inventory_etag = Column(String(250), nullable=True)
+    inventory_last_modified = Column(String(50), nullable=True)
+    inventory_sha256 = Column(String(64), nullable=True)
+    # seconds between scheduled refreshes, null to use the configured default
+    refresh_interval = Column(Integer, nullable=True)
+    # null if the source has never been scheduled, which makes it due immediately
+    next_refresh_at = Column(DateTime(timezone=True), nullable=True)
+    refresh_failures = Column(Integer, default=0, nullable=False)
+    last_refresh_error = Column(Text, nullable=True)
 
     def to_dict(self, include_package: bool = False) -> dict[str, Any]:
         """Convert the source to a dict representation which is ready for json serialisation."""
@@ -82,3 +141,92 @@ class DocSource(Base):
             # note: this requires await or cached
             resp["package"] = self.package
         return resp
+
+    def to_inventory_dict(self) -> dict[str, Any]:
+        """Convert the inventory state of the source to a dict ready for json serialisation."""
+        last_refresh = None
+        if self.last_refreshed_at is not None:
+            last_refresh = {
+                "refreshed_at": self.last_refreshed_at,
+                "added": self.last_refresh_added,
+                "removed": self.last_refresh_removed,
+                "changed": self.last_refresh_changed,
+            }
+        return {
+            "source_id": self.id,
+            "inventory_url": self.inventory_url,
+            "current_generation": self.current_generation,
+            "last_refresh": last_refresh,
+            "etag": self.inventory_etag,
+            "last_modified": self.inventory_last_modified,
+            "sha256": self.inventory_sha256,
+            "refresh_interval": self.refresh_interval,
+            "next_refresh_at": self.next_refresh_at,
+            "refresh_failures": self.refresh_failures,
+            "last_refresh_error": self.last_refresh_error,
+        }
+
+
+class DocSymbol(Base):
+    """Represents a single inventory entry belonging to a DocSource."""
+
+    __tablename__ = "doc_symbols"
+    __table_args__ = (
+        Index("ix_doc_symbols_source_id_generation_name", "source_id", "generation", "name"),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    source_id = Column(
+        Integer,
+        ForeignKey("doc_sources.id", ondelete="CASCADE", name="doc_symbols_source_id_fkey"),
+        nullable=False,
+    )
+    generation = Column(BigInteger, nullable=False)
+    name = Column(Text, nullable=False)
+    domain = Column(Text, nullable=False)
+    role = Column(Text, nullable=False)
+    priority = Column(Integer, nullable=False)
+    # stored exactly as in the inventory, so a trailing `$` still stands in for the name
+    uri = Column(Text, nullable=False)
+    # null when the display name is the same as the name
+    display_name = Column(Text, nullable=True)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert the symbol to a dict representation which is ready for json serialisation."""
+        return {
+            "name": self.name,
+            "domain": self.domain,
+            "role": self.role,
+            "priority": self.priority,
+            "uri": self.uri,
+            "display_name": self.display_name,
+        }
+
+
+class DocModule(Base):
+    """Represents a top-level python module documented by a DocSource."""
+
+    __tablename__ = "doc_modules"
+    __table_args__ = (Index("ix_doc_modules_name", "name"),)
+
+    source_id = Column(
+        Integer,
+        ForeignKey("doc_sources.id", ondelete="CASCADE", name="doc_modules_source_id_fkey"),
+        primary_key=True,
+    )
+    name = Column(Text, primary_key=True)
+    # how many python symbols of the source are within the module
+    symbols = Column(Integer, nullable=False)
+
+
+class DocTableVersion(Base):
+    """
+    Counts the changes made to a docs table, for use as a cheap version of responses.
+
+    The counters are incremented by triggers, within the transaction making the change.
+    """
+
+    __tablename__ = "doc_table_versions"
+
+    name = Column(Text, primary_key=True)
+    version = Column(BigInteger, default=0, nullable=False)
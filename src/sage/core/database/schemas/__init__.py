@@ -5,6 +5,8 @@ from sage.core.database.schemas.docs import (
     DocSource,
     DocSourceCreationRequest,
     DocSourcePatchRequest,
+    SymbolReference,
+    SymbolResolutionRequest,
 )
 
 
@@ -15,4 +17,6 @@ __all__ = (
     "DocSource",
     "DocSourceCreationRequest",
     "DocSourcePatchRequest",
+    "SymbolReference",
+    "SymbolResolutionRequest",
 )
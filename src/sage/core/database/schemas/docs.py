@@ -13,6 +13,8 @@ __all__ = (
     "DocPackageCreationRequest",
     "DocSource",
     "DocSourceCreationRequest",
+    "SymbolReference",
+    "SymbolResolutionRequest",
 )
 
 
@@ -123,6 +125,7 @@ class DocSourcePatchRequest(DocSourceBase):
 
     preview: bool | None = None
     version: str | None = Field(regex="^[0-9a-zA-Z-.]$")
+    refresh_interval: int | None = Field(None, ge=60)
 
 
 # this name is ridiculous.
@@ -162,6 +165,29 @@ class DocPackageCreationRequest(DocPackageBase):
         }
 
 
+class SymbolReference(BaseModel):
+    """A symbol of the default source of a package."""
+
+    package: str = Field(max_length=100)
+    name: str = Field(min_length=1, max_length=500)
+
+
+class SymbolResolutionRequest(BaseModel):
+    """Symbols to resolve in one request."""
+
+    symbols: Annotated[list[SymbolReference], Field(min_items=1, max_items=100)]
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "symbols": [
+                    {"package": "disnake", "name": "disnake.Embed"},
+                    {"package": "python", "name": "asyncio.gather"},
+                ]
+            }
+        }
+
+
 DocPackage.update_forward_refs()
 DocPackageCreationRequest.update_forward_refs()
 DocSourceCreationWithinDocPackageCreationRequest.update_forward_refs()
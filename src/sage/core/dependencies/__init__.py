@@ -1,5 +1,15 @@
+from sage.core.dependencies.cache import GET_RESPONSE_CACHE
 from sage.core.dependencies.database import GET_SESSION
+from sage.core.dependencies.http import GET_HTTP_CLIENT
+from sage.core.dependencies.index import GET_INVENTORY_FILES, GET_SYMBOL_INDEXES
 from sage.core.dependencies.security import REQUIRE_ADMIN
 
 
-__all__ = ("GET_SESSION", "REQUIRE_ADMIN")
+__all__ = (
+    "GET_HTTP_CLIENT",
+    "GET_INVENTORY_FILES",
+    "GET_RESPONSE_CACHE",
+    "GET_SESSION",
+    "GET_SYMBOL_INDEXES",
+    "REQUIRE_ADMIN",
+)
@@ -0,0 +1,6 @@
+from fastapi import Depends
+
+from sage.cache import get_response_cache
+
+
+GET_RESPONSE_CACHE = Depends(get_response_cache)
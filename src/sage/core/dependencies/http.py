@@ -0,0 +1,6 @@
+from fastapi import Depends
+
+from sage.http import get_http_client
+
+
+GET_HTTP_CLIENT = Depends(get_http_client)
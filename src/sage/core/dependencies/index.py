@@ -0,0 +1,8 @@
+from fastapi import Depends
+
+from sage.core.inventory.export import get_inventory_files
+from sage.core.inventory.index import get_symbol_indexes
+
+
+GET_INVENTORY_FILES = Depends(get_inventory_files)
+GET_SYMBOL_INDEXES = Depends(get_symbol_indexes)
@@ -0,0 +1,18 @@
+"""Fetching and parsing of Sphinx inventories."""
+
+from sage.core.inventory.parser import (
+    InvalidInventory,
+    InventoryEntry,
+    InventoryParser,
+    aiter_inventory,
+    iter_inventory,
+)
+
+
+__all__ = (
+    "InvalidInventory",
+    "InventoryEntry",
+    "InventoryParser",
+    "aiter_inventory",
+    "iter_inventory",
+)
@@ -0,0 +1,114 @@
+"""Compact in-memory storage of inventory entries, with one array per field."""
+
+from array import array
+from typing import Iterable, Iterator, overload
+
+from sage.core.inventory.parser import InventoryEntry
+
+
+__all__ = ("EntryColumns", "split_uri")
+
+
+def split_uri(uri: str) -> tuple[str, str]:
+    """
+    Split a uri into the page and anchor it points to.
+
+    Inventories repeat the page of a uri for every object on it, and the anchor is often just
+    the `$` shorthand for the name, so pages are shared between entries and anchors are not.
+    """
+    page, sep, anchor = uri.rpartition("#")
+    if not sep:
+        return uri, ""
+    return page + sep, anchor
+
+
+class EntryColumns:
+    """
+    A read-only sequence of inventory entries, stored column by column.
+
+    Names, anchors and display names are concatenated into one string and found by their offsets,
+    while domains, roles and pages are interned and stored as codes. An entry only costs a few
+    dozen bytes besides the characters of its strings, instead of several objects each.
+    Entries are converted back to `InventoryEntry` tuples when they are accessed.
+    """
+
+    def __init__(self, entries: Iterable[InventoryEntry]) -> None:
+        self._types: list[tuple[str, str]] = []
+        self._pages: list[str] = []
+        type_codes: dict[tuple[str, str], int] = {}
+        page_codes: dict[str, int] = {}
+
+        self._type_codes = array("H")
+        self._page_codes = array("I")
+        self._priorities = array("i")
+        self._has_display_name = array("B")
+        # each string field is one run of the text, and every run is delimited by its offset
+        self._offsets = array("I", [0])
+        text: list[str] = []
+        length = 0
+
+        for entry in entries:
+            type = (entry.domain, entry.role)
+            type_code = type_codes.get(type)
+            if type_code is None:
+                type_code = type_codes[type] = len(self._types)
+                self._types.append(type)
+            page, anchor = split_uri(entry.uri)
+            page_code = page_codes.get(page)
+            if page_code is None:
+                page_code = page_codes[page] = len(self._pages)
+                self._pages.append(page)
+
+            self._type_codes.append(type_code)
+            self._page_codes.append(page_code)
+            self._priorities.append(entry.priority)
+            self._has_display_name.append(entry.display_name is not None)
+            for string in (entry.name, anchor, entry.display_name or ""):
+                text.append(string)
+                length += len(string)
+                self._offsets.append(length)
+
+        self._text = "".join(text)
+
+    def __len__(self) -> int:
+        return len(self._type_codes)
+
+    def _run(self, run: int) -> str:
+        return self._text[self._offsets[run] : self._offsets[run + 1]]
+
+    def name(self, position: int) -> str:
+        """Get the name of the entry at the position, without converting the whole entry."""
+        return self._run(position * 3)
+
+    def _entry(self, position: int) -> InventoryEntry:
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("entry index out of range")
+        domain, role = self._types[self._type_codes[position]]
+        run = position * 3
+        return InventoryEntry(
+            name=self._run(run),
+            domain=domain,
+            role=role,
+            priority=self._priorities[position],
+            uri=self._pages[self._page_codes[position]] + self._run(run + 1),
+            display_name=self._run(run + 2) if self._has_display_name[position] else None,
+        )
+
+    @overload
+    def __getitem__(self, position: int) -> InventoryEntry:
+        ...
+
+    @overload
+    def __getitem__(self, position: slice) -> list[InventoryEntry]:
+        ...
+
+    def __getitem__(self, position: int | slice) -> InventoryEntry | list[InventoryEntry]:
+        if isinstance(position, slice):
+            return [self._entry(i) for i in range(*position.indices(len(self)))]
+        return self._entry(position)
+
+    def __iter__(self) -> Iterator[InventoryEntry]:
+        for position in range(len(self)):
+            yield self._entry(position)
@@ -0,0 +1,171 @@
+"""
+Offloading of inventory parsing, which is CPU-bound, away from the event loop.
+
+Inventories are parsed straight into batches of rows encoded in PostgreSQL's binary COPY format.
+Each batch is a single bytes object, so a batch is cheap to return from a worker process and can
+be passed to the database as is, without the event loop touching every entry.
+"""
+
+import asyncio
+import concurrent.futures
+import multiprocessing
+import struct
+from typing import AsyncIterator, Iterable, Iterator
+
+from sage.core.inventory.parser import InventoryEntry, InventoryParser
+from sage.enums import ParseMode
+from sage.settings import InventorySettings, get_settings
+
+
+__all__ = (
+    "COPY_HEADER",
+    "COPY_TRAILER",
+    "ParseExecutor",
+    "encode_rows",
+    "get_parse_executor",
+    "iter_copy_batches",
+    "shutdown_parse_executor",
+)
+
+
+# signature, flags and header extension length of the binary COPY format
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+COPY_TRAILER = struct.pack("!h", -1)
+# how many entries are encoded into each batch
+BATCH_SIZE = 5000
+# how much of the compressed body is decompressed at once
+CHUNK_SIZE = 64 * 1024
+
+_FIELD_COUNT = struct.pack("!h", 7)
+_INT_FIELD = struct.Struct("!ii")
+_LENGTH = struct.Struct("!i")
+_NULL = _LENGTH.pack(-1)
+
+
+def _text(value: str | None) -> bytes:
+    if value is None:
+        return _NULL
+    data = value.encode()
+    return _LENGTH.pack(len(data)) + data
+
+
+def encode_rows(source_id: int, entries: Iterable[InventoryEntry]) -> bytes:
+    """
+    Encode entries as binary COPY rows for the doc_symbols staging columns.
+
+    The rows are not preceded by the COPY header or followed by the trailer.
+    """
+    source = _INT_FIELD.pack(4, source_id)
+    parts = []
+    for name, domain, role, priority, uri, display_name in entries:
+        parts.append(
+            b"".join(
+                (
+                    _FIELD_COUNT,
+                    source,
+                    _text(name),
+                    _text(domain),
+                    _text(role),
+                    _INT_FIELD.pack(4, priority),
+                    _text(uri),
+                    _text(display_name),
+                )
+            )
+        )
+    return b"".join(parts)
+
+
+def iter_chunks(body: bytes) -> Iterator[bytes]:
+    """Provide the body in chunks, so it can be decompressed incrementally."""
+    view = memoryview(body)
+    for start in range(0, len(view), CHUNK_SIZE):
+        yield view[start : start + CHUNK_SIZE].tobytes()
+
+
+def iter_copy_batches(body: bytes, source_id: int, batch_size: int = BATCH_SIZE) -> Iterator[bytes]:
+    """Parse a compressed inventory body into batches of binary COPY rows."""
+    parser = InventoryParser()
+    batch: list[InventoryEntry] = []
+    for chunk in iter_chunks(body):
+        for entry in parser.feed(chunk):
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                yield encode_rows(source_id, batch)
+                batch.clear()
+    batch.extend(parser.close())
+    if batch:
+        yield encode_rows(source_id, batch)
+
+
+def parse_copy_batches(body: bytes, source_id: int) -> list[bytes]:
+    """Parse a compressed inventory body into every batch at once, to be run in a process."""
+    return list(iter_copy_batches(body, source_id))
+
+
+class ParseExecutor:
+    """
+    Runs inventory parsing either inline, in a thread pool or in a process pool.
+
+    Inline parsing runs on the event loop but yields to it between batches. Thread pools keep
+    the event loop free aside from contention on the GIL, while process pools avoid both at the
+    cost of holding every encoded batch of an inventory in memory at once.
+    """
+
+    def __init__(self, mode: ParseMode, workers: int | None = None) -> None:
+        self.mode = mode
+        self._pool: concurrent.futures.Executor | None = None
+        if mode is ParseMode.thread:
+            self._pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="inventory-parser"
+            )
+        elif mode is ParseMode.process:
+            # forking a process with a running event loop and open connections is unsafe
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+
+    async def copy_batches(self, body: bytes, source_id: int) -> AsyncIterator[bytes]:
+        """Parse the compressed inventory body into batches of binary COPY rows."""
+        loop = asyncio.get_running_loop()
+        if self.mode is ParseMode.process:
+            for batch in await loop.run_in_executor(
+                self._pool, parse_copy_batches, body, source_id
+            ):
+                yield batch
+            return
+
+        batches = iter_copy_batches(body, source_id)
+        while True:
+            if self.mode is ParseMode.thread:
+                batch = await loop.run_in_executor(self._pool, next, batches, None)
+            else:
+                batch = next(batches, None)
+                await asyncio.sleep(0)
+            if batch is None:
+                return
+            yield batch
+
+    def shutdown(self) -> None:
+        """Shut down the pool, if there is one."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_PARSE_EXECUTOR: ParseExecutor | None = None
+
+
+def get_parse_executor(settings: InventorySettings | None = None) -> ParseExecutor:
+    """Get the global parse executor, creating it on first use."""
+    global _PARSE_EXECUTOR
+    if _PARSE_EXECUTOR is None:
+        settings = settings or get_settings().inventory
+        _PARSE_EXECUTOR = ParseExecutor(settings.parse_mode, settings.parse_workers)
+    return _PARSE_EXECUTOR
+
+
+def shutdown_parse_executor() -> None:
+    """Shut down the global parse executor, if it was created."""
+    global _PARSE_EXECUTOR
+    if _PARSE_EXECUTOR is not None:
+        _PARSE_EXECUTOR.shutdown()
+        _PARSE_EXECUTOR = None
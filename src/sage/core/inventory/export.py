@@ -0,0 +1,124 @@
+"""Generation of version 2 Sphinx ``objects.inv`` inventories from stored symbols."""
+
+import asyncio
+import hashlib
+import logging
+import time
+import zlib
+from collections import OrderedDict
+from typing import Iterable, NamedTuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from sage.cache import make_etag
+from sage.core.database.crud import docs as crud_docs
+from sage.core.database.crud import symbols as crud_symbols
+from sage.core.inventory.index import SourceVersion
+from sage.core.inventory.parser import InventoryEntry
+from sage.settings import IndexSettings, get_settings
+
+
+__all__ = ("InventoryFile", "InventoryFiles", "encode_inventory", "get_inventory_files")
+
+log = logging.getLogger(__name__)
+
+COMPRESSION_LEVEL = 9
+
+
+def encode_inventory(project: str, version: str, entries: Iterable[InventoryEntry]) -> bytes:
+    """Encode entries as a compressed inventory, in the same format as Sphinx writes them."""
+    header = (
+        "# Sphinx inventory version 2\n"
+        f"# Project: {project}\n"
+        f"# Version: {version}\n"
+        "# The remainder of this file is compressed using zlib.\n"
+    )
+    # sorted so the same symbols always produce the same file
+    body = "".join(
+        f"{entry.name} {entry.domain}:{entry.role} {entry.priority} {entry.uri} "
+        f"{entry.display_name or '-'}\n"
+        for entry in sorted(entries)
+    )
+    return header.encode() + zlib.compress(body.encode(), COMPRESSION_LEVEL)
+
+
+class InventoryFile(NamedTuple):
+    """A compressed inventory, and the etag of its content."""
+
+    content: bytes
+    etag: str
+
+
+class InventoryFiles:
+    """
+    Compressed inventories of sources, generated from their stored symbols.
+
+    An inventory is generated once per version of the symbols of its source, and served from
+    memory until the source serves another version. Only the inventories of the `max_sources`
+    most recently requested sources are kept.
+    """
+
+    def __init__(self, settings: IndexSettings) -> None:
+        self.settings = settings
+        self._files: OrderedDict[int, tuple[SourceVersion, InventoryFile]] = OrderedDict()
+        # generating is expensive, so concurrent requests for a missing file wait for one another
+        self._lock = asyncio.Lock()
+
+    def _cached(self, version: SourceVersion) -> InventoryFile | None:
+        cached = self._files.get(version.source_id)
+        if cached is None or cached[0] != version:
+            return None
+        self._files.move_to_end(version.source_id)
+        return cached[1]
+
+    async def get(self, db: AsyncSession, version: SourceVersion) -> InventoryFile:
+        """Get the compressed inventory of a version of the symbols of the source."""
+        file = self._cached(version)
+        if file is not None:
+            return file
+
+        async with self._lock:
+            file = self._cached(version)
+            if file is not None:
+                return file
+            start = time.perf_counter()
+            entries: list[InventoryEntry] = []
+            async with db.begin():
+                source = await crud_docs.get_doc_source(db, version.source_id)
+                if version.generation is not None:
+                    entries = await crud_symbols.get_symbols(
+                        db, version.source_id, version.generation
+                    )
+            project = source.package.name if source is not None else ""
+            project_version = (source.version or "") if source is not None else ""
+            content = await asyncio.to_thread(encode_inventory, project, project_version, entries)
+            file = InventoryFile(content, make_etag(hashlib.sha256(content).digest()))
+            self._files[version.source_id] = (version, file)
+            self._files.move_to_end(version.source_id)
+            while len(self._files) > self.settings.max_sources:
+                self._files.popitem(last=False)
+            log.debug(
+                "Generated inventory of %d symbols for source %d in %.2f seconds",
+                len(entries),
+                version.source_id,
+                time.perf_counter() - start,
+            )
+            return file
+
+    def invalidate(self, source_id: int | None = None) -> None:
+        """Drop the inventory of a source, or of every source."""
+        if source_id is None:
+            self._files.clear()
+        else:
+            self._files.pop(source_id, None)
+
+
+_INVENTORY_FILES: InventoryFiles | None = None
+
+
+def get_inventory_files() -> InventoryFiles:
+    """Get the global inventory files, creating them on first use."""
+    global _INVENTORY_FILES
+    if _INVENTORY_FILES is None:
+        _INVENTORY_FILES = InventoryFiles(get_settings().index)
+    return _INVENTORY_FILES
@@ -0,0 +1,71 @@
+"""Conditional fetching of inventories."""
+
+import hashlib
+from typing import NamedTuple
+
+import httpx
+
+from sage.core.inventory.parser import InvalidInventory
+from sage.http import HTTPClient
+
+
+__all__ = ("FetchResult", "InventoryValidators", "fetch_inventory")
+
+
+# compressed inventories of even the largest projects are a few megabytes
+MAX_INVENTORY_SIZE = 64 * 1024 * 1024
+
+
+class InventoryValidators(NamedTuple):
+    """Identifies a fetched version of an inventory, to avoid fetching or parsing it again."""
+
+    etag: str | None = None
+    last_modified: str | None = None
+    # hex digest of the body as it was received
+    sha256: str | None = None
+
+
+class FetchResult(NamedTuple):
+    """The outcome of fetching an inventory."""
+
+    validators: InventoryValidators
+    # None if the inventory is unchanged from the validators it was fetched with
+    body: bytes | None
+
+
+async def fetch_inventory(
+    client: HTTPClient,
+    url: str,
+    validators: InventoryValidators = InventoryValidators(),  # noqa: B008
+) -> FetchResult:
+    """
+    Fetch the raw inventory at the url, unless it is unchanged from the provided validators.
+
+    The stored ETag and Last-Modified values are sent as If-None-Match and If-Modified-Since. If
+    the server does not answer with 304 Not Modified, the body is still compared to the stored
+    hash, as many documentation hosts do not support conditional requests.
+    """
+    headers = {}
+    if validators.etag:
+        headers["If-None-Match"] = validators.etag
+    if validators.last_modified:
+        headers["If-Modified-Since"] = validators.last_modified
+
+    async with client.stream("GET", url, headers=headers) as response:
+        if response.status_code == httpx.codes.NOT_MODIFIED:
+            return FetchResult(validators, None)
+        response.raise_for_status()
+        body = bytearray()
+        async for chunk in response.aiter_bytes():
+            body += chunk
+            if len(body) > MAX_INVENTORY_SIZE:
+                raise InvalidInventory(f"Inventory is larger than {MAX_INVENTORY_SIZE} bytes.")
+
+    new_validators = InventoryValidators(
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+        sha256=hashlib.sha256(body).hexdigest(),
+    )
+    if new_validators.sha256 == validators.sha256:
+        return FetchResult(new_validators, None)
+    return FetchResult(new_validators, bytes(body))
@@ -0,0 +1,604 @@
+"""In-process indexes of the symbols of sources, which serve lookups without the database."""
+
+import asyncio
+import bisect
+import heapq
+import logging
+import time
+from array import array
+from collections import Counter, OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, NamedTuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from sage.core.database import models
+from sage.core.database.crud import docs as crud_docs
+from sage.core.database.crud import symbols as crud_symbols
+from sage.core.dependencies.database import SessionLocal
+from sage.core.inventory.columns import EntryColumns
+from sage.core.inventory.mapped import InvalidIndexFile, MappedIndex, write_index_file
+from sage.core.inventory.parser import InventoryEntry
+from sage.settings import IndexSettings, get_settings
+
+
+__all__ = (
+    "ModuleOwner",
+    "SourceVersion",
+    "SymbolIndex",
+    "SymbolIndexes",
+    "get_symbol_indexes",
+    "rank",
+    "symbol_to_dict",
+    "symbol_url",
+)
+
+log = logging.getLogger(__name__)
+
+# lower ranks are preferred when several symbols share a name, or for completions
+DOMAIN_RANKS = {"py": 0, "std": 2}
+DEFAULT_DOMAIN_RANK = 1
+# the roles of objects which are usually looked up directly, rather than through their parent
+TOP_LEVEL_ROLES = frozenset({"module", "class", "function", "exception", "data"})
+# lengths beyond this are ranked as equally long
+MAX_RANKED_LENGTH = 0xFFFF
+# sorts after every character, to find the end of a range of keys with a prefix
+MAX_CHARACTER = "\U0010ffff"
+# at most this many postings are read for a fuzzy search, rarest trigrams first, so the time a
+# search takes is bounded no matter how many names share the trigrams of the query
+MAX_FUZZY_POSTINGS = 20_000
+# the names sharing the most trigrams with the query which are scored exactly
+FUZZY_CANDIDATES = 200
+
+
+class SourceVersion(NamedTuple):
+    """Identifies the symbols a source served when it was last checked."""
+
+    source_id: int
+    # None if the source has never been ingested
+    generation: int | None
+    # incremental refreshes change a generation in place, so this is part of the version
+    refreshed_at: datetime | None
+    # the url inventory uris are relative to
+    base_url: str
+
+    @classmethod
+    def from_source(cls, source: models.DocSource) -> "SourceVersion":
+        """Get the version of the symbols the source currently serves."""
+        return cls(
+            source_id=source.id,  # type: ignore
+            generation=source.current_generation,  # type: ignore
+            refreshed_at=source.last_refreshed_at,  # type: ignore
+            base_url=source.human_friendly_url,  # type: ignore
+        )
+
+
+class ModuleOwner(NamedTuple):
+    """A package whose default source documents a top-level python module."""
+
+    package: str
+    package_id: int
+    source_id: int
+    # how many symbols the source documents within the module
+    symbols: int
+
+
+def rank(entry: InventoryEntry) -> tuple[int, int, int]:
+    """Get the sort key of an entry, preferring python objects and entries of higher priority."""
+    domain = DOMAIN_RANKS.get(entry.domain, DEFAULT_DOMAIN_RANK)
+    role = 0 if entry.role in TOP_LEVEL_ROLES else 1
+    # a negative priority hides an entry from search, so it is ranked below every other priority
+    priority = entry.priority if entry.priority >= 0 else 3
+    return domain, role, priority
+
+
+def completion_score(entry: InventoryEntry) -> int:
+    """Pack the rank and length of an entry into an int, with lower scores completed first."""
+    domain, role, priority = rank(entry)
+    return ((domain * 2 + role) * 4 + priority) << 16 | min(len(entry.name), MAX_RANKED_LENGTH)
+
+
+def symbol_url(version: SourceVersion, entry: InventoryEntry) -> str:
+    """Get the absolute url of an entry of the source."""
+    uri = entry.uri
+    # a trailing `$` stands in for the name, to keep inventories small
+    if uri.endswith("$"):
+        uri = uri[:-1] + entry.name
+    return f"{version.base_url.rstrip('/')}/{uri}"
+
+
+def symbol_to_dict(version: SourceVersion, entry: InventoryEntry) -> dict[str, Any]:
+    """Convert an entry of the source to a dict ready for json serialisation, with its url."""
+    return {
+        "name": entry.name,
+        "domain": entry.domain,
+        "role": entry.role,
+        "priority": entry.priority,
+        "display_name": entry.display_name or entry.name,
+        "url": symbol_url(version, entry),
+    }
+
+
+def trigrams(text: str) -> set[str]:
+    """Get the trigrams of the text, padded the same way as pg_trgm to weigh its start higher."""
+    padded = f"  {text.lower()} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class SymbolIndex:
+    """
+    Every symbol of one version of a source, hashed by name and sorted for prefix completion.
+
+    Symbols are stored in columns sorted by name and then rank, so the symbols with a name are one
+    contiguous range found by binary search.
+
+    For completion, the names are sorted case-insensitively, so the names with a prefix are one
+    contiguous range as well. A segment tree over that order holds the position of
+    the best scored name within each range, so the top `k` names of any range are found in
+    O(k log n) without visiting every name with the prefix.
+
+    For fuzzy search, an inverted index maps each trigram to the positions of the names with it.
+    """
+
+    def __init__(self, version: SourceVersion, entries: Iterable[InventoryEntry]) -> None:
+        self.version = version
+        self._entries = EntryColumns(sorted(entries, key=lambda entry: (entry.name, rank(entry))))
+        # the position of the first symbol with each name, and the amount of symbols at the end
+        self._starts = array("I")
+        previous = None
+        for position in range(len(self._entries)):
+            name = self._entries.name(position)
+            if name != previous:
+                self._starts.append(position)
+                previous = name
+        self._starts.append(len(self._entries))
+
+        # the names, in case-insensitive order
+        self._order = array(
+            "I", sorted(range(len(self)), key=lambda name: self._name(name).lower())
+        )
+        self._scores = array("q", (completion_score(self._best(p)) for p in range(len(self))))
+        self._tree = self._build_tree()
+        # the trigram index is only built once it is first searched, as it is slow to build
+        self._postings: dict[str, array] | None = None
+        self._trigram_counts = array("H")
+        self.trigram_lock = asyncio.Lock()
+
+    def _build_tree(self) -> array:
+        """Build the segment tree, with the leaves at [n, 2n) and node i covering 2i and 2i + 1."""
+        size = len(self)
+        tree = array("q", [0]) * (2 * size)
+        tree[size:] = array("q", range(size))
+        scores = self._scores
+        for node in range(size - 1, 0, -1):
+            left, right = tree[2 * node], tree[2 * node + 1]
+            tree[node] = left if scores[left] <= scores[right] else right
+        return tree
+
+    def __len__(self) -> int:
+        return len(self._starts) - 1
+
+    def _name(self, name: int) -> str:
+        return self._entries.name(self._starts[name])
+
+    def _key(self, position: int) -> str:
+        """Get the lowercase name at the position of the case-insensitive order."""
+        return self._name(self._order[position]).lower()
+
+    def _best(self, position: int) -> InventoryEntry:
+        """Get the best symbol of the name at the position of the case-insensitive order."""
+        return self._entries[self._starts[self._order[position]]]
+
+    def entries(self) -> Iterator[InventoryEntry]:
+        """Iterate over every symbol, sorted by name and then by rank."""
+        return iter(self._entries)
+
+    @property
+    def has_trigrams(self) -> bool:
+        """Whether the trigram index used for fuzzy search has been built."""
+        return self._postings is not None
+
+    def build_trigrams(self) -> None:
+        """Build the trigram index used for fuzzy search."""
+        postings: dict[str, array] = {}
+        counts = array("H")
+        for position in range(len(self)):
+            grams = trigrams(self._key(position))
+            counts.append(min(len(grams), 0xFFFF))
+            for gram in grams:
+                gram_postings = postings.get(gram)
+                if gram_postings is None:
+                    gram_postings = postings[gram] = array("i")
+                gram_postings.append(position)
+        self._trigram_counts = counts
+        self._postings = postings
+
+    def get(self, name: str) -> list[InventoryEntry]:
+        """Get every symbol with the name, best ranked first."""
+        found = bisect.bisect_left(range(len(self)), name, key=self._name)
+        if found == len(self) or self._name(found) != name:
+            return []
+        return self._entries[self._starts[found] : self._starts[found + 1]]
+
+    def complete(self, prefix: str, limit: int) -> list[InventoryEntry]:
+        """
+        Get the best symbol of each of the `limit` best names starting with the prefix.
+
+        Names are compared case-insensitively, and ranked by their best symbol's domain, role and
+        priority, then by their length.
+        """
+        key = prefix.lower()
+        positions = range(len(self))
+        start = bisect.bisect_left(positions, key, key=self._key)
+        end = bisect.bisect_left(positions, key + MAX_CHARACTER, lo=start, key=self._key)
+
+        tree, scores, size = self._tree, self._scores, len(self)
+        heap: list[tuple[int, int, int]] = []
+        # push the nodes which exactly cover [start, end)
+        low, high = start + size, end + size
+        while low < high:
+            if low & 1:
+                heap.append((scores[tree[low]], tree[low], low))
+                low += 1
+            if high & 1:
+                high -= 1
+                heap.append((scores[tree[high]], tree[high], high))
+            low >>= 1
+            high >>= 1
+        heapq.heapify(heap)
+
+        completions = []
+        while heap and len(completions) < limit:
+            _, position, node = heapq.heappop(heap)
+            if node >= size:
+                completions.append(self._best(position))
+                continue
+            for child in (2 * node, 2 * node + 1):
+                heapq.heappush(heap, (scores[tree[child]], tree[child], child))
+        return completions
+
+    def search(
+        self, query: str, limit: int, threshold: float
+    ) -> list[tuple[float, InventoryEntry]]:
+        """
+        Get the best symbol of each of the `limit` names most similar to the query, with scores.
+
+        Similarity is the amount of trigrams the name and query share, divided by the amount of
+        trigrams either has, as with pg_trgm. Only names with a similarity of at least the
+        threshold are returned, most similar first, then ranked as completions are. The trigram
+        index must have been built with `build_trigrams`.
+        """
+        if self._postings is None:
+            raise RuntimeError("The trigram index has not been built.")
+        query_grams = trigrams(query)
+        postings = sorted(
+            (self._postings[gram] for gram in query_grams if gram in self._postings), key=len
+        )
+        shared: Counter[int] = Counter()
+        budget = MAX_FUZZY_POSTINGS
+        read = 0
+        for positions in postings:
+            if len(positions) > budget:
+                # even the rarest trigram is too common, so only some of its names are considered
+                if not read:
+                    shared.update(positions[:budget])
+                break
+            budget -= len(positions)
+            shared.update(positions)
+            read += 1
+        partial = read < len(postings)
+
+        results = []
+        for position, count in shared.most_common(FUZZY_CANDIDATES):
+            total = self._trigram_counts[position]
+            # the candidate may share trigrams whose postings were not read
+            if partial:
+                count = len(query_grams & trigrams(self._key(position)))
+            similarity = count / (len(query_grams) + total - count)
+            if similarity >= threshold:
+                results.append((similarity, self._scores[position], position))
+        results.sort(key=lambda result: (-result[0], result[1]))
+        return [(similarity, self._best(position)) for similarity, _, position in results[:limit]]
+
+
+class SymbolIndexes:
+    """
+    Indexes of the symbols served for the default sources of packages.
+
+    Which source is the default of a package, and which version of its symbols that source
+    serves, is checked against the database at most every `ttl` seconds. Indexes are built in the
+    background when missing or outdated, and lookups fall back to the database until they are.
+    Only the `max_sources` most recently used indexes are kept, and the urls of the `max_urls`
+    most recently resolved names.
+
+    If a `directory` is configured, the symbols of each source are also written to an index file
+    there whenever it is refreshed or indexed. Lookups are served from those files once they
+    are up to date, which is shared between processes and needs no index to be built first.
+    """
+
+    def __init__(
+        self,
+        settings: IndexSettings,
+        session_factory: Callable[[], AsyncSession] = SessionLocal,  # type: ignore
+    ) -> None:
+        self.settings = settings
+        self.session_factory = session_factory
+        self._defaults: dict[str, tuple[float, SourceVersion]] = {}
+        self._indexes: OrderedDict[int, SymbolIndex] = OrderedDict()
+        self._builds: dict[int, asyncio.Task] = {}
+        self._owners: dict[str, list[ModuleOwner]] = {}
+        self._owners_checked_at: float | None = None
+        self._urls: OrderedDict[tuple[str, str], tuple[SourceVersion, str | None]] = OrderedDict()
+        self._files: dict[int, tuple[float, MappedIndex | None]] = {}
+
+    async def default_source(self, db: AsyncSession, package: str) -> SourceVersion | None:
+        """Get the version of the default source of the package, if the package exists."""
+        cached = self._defaults.get(package)
+        now = time.monotonic()
+        if cached is not None and now - cached[0] < self.settings.ttl:
+            return cached[1]
+
+        async with db.begin():
+            source = await crud_docs.get_default_doc_source(db, package)
+        if source is None:
+            self._defaults.pop(package, None)
+            return None
+        version = SourceVersion.from_source(source)
+        self._defaults[package] = (now, version)
+        return version
+
+    def get(self, version: SourceVersion) -> SymbolIndex | None:
+        """
+        Get the index of the version of a source, if it has been built.
+
+        If it has not been built, or was built for another version, it is built in the background.
+        """
+        index = self._indexes.get(version.source_id)
+        if index is not None and index.version == version:
+            self._indexes.move_to_end(version.source_id)
+            return index
+        if version.generation is not None and version.source_id not in self._builds:
+            task = asyncio.create_task(self.build(version))
+            self._builds[version.source_id] = task
+            task.add_done_callback(self._build_done)
+        return None
+
+    def _build_done(self, task: asyncio.Task) -> None:
+        source_id = next(key for key, build in self._builds.items() if build is task)
+        del self._builds[source_id]
+        if not task.cancelled() and task.exception() is not None:
+            log.error(
+                "Could not build the index of source %d", source_id, exc_info=task.exception()
+            )
+
+    async def build(self, version: SourceVersion) -> SymbolIndex:
+        """Build and store the index of the version of a source."""
+        start = time.perf_counter()
+        async with self.session_factory() as db:
+            async with db.begin():
+                entries = await crud_symbols.get_symbols(
+                    db, version.source_id, version.generation  # type: ignore
+                )
+        # building takes long enough for large sources to stall the event loop
+        index = await asyncio.to_thread(SymbolIndex, version, entries)
+        if self.settings.directory is not None and self.mapped(version) is None:
+            await asyncio.to_thread(self.write_file, version, index.entries())
+        self._indexes[version.source_id] = index
+        self._indexes.move_to_end(version.source_id)
+        while len(self._indexes) > self.settings.max_sources:
+            self._indexes.popitem(last=False)
+        log.debug(
+            "Built index of %d symbols for source %d in %.2f seconds",
+            len(entries),
+            version.source_id,
+            time.perf_counter() - start,
+        )
+        return index
+
+    def _file_path(self, source_id: int) -> Path:
+        return self.settings.directory / f"{source_id}.idx"  # type: ignore
+
+    def mapped(self, version: SourceVersion) -> MappedIndex | None:
+        """
+        Get the index file of the version of a source, if one is configured and up to date.
+
+        A missing or outdated file is checked for again at most every `ttl` seconds.
+        """
+        if self.settings.directory is None or version.generation is None:
+            return None
+        cached = self._files.get(version.source_id)
+        now = time.monotonic()
+        if cached is not None:
+            checked_at, file = cached
+            if file is not None and file.matches(
+                version.source_id, version.generation, version.refreshed_at
+            ):
+                return file
+            if now - checked_at < self.settings.ttl:
+                return None
+
+        try:
+            file = MappedIndex(self._file_path(version.source_id))
+        except (FileNotFoundError, InvalidIndexFile):
+            file = None
+        if file is not None and not file.matches(
+            version.source_id, version.generation, version.refreshed_at
+        ):
+            file = None
+        self._files[version.source_id] = (now, file)
+        return file
+
+    def write_file(self, version: SourceVersion, entries: Iterable[InventoryEntry]) -> None:
+        """Write the index file of the version of a source, with entries sorted by name and rank."""
+        start = time.perf_counter()
+        write_index_file(
+            self._file_path(version.source_id),
+            version.source_id,
+            version.generation,  # type: ignore
+            version.refreshed_at,
+            entries,
+        )
+        # the file may have been found to be missing or outdated, but is up to date now
+        self._files.pop(version.source_id, None)
+        log.debug(
+            "Wrote index file of source %d in %.2f seconds",
+            version.source_id,
+            time.perf_counter() - start,
+        )
+
+    async def rebuild_file(self, source_id: int) -> None:
+        """Write the index file of the symbols the source currently serves, if configured."""
+        if self.settings.directory is None:
+            return
+        async with self.session_factory() as db:
+            async with db.begin():
+                source = await crud_docs.get_doc_source(db, source_id)
+                if source is None or source.current_generation is None:
+                    return
+                version = SourceVersion.from_source(source)
+                entries = await crud_symbols.get_symbols(
+                    db, source_id, version.generation  # type: ignore
+                )
+        entries.sort(key=lambda entry: (entry.name, rank(entry)))
+        await asyncio.to_thread(self.write_file, version, entries)
+
+    async def lookup(
+        self, db: AsyncSession, version: SourceVersion, name: str
+    ) -> list[InventoryEntry]:
+        """Get every symbol of the source with the name, best ranked first."""
+        return (await self.lookup_many(db, version, [name]))[name]
+
+    async def lookup_many(
+        self, db: AsyncSession, version: SourceVersion, names: Iterable[str]
+    ) -> dict[str, list[InventoryEntry]]:
+        """
+        Get every symbol of the source with each of the names, best ranked first.
+
+        Lookups are served from the index file of the source if it is up to date. Otherwise, if
+        the index of the source has not been built, all names are looked up with one query.
+        """
+        names = set(names)
+        file = self.mapped(version)
+        if file is not None:
+            return {name: file.get(name) for name in names}
+        index = self.get(version)
+        if index is not None:
+            return {name: index.get(name) for name in names}
+        found: dict[str, list[InventoryEntry]] = {name: [] for name in names}
+        if version.generation is None:
+            return found
+        async with db.begin():
+            entries = await crud_symbols.find_symbols(
+                db, version.source_id, version.generation, names
+            )
+        for entry in sorted(entries, key=rank):
+            found[entry.name].append(entry)
+        return found
+
+    async def resolve_url(self, db: AsyncSession, package: str, name: str) -> str | None:
+        """
+        Get the url of the best symbol with the name of the default source of the package.
+
+        Resolutions are cached until the default source serves another version of its symbols,
+        including names which could not be resolved.
+        """
+        version = await self.default_source(db, package)
+        if version is None:
+            return None
+        key = (package, name)
+        cached = self._urls.get(key)
+        if cached is not None and cached[0] == version:
+            self._urls.move_to_end(key)
+            return cached[1]
+
+        symbols = await self.lookup(db, version, name)
+        url = symbol_url(version, symbols[0]) if symbols else None
+        self._urls[key] = (version, url)
+        self._urls.move_to_end(key)
+        while len(self._urls) > self.settings.max_urls:
+            self._urls.popitem(last=False)
+        return url
+
+    async def complete(
+        self, db: AsyncSession, version: SourceVersion, prefix: str, limit: int
+    ) -> list[InventoryEntry]:
+        """Get the best symbol of each of the `limit` best names of the source with the prefix."""
+        index = self.get(version)
+        if index is not None:
+            return index.complete(prefix, limit)
+        if version.generation is None:
+            return []
+        async with db.begin():
+            entries = await crud_symbols.complete_symbols(
+                db, version.source_id, version.generation, prefix, limit
+            )
+        return sorted(entries, key=completion_score)
+
+    async def search(
+        self, version: SourceVersion, query: str, limit: int, threshold: float
+    ) -> list[tuple[float, InventoryEntry]]:
+        """
+        Get the best symbol of each of the `limit` names of the source most similar to the query.
+
+        There is no fallback to the database, so this waits for the index and its trigram index to
+        be built. If the build fails, nothing is found.
+        """
+        index = self.get(version)
+        if index is None and version.source_id in self._builds:
+            try:
+                index = await asyncio.shield(self._builds[version.source_id])
+            except Exception:
+                # the failure is logged once the build is done, and the next search retries it
+                return []
+        if index is None:
+            return []
+        async with index.trigram_lock:
+            if not index.has_trigrams:
+                await asyncio.to_thread(index.build_trigrams)
+        return index.search(query, limit, threshold)
+
+    async def owners(self, db: AsyncSession, name: str) -> list[ModuleOwner]:
+        """
+        Get the packages documenting the top-level python module of a dotted name.
+
+        When several packages document the module, they are ordered by how many symbols they
+        document within it, then by which package was added first. The modules of every package
+        are reloaded at most every `ttl` seconds.
+        """
+        now = time.monotonic()
+        if self._owners_checked_at is None or now - self._owners_checked_at >= self.settings.ttl:
+            async with db.begin():
+                rows = await crud_docs.get_module_owners(db)
+            owners: dict[str, list[ModuleOwner]] = {}
+            for module, package_id, package, source_id, symbols in rows:
+                owners.setdefault(module, []).append(
+                    ModuleOwner(package, package_id, source_id, symbols)
+                )
+            self._owners = owners
+            self._owners_checked_at = now
+        return self._owners.get(name.partition(".")[0], [])
+
+    def invalidate(self, source_id: int | None = None) -> None:
+        """Drop the index of a source, or of every source, and recheck the default sources."""
+        self._defaults.clear()
+        self._owners_checked_at = None
+        if source_id is None:
+            self._indexes.clear()
+            self._urls.clear()
+        else:
+            self._indexes.pop(source_id, None)
+            for key, (version, _) in list(self._urls.items()):
+                if version.source_id == source_id:
+                    del self._urls[key]
+
+
+_SYMBOL_INDEXES: SymbolIndexes | None = None
+
+
+def get_symbol_indexes() -> SymbolIndexes:
+    """Get the global symbol indexes, creating them on first use."""
+    global _SYMBOL_INDEXES
+    if _SYMBOL_INDEXES is None:
+        _SYMBOL_INDEXES = SymbolIndexes(get_settings().index)
+    return _SYMBOL_INDEXES
@@ -0,0 +1,133 @@
+"""Ingestion of DocSource inventories into the symbol table."""
+
+import logging
+from typing import NamedTuple
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from sage.core.database import models
+from sage.core.database.crud import symbols as crud_symbols
+from sage.core.dependencies.database import SessionLocal
+from sage.core.inventory.executor import get_parse_executor
+from sage.core.inventory.fetch import InventoryValidators, fetch_inventory
+from sage.core.inventory.parser import InvalidInventory
+from sage.enums import RefreshMode
+from sage.http import HTTPClient
+
+
+__all__ = ("IngestionError", "IngestResult", "collect_garbage", "ingest_source")
+
+log = logging.getLogger(__name__)
+
+
+class IngestionError(Exception):
+    """The inventory of a source could not be fetched or parsed."""
+
+
+class IngestResult(NamedTuple):
+    """The outcome of ingesting a source."""
+
+    generation: int
+    symbols: int
+    added: int
+    removed: int
+    changed: int
+    # False if a newer generation was activated while this one was loading
+    activated: bool
+
+
+def stored_validators(source: models.DocSource) -> InventoryValidators:
+    """Get the validators stored from the last fetch of the source's inventory."""
+    return InventoryValidators(
+        etag=source.inventory_etag,  # type: ignore
+        last_modified=source.inventory_last_modified,  # type: ignore
+        sha256=source.inventory_sha256,  # type: ignore
+    )
+
+
+async def write_symbols(
+    db: AsyncSession, source: models.DocSource, body: bytes, mode: RefreshMode
+) -> IngestResult:
+    """Parse the compressed inventory body and write it as the symbols of the source."""
+    source_id: int = source.id  # type: ignore
+    batches = get_parse_executor().copy_batches(body, source_id)
+    if mode is RefreshMode.incremental:
+        generation, count, diff = await crud_symbols.apply_diff(db, source_id, batches)
+        return IngestResult(generation, count, *diff, activated=True)
+
+    previous: int | None = source.current_generation  # type: ignore
+    generation, count = await crud_symbols.load_generation(db, source_id, batches)
+    activated = await crud_symbols.activate_generation(db, source_id, generation)
+    removed = 0
+    if previous is not None:
+        async with db.begin():
+            removed = await crud_symbols.count_symbols(db, source_id, previous)
+    return IngestResult(generation, count, count, removed, 0, activated=activated)
+
+
+async def ingest_source(
+    db: AsyncSession,
+    source: models.DocSource,
+    *,
+    mode: RefreshMode = RefreshMode.incremental,
+    client: HTTPClient,
+    force: bool = False,
+) -> IngestResult | None:
+    """
+    Fetch the inventory of the source and make it the source's current set of symbols.
+
+    Unless forced, the inventory is fetched conditionally using the validators stored from the
+    previous fetch, and None is returned without parsing anything if it has not changed.
+
+    The compressed body is parsed by the parse executor, away from the event loop if configured,
+    into batches which are streamed to the database as they are produced. Readers never observe a
+    partially written set of symbols.
+
+    In incremental mode, the entries are diffed against the current generation and only the
+    difference is written to it. In full mode, every entry is written to a new generation which
+    is then activated in one short transaction. Old generations are left in place and must be
+    removed afterwards with `collect_garbage`.
+    """
+    source_id: int = source.id  # type: ignore
+    if not source.inventory_url:
+        raise IngestionError(f"Source {source_id} does not have an inventory url.")
+
+    validators = InventoryValidators() if force else stored_validators(source)
+
+    try:
+        fetched = await fetch_inventory(client, source.inventory_url, validators)  # type: ignore
+        if fetched.body is not None:
+            result = await write_symbols(db, source, fetched.body, mode)
+    except httpx.HTTPError as e:
+        raise IngestionError(f"Could not fetch the inventory of source {source_id}: {e}") from e
+    except InvalidInventory as e:
+        raise IngestionError(f"Inventory of source {source_id} is invalid: {e}") from e
+
+    if fetched.body is None:
+        await crud_symbols.record_refresh(db, source_id, None, fetched.validators)
+        log.info("Inventory of source %d is unchanged", source_id)
+        return None
+
+    if result.activated:
+        diff = crud_symbols.SymbolDiff(result.added, result.removed, result.changed)
+        await crud_symbols.record_refresh(db, source_id, diff, fetched.validators)
+    log.info(
+        "Ingested %d symbols for source %d as generation %d (+%d -%d ~%d)%s",
+        result.symbols,
+        source_id,
+        result.generation,
+        result.added,
+        result.removed,
+        result.changed,
+        "" if result.activated else ", which was already superseded",
+    )
+    return result
+
+
+async def collect_garbage(source_id: int) -> None:
+    """Delete the superseded symbol generations of a source using a new session."""
+    async with SessionLocal() as db:  # type: ignore
+        deleted = await crud_symbols.collect_old_generations(db, source_id)
+    if deleted:
+        log.debug("Deleted %d superseded symbols of source %d", deleted, source_id)
@@ -0,0 +1,199 @@
+"""
+Compact index files of the symbols of a source, which are memory mapped to serve lookups.
+
+Every worker process maps the same file read-only, so they share its pages and can serve
+lookups as soon as they start, without building an index of their own first.
+
+A file consists of a fixed size header, then the columns of the entries, then a table of
+deduplicated strings. Entries are sorted by name, and their names, domains, roles, uris and
+display names are indexes into the string table. Most uris use the `$` shorthand for the name,
+so they repeat across every entry of a page and are stored once.
+"""
+
+import bisect
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable
+
+from sage.core.inventory.parser import InventoryEntry
+
+
+__all__ = ("InvalidIndexFile", "MappedIndex", "write_index_file")
+
+
+FILE_MAGIC = b"SAGEIDX1"
+# magic, source id, generation, refresh time, entries, strings, string bytes and padding
+HEADER = struct.Struct("=8sqqqIIII")
+# the display name of entries whose display name is their name
+NO_STRING = 0xFFFFFFFF
+# stands in for the refresh time of sources which were never refreshed
+NEVER_REFRESHED = -1
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+STRING_COLUMNS = ("name", "domain", "role", "uri", "display_name")
+
+
+class InvalidIndexFile(ValueError):
+    """The file is not an index file, or was written by an incompatible version."""
+
+
+def encode_refreshed_at(refreshed_at: datetime | None) -> int:
+    """Encode the refresh time of a source as microseconds since the epoch."""
+    if refreshed_at is None:
+        return NEVER_REFRESHED
+    return (refreshed_at - EPOCH) // timedelta(microseconds=1)
+
+
+def write_index_file(
+    path: Path,
+    source_id: int,
+    generation: int,
+    refreshed_at: datetime | None,
+    entries: Iterable[InventoryEntry],
+) -> None:
+    """
+    Write the entries of a version of the symbols of a source to an index file.
+
+    The entries must be sorted by name, and are returned by lookups in the order they are in.
+    The file is written next to the path and then renamed over it, so readers either map the
+    previous file or the complete new file.
+    """
+    strings: dict[str, int] = {}
+    blob = bytearray()
+    offsets = array("I", [0])
+    columns = {column: array("I") for column in STRING_COLUMNS}
+    priorities = array("i")
+
+    def intern(string: str) -> int:
+        index = strings.get(string)
+        if index is None:
+            index = strings[string] = len(offsets) - 1
+            blob.extend(string.encode())
+            offsets.append(len(blob))
+        return index
+
+    count = 0
+    for entry in entries:
+        columns["name"].append(intern(entry.name))
+        columns["domain"].append(intern(entry.domain))
+        columns["role"].append(intern(entry.role))
+        columns["uri"].append(intern(entry.uri))
+        display_name = entry.display_name
+        columns["display_name"].append(NO_STRING if display_name is None else intern(display_name))
+        priorities.append(entry.priority)
+        count += 1
+
+    header = HEADER.pack(
+        FILE_MAGIC,
+        source_id,
+        generation,
+        encode_refreshed_at(refreshed_at),
+        count,
+        len(strings),
+        len(blob),
+        0,
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.name, delete=False) as file:
+        try:
+            file.write(header)
+            for column in STRING_COLUMNS:
+                file.write(columns[column].tobytes())
+            file.write(priorities.tobytes())
+            file.write(offsets.tobytes())
+            file.write(blob)
+            file.flush()
+            os.fsync(file.fileno())
+        except BaseException:
+            os.unlink(file.name)
+            raise
+    os.replace(file.name, path)
+
+
+class MappedIndex:
+    """
+    A read-only memory mapped index file.
+
+    Columns are read through memoryviews of the mapping, so nothing is copied into the process
+    other than the entries which are looked up.
+    """
+
+    def __init__(self, path: Path) -> None:
+        with open(path, "rb") as file:
+            try:
+                self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:
+                raise InvalidIndexFile(f"Index file {path} is empty.") from e
+        if len(self._mmap) < HEADER.size:
+            raise InvalidIndexFile(f"Index file {path} is truncated.")
+        magic, source_id, generation, refreshed_at, count, strings, size, _ = HEADER.unpack_from(
+            self._mmap
+        )
+        if magic != FILE_MAGIC:
+            raise InvalidIndexFile(f"{path} is not an index file.")
+        expected = HEADER.size + count * 4 * (len(STRING_COLUMNS) + 1) + (strings + 1) * 4 + size
+        if len(self._mmap) != expected:
+            raise InvalidIndexFile(f"Index file {path} is truncated.")
+        self.source_id: int = source_id
+        self.generation: int = generation
+        self.refreshed_at: int = refreshed_at
+
+        view = memoryview(self._mmap)
+        position = HEADER.size
+        columns = {}
+        for column in STRING_COLUMNS:
+            columns[column] = view[position : position + count * 4].cast("I")
+            position += count * 4
+        self._names = columns["name"]
+        self._domains = columns["domain"]
+        self._roles = columns["role"]
+        self._uris = columns["uri"]
+        self._display_names = columns["display_name"]
+        self._priorities = view[position : position + count * 4].cast("i")
+        position += count * 4
+        self._offsets = view[position : position + (strings + 1) * 4].cast("I")
+        position += (strings + 1) * 4
+        self._blob = view[position : position + size]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def matches(
+        self, source_id: int, generation: int | None, refreshed_at: datetime | None
+    ) -> bool:
+        """Whether the file holds the provided version of the symbols of a source."""
+        return (
+            self.source_id == source_id
+            and self.generation == generation
+            and self.refreshed_at == encode_refreshed_at(refreshed_at)
+        )
+
+    def _string(self, index: int) -> str:
+        return str(self._blob[self._offsets[index] : self._offsets[index + 1]], "utf-8")
+
+    def _name(self, position: int) -> str:
+        return self._string(self._names[position])
+
+    def _entry(self, position: int) -> InventoryEntry:
+        display_name = self._display_names[position]
+        return InventoryEntry(
+            name=self._name(position),
+            domain=self._string(self._domains[position]),
+            role=self._string(self._roles[position]),
+            priority=self._priorities[position],
+            uri=self._string(self._uris[position]),
+            display_name=None if display_name == NO_STRING else self._string(display_name),
+        )
+
+    def get(self, name: str) -> list[InventoryEntry]:
+        """Get every entry with the name, in the order they were written."""
+        position = bisect.bisect_left(range(len(self)), name, key=self._name)
+        entries = []
+        while position < len(self) and self._name(position) == name:
+            entries.append(self._entry(position))
+            position += 1
+        return entries
@@ -0,0 +1,178 @@
+"""Incremental parser for version 2 Sphinx ``objects.inv`` inventories."""
+
+import re
+import zlib
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, NamedTuple
+
+
+__all__ = (
+    "InvalidInventory",
+    "InventoryEntry",
+    "InventoryParser",
+    "aiter_inventory",
+    "iter_inventory",
+)
+
+
+INVENTORY_MAGIC = b"# Sphinx inventory version 2"
+PROJECT_PREFIX = b"# Project: "
+VERSION_PREFIX = b"# Version: "
+COMPRESSION_NOTICE = b"zlib"
+
+# the header is four short lines, anything longer than this is not an inventory
+MAX_HEADER_SIZE = 4096
+# upper bound on how much decompressed data is produced from a single input chunk at once
+DECOMPRESS_CHUNK_SIZE = 64 * 1024
+# a single line longer than this is treated as a corrupt inventory
+MAX_LINE_SIZE = 64 * 1024
+
+# this is the same expression sphinx.util.inventory uses to read v2 lines
+ENTRY_REGEX = re.compile(r"(?x)(.+?)\s+(\S+)\s+(-?\d+)\s+?(\S*)\s+(.*)")
+# priorities are stored as 32 bit integers, both by the database and when held in memory
+MIN_PRIORITY = -(2**31)
+MAX_PRIORITY = 2**31 - 1
+
+
+class InvalidInventory(ValueError):
+    """The provided data is not a valid version 2 Sphinx inventory."""
+
+
+class InventoryEntry(NamedTuple):
+    """A single object documented by an inventory."""
+
+    name: str
+    domain: str
+    role: str
+    priority: int
+    # relative to the documentation root, may end in `$` which is shorthand for the name
+    uri: str
+    # None if the inventory uses `-` to indicate the display name is the name
+    display_name: str | None
+
+
+def parse_line(line: str) -> InventoryEntry | None:
+    """Parse one decompressed inventory line, returning None if it should be skipped."""
+    match = ENTRY_REGEX.match(line.rstrip())
+    if not match:
+        return None
+    name, type, priority, uri, display_name = match.groups()
+    domain, sep, role = type.partition(":")
+    if not sep:
+        return None
+    priority_value = int(priority)
+    if not MIN_PRIORITY <= priority_value <= MAX_PRIORITY:
+        raise InvalidInventory(f"Priority of {name!r} is out of range.")
+    return InventoryEntry(
+        name=name,
+        domain=domain,
+        role=role,
+        priority=priority_value,
+        uri=uri,
+        display_name=None if display_name == "-" else display_name,
+    )
+
+
+class InventoryParser:
+    """
+    Push-based parser for the v2 inventory format.
+
+    Compressed bytes are provided with `feed` as they arrive, and entries are yielded as soon
+    as their line is complete. At no point is the whole decompressed body held in memory.
+    """
+
+    def __init__(self) -> None:
+        self.project: str | None = None
+        self.version: str | None = None
+        self._header = bytearray()
+        self._header_lines = 0
+        self._in_header = True
+        self._decompressor = zlib.decompressobj()
+        self._partial = b""
+
+    def _feed_header(self, data: bytes) -> bytes:
+        """Consume header lines from data, returning whatever remains after the header."""
+        self._header += data
+        while self._header_lines < 4:
+            end = self._header.find(b"\n")
+            if end == -1:
+                if len(self._header) > MAX_HEADER_SIZE:
+                    raise InvalidInventory("Inventory header is too long.")
+                return b""
+            line = bytes(self._header[:end]).rstrip(b"\r")
+            del self._header[: end + 1]
+            self._read_header_line(line)
+            self._header_lines += 1
+
+        remaining = bytes(self._header)
+        self._header.clear()
+        self._in_header = False
+        return remaining
+
+    def _read_header_line(self, line: bytes) -> None:
+        if self._header_lines == 0:
+            if line != INVENTORY_MAGIC:
+                raise InvalidInventory("Only version 2 Sphinx inventories are supported.")
+        elif self._header_lines == 1:
+            if not line.startswith(PROJECT_PREFIX):
+                raise InvalidInventory("Inventory is missing the project line.")
+            self.project = line[len(PROJECT_PREFIX) :].decode("utf-8", "replace")
+        elif self._header_lines == 2:
+            if not line.startswith(VERSION_PREFIX):
+                raise InvalidInventory("Inventory is missing the version line.")
+            self.version = line[len(VERSION_PREFIX) :].decode("utf-8", "replace")
+        elif COMPRESSION_NOTICE not in line:
+            raise InvalidInventory("Inventory body is not zlib compressed.")
+
+    def _split_lines(self, data: bytes) -> Iterator[InventoryEntry]:
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        if len(self._partial) > MAX_LINE_SIZE:
+            raise InvalidInventory("Inventory contains an overly long line.")
+        for line in lines:
+            entry = parse_line(line.decode("utf-8", "replace"))
+            if entry is not None:
+                yield entry
+
+    def feed(self, data: bytes) -> Iterator[InventoryEntry]:
+        """Feed a chunk of the raw inventory, yielding every entry completed by it."""
+        if self._in_header:
+            data = self._feed_header(data)
+        if self._decompressor.eof:
+            return
+        while data:
+            try:
+                decompressed = self._decompressor.decompress(data, DECOMPRESS_CHUNK_SIZE)
+            except zlib.error as e:
+                raise InvalidInventory("Inventory body could not be decompressed.") from e
+            yield from self._split_lines(decompressed)
+            data = self._decompressor.unconsumed_tail
+
+    def close(self) -> Iterator[InventoryEntry]:
+        """Signal the end of the data, yielding any remaining entries."""
+        if self._in_header:
+            raise InvalidInventory("Inventory ended before the header was complete.")
+        try:
+            remaining = self._decompressor.flush()
+        except zlib.error as e:
+            raise InvalidInventory("Inventory body could not be decompressed.") from e
+        if not self._decompressor.eof:
+            raise InvalidInventory("Inventory body is truncated.")
+        yield from self._split_lines(remaining + b"\n")
+
+
+def iter_inventory(chunks: Iterable[bytes]) -> Iterator[InventoryEntry]:
+    """Lazily parse an inventory provided as an iterable of compressed chunks."""
+    parser = InventoryParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+async def aiter_inventory(chunks: AsyncIterable[bytes]) -> AsyncIterator[InventoryEntry]:
+    """Lazily parse an inventory provided as an async iterable of compressed chunks."""
+    parser = InventoryParser()
+    async for chunk in chunks:
+        for entry in parser.feed(chunk):
+            yield entry
+    for entry in parser.close():
+        yield entry
@@ -0,0 +1,131 @@
+"""Background scheduler which keeps the inventories of all sources up to date."""
+
+import asyncio
+import logging
+import random
+from datetime import timedelta
+from typing import Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from sage.core.database import models
+from sage.core.database.crud import symbols as crud_symbols
+from sage.core.dependencies.database import SessionLocal
+from sage.core.inventory import ingest
+from sage.core.inventory.index import get_symbol_indexes
+from sage.http import HTTPClient
+from sage.settings import RefreshSettings
+
+
+__all__ = ("RefreshScheduler",)
+
+log = logging.getLogger(__name__)
+
+
+class RefreshScheduler:
+    """
+    Refreshes every source with an inventory on its own interval.
+
+    Due sources are claimed from the database, so any amount of schedulers may run at once, be it
+    within the api process or as separate workers. At most `max_concurrency` sources are refreshed
+    at once by one scheduler, and the http client limits how many of those hit the same host.
+
+    Every delay has random jitter applied so sources added together do not stay synchronised,
+    and failing sources are retried with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        settings: RefreshSettings,
+        client: HTTPClient,
+        session_factory: Callable[[], AsyncSession] = SessionLocal,  # type: ignore
+    ) -> None:
+        self.settings = settings
+        self.client = client
+        self.session_factory = session_factory
+        self._refreshes: set[asyncio.Task] = set()
+        self._task: asyncio.Task | None = None
+
+    def _jitter(self, seconds: float) -> timedelta:
+        jitter = self.settings.jitter
+        return timedelta(seconds=seconds * random.uniform(1 - jitter, 1 + jitter))  # noqa: S311
+
+    def next_delay(self, source: models.DocSource) -> timedelta:
+        """Get the delay until the next refresh after a successful refresh."""
+        return self._jitter(source.refresh_interval or self.settings.interval)  # type: ignore
+
+    def failure_delay(self, source: models.DocSource) -> timedelta:
+        """Get the delay until the next refresh after a failed refresh."""
+        # refresh_failures does not include the failure that just happened
+        backoff = self.settings.failure_backoff * 2**source.refresh_failures
+        return self._jitter(min(backoff, self.settings.max_failure_backoff))
+
+    async def refresh(self, source: models.DocSource) -> None:
+        """Refresh a single source, and schedule its next refresh."""
+        source_id: int = source.id  # type: ignore
+        async with self.session_factory() as db:
+            try:
+                result = await ingest.ingest_source(db, source, client=self.client)
+            except Exception as e:
+                if isinstance(e, ingest.IngestionError):
+                    log.warning("Refreshing source %d failed: %s", source_id, e)
+                else:
+                    log.exception("Unexpected error refreshing source %d", source_id)
+                await crud_symbols.schedule_refresh(
+                    db, source_id, delay=self.failure_delay(source), error=str(e) or repr(e)
+                )
+                return
+            await crud_symbols.schedule_refresh(db, source_id, delay=self.next_delay(source))
+        if result is not None:
+            await ingest.collect_garbage(source_id)
+            await get_symbol_indexes().rebuild_file(source_id)
+
+    async def run_once(self) -> int:
+        """Start refreshing as many due sources as there is capacity for, returning the count."""
+        capacity = self.settings.max_concurrency - len(self._refreshes)
+        if capacity <= 0:
+            return 0
+        async with self.session_factory() as db:
+            sources = await crud_symbols.claim_due_sources(
+                db, limit=capacity, lease=timedelta(seconds=self.settings.lease)
+            )
+        for source in sources:
+            task = asyncio.create_task(self.refresh(source))
+            self._refreshes.add(task)
+            task.add_done_callback(self._refreshes.discard)
+        return len(sources)
+
+    async def run(self) -> None:
+        """Refresh due sources until cancelled."""
+        log.info("Starting inventory refresh scheduler")
+        try:
+            while True:
+                try:
+                    await self.run_once()
+                except Exception:
+                    log.exception("Could not claim due sources")
+                if self._refreshes:
+                    # check again as soon as there is capacity, in case more sources are due
+                    await asyncio.wait(
+                        self._refreshes,
+                        timeout=self.settings.poll_interval,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                else:
+                    await asyncio.sleep(self.settings.poll_interval)
+        finally:
+            for task in self._refreshes:
+                task.cancel()
+            await asyncio.gather(*self._refreshes, return_exceptions=True)
+
+    def start(self) -> None:
+        """Run the scheduler in the background on the current event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop the scheduler, cancelling any refreshes in progress."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -1,8 +1,104 @@
-from sqlalchemy.ext.asyncio import create_async_engine
+import time
+from typing import Any
 
-from sage.settings import get_settings
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
+from sage.settings import DatabaseSettings, get_settings
 
-# temporary
 
-engine = create_async_engine(get_settings().database_bind, future=True, echo=True)
+__all__ = ("MeteredPool", "create_engine", "engine", "get_server_connections")
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """
+    Connection pool which measures how long checkouts wait for a connection.
+
+    Waits include opening new connections, and waiting for a connection to be returned once
+    every connection allowed by the pool size and overflow is checked out. Checkouts which time
+    out are only counted as timeouts, and are not included in the waits.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.waiting = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self) -> Any:
+        # this is what every checkout calls to take a connection from the pool, and is stable
+        # across versions, but is not public
+        self.waiting += 1
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        else:
+            wait = time.perf_counter() - start
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            return connection
+        finally:
+            self.waiting -= 1
+
+    def stats(self) -> dict[str, Any]:
+        """Get statistics on the connections of the pool, and how long checkouts waited for them."""
+        return {
+            "connections": {
+                "open": self.checkedin() + self.checkedout(),
+                "idle": self.checkedin(),
+                "checked_out": self.checkedout(),
+                # overflow counts up from minus the pool size while the pool is first filled
+                "overflow": max(self.overflow(), 0),
+                "pool_size": self.size(),
+                "max_overflow": self._max_overflow,
+            },
+            "checkouts": self.checkouts,
+            "waiting": self.waiting,
+            "timeouts": self.timeouts,
+            "wait": {
+                "total": self.total_wait,
+                "max": self.max_wait,
+                "mean": self.total_wait / self.checkouts if self.checkouts else 0.0,
+            },
+        }
+
+
+def create_engine(bind: str, settings: DatabaseSettings) -> AsyncEngine:
+    """Create an engine with a metered connection pool, configured by the settings."""
+    return create_async_engine(
+        bind,
+        future=True,
+        echo=settings.echo,
+        poolclass=MeteredPool,
+        pool_size=settings.pool_size,
+        max_overflow=settings.max_overflow,
+        pool_timeout=settings.pool_timeout,
+        pool_recycle=settings.pool_recycle,
+        pool_pre_ping=settings.pool_pre_ping,
+        connect_args={
+            # statements are prepared by sqlalchemy, and the cache of asyncpg is only used by its
+            # own queries, so both are sized together
+            "prepared_statement_cache_size": settings.statement_cache_size,
+            "statement_cache_size": settings.statement_cache_size,
+        },
+    )
+
+
+async def get_server_connections(db: AsyncSession) -> dict[str, int]:
+    """Get the amount of connections the database server allows, and has open to the database."""
+    stmt = text(
+        "SELECT current_setting('max_connections')::int,"
+        " (SELECT count(*) FROM pg_stat_activity WHERE datname = current_database())"
+    )
+    max_connections, connections = (await db.execute(stmt)).one()
+    return {"max_connections": max_connections, "connections": connections}
+
+
+engine = create_engine(get_settings().database_bind, get_settings().database)
@@ -1,15 +1,48 @@
-from typing import Any
+import json
+from typing import Any, AsyncIterator
 
-from fastapi import APIRouter, HTTPException, Path
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Path, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from sage.core.database import models, schemas
+from sage.cache import (
+    PACKAGES_TAG,
+    SOURCES_TAG,
+    ResponseCache,
+    etag_matches,
+    make_etag,
+    not_modified,
+    package_tag,
+    source_tag,
+)
+from sage.core.database import schemas
 from sage.core.database.crud import docs as crud_docs
-from sage.core.dependencies import GET_SESSION, REQUIRE_ADMIN
+from sage.core.database.crud import symbols as crud_symbols
+from sage.core.dependencies import (
+    GET_HTTP_CLIENT,
+    GET_INVENTORY_FILES,
+    GET_RESPONSE_CACHE,
+    GET_SESSION,
+    GET_SYMBOL_INDEXES,
+    REQUIRE_ADMIN,
+)
+from sage.core.inventory import ingest
+from sage.core.inventory.export import InventoryFiles
+from sage.core.inventory.index import SourceVersion, SymbolIndexes, symbol_to_dict
+from sage.enums import ImportStatus, ProgrammingLanguage, RefreshMode
+from sage.http import HTTPClient
+from sage.responses import FastJSONResponse, render_json
 
 
 router = APIRouter(prefix="/docs", tags=["documentation"])
 
+INVENTORY_MEDIA_TYPE = "application/octet-stream"
+EXPORT_MEDIA_TYPE = "application/x-ndjson"
+# symbols are sent in chunks of about this many bytes, rather than a line at a time
+EXPORT_CHUNK_SIZE = 1 << 16
+MAX_IMPORT_PACKAGES = 1000
+
 common_package_responses: dict[str | int, dict[str, Any]] = {
     404: {
         "description": "The package could not be found.",
@@ -27,6 +60,13 @@ common_source_responses: dict[str | int, dict[str, Any]] = {
     }
 }
 
+common_symbol_responses: dict[str | int, dict[str, Any]] = {
+    404: {
+        "description": "The package or symbol could not be found.",
+        "content": {"application/json": {"message": {"detail": "The symbol could not be found."}}},
+    }
+}
+
 bad_authorisation_responses: dict[str | int, dict[str, Any]] = {
     401: {
         "description": "Bad authorisation.",
@@ -35,19 +75,76 @@ bad_authorisation_responses: dict[str | int, dict[str, Any]] = {
     }
 }
 
+conflict_responses: dict[str | int, dict[str, Any]] = {
+    409: {
+        "description": "Another package has the name, or the package has a source with the url.",
+        "content": {
+            "application/json": {"message": {"detail": "A package named 'disnake' already exists."}}
+        },
+    }
+}
+
+not_modified_responses: dict[str | int, dict[str, Any]] = {
+    304: {"description": "The response cached with the etag in `If-None-Match` is current."}
+}
+
 
-@router.get("/packages", name="Get all packages", responses=common_package_responses)
+async def table_etag(db: AsyncSession, *tables: str) -> str:
+    """Get the etag of a response rendered from the docs tables, without loading any rows."""
+    async with db.begin():
+        versions = await crud_docs.get_table_versions(db)
+    return make_etag(*((table, versions.get(table)) for table in tables))
+
+
+@router.get(
+    "/packages",
+    name="Get all packages",
+    responses={**common_package_responses, **not_modified_responses},
+)
 async def get_all_doc_packages(
+    request: Request,
     db: AsyncSession = GET_SESSION,
+    cache: ResponseCache = GET_RESPONSE_CACHE,
     *,
     with_sources: bool = False,
-) -> list[dict[str, Any]]:
-    """Return all supported documentation inventories."""
-    db_packages = await crud_docs.get_all_doc_packages(db, with_sources=with_sources)
-    packages: list[dict[str, Any]] = []
-    for package in db_packages:
-        packages.append(package.to_dict(include_sources=with_sources))
-    return packages
+    after: int | None = Query(None, ge=0, lt=1 << 31),  # noqa: B008
+    limit: int = Query(100, ge=1, le=1000),  # noqa: B008
+    programming_language: ProgrammingLanguage | None = None,
+    name_prefix: str | None = Query(None, max_length=100),  # noqa: B008
+) -> Response:
+    """
+    Return a page of the supported documentation inventories, in order of id.
+
+    If there may be more packages, the url of the next page is in the `Link` header.
+    Pages are requested by passing the id of the last package of the previous page as `after`.
+    """
+    tables = [crud_docs.PACKAGES_VERSION]
+    if with_sources:
+        tables.append(crud_docs.SOURCES_VERSION)
+    etag = await table_etag(db, *tables)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    # mutations in other processes do not invalidate this cache, but do change the etag
+    key = ("packages", with_sources, after, limit, programming_language, name_prefix, etag)
+    response = cache.get(key)
+    if response is None:
+        packages = await crud_docs.get_all_doc_packages(
+            db,
+            with_sources=with_sources,
+            after=after,
+            limit=limit,
+            programming_language=programming_language,
+            name_prefix=name_prefix,
+        )
+        headers = {}
+        if len(packages) == limit:
+            # relative, as the response is cached for requests to any host
+            next_url = request.url.include_query_params(after=packages[-1]["id"])
+            headers["Link"] = f'<{next_url.path}?{next_url.query}>; rel="next"'
+        tags = [PACKAGES_TAG, SOURCES_TAG] if with_sources else [PACKAGES_TAG]
+        response = cache.set(key, packages, tags, headers)
+    response.headers["ETag"] = etag
+    return response
 
 
 @router.post(
@@ -59,6 +156,7 @@ async def get_all_doc_packages(
     responses={
         **common_package_responses,
         **bad_authorisation_responses,
+        **conflict_responses,
         201: {"description": "Package successfully created"},
     },
     dependencies=[REQUIRE_ADMIN],
@@ -67,30 +165,131 @@ async def create_doc_package(
     package: schemas.DocPackageCreationRequest, db: AsyncSession = GET_SESSION
 ) -> dict[str, Any]:
     """Add a new package to the documentation index."""
-    db_package = await crud_docs.create_doc_package(db, package)
-    return db_package.to_dict(include_sources=True)
+    return await crud_docs.create_doc_package(db, package)
+
+
+def import_error(field: str, message: str) -> list[dict[str, Any]]:
+    """Describe why an imported package is invalid, in the same shape as validation errors."""
+    return [{"loc": (field,), "msg": message, "type": "value_error"}]
+
+
+def validate_import(
+    item: Any, names: set[str]
+) -> schemas.DocPackageCreationRequest | list[dict[str, Any]]:
+    """Validate an imported package, returning the errors which make it invalid if it is."""
+    try:
+        package = schemas.DocPackageCreationRequest.parse_obj(item)
+    except ValidationError as e:
+        return e.errors()  # type: ignore
+    if package.name in names:
+        return import_error("name", "The package is imported more than once.")
+    if sum(source.default for source in package.sources) > 1:
+        return import_error("sources", "Only one source may be set as default.")
+    if len({source.inventory_url for source in package.sources}) < len(package.sources):
+        return import_error(
+            "sources", "Every source of a package must have a different inventory url."
+        )
+    return package
+
+
+@router.post(
+    "/import",
+    name="Import packages",
+    responses={
+        **bad_authorisation_responses,
+        400: {"description": "The body is not a json array or newline delimited json."},
+    },
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "maxItems": MAX_IMPORT_PACKAGES,
+                        "items": {"$ref": "#/components/schemas/DocPackageCreationRequest"},
+                    }
+                },
+                EXPORT_MEDIA_TYPE: {"schema": {"type": "string"}},
+            },
+        }
+    },
+    dependencies=[REQUIRE_ADMIN],
+)
+async def import_doc_packages(request: Request, db: AsyncSession = GET_SESSION) -> Response:
+    """
+    Create or update many packages and their sources at once, by name and inventory url.
+
+    The body is a json array of packages, or newline delimited json with one package per line.
+    Packages and sources which are already stored as imported are left unchanged, so importing
+    the same packages again is safe. A source set as default replaces the default of its package.
+    Invalid packages are skipped, and the outcome of every package is returned in order.
+    """
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith(EXPORT_MEDIA_TYPE):
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = json.loads(body)
+    except ValueError:
+        raise HTTPException(400, "The body is not valid json.") from None
+    if not isinstance(items, list):
+        raise HTTPException(400, "The body must be a json array of packages.")
+    if len(items) > MAX_IMPORT_PACKAGES:
+        raise HTTPException(400, f"At most {MAX_IMPORT_PACKAGES} packages may be imported at once.")
+
+    outcomes: list[dict[str, Any] | None] = []
+    packages: list[schemas.DocPackageCreationRequest] = []
+    names: set[str] = set()
+    for item in items:
+        package = validate_import(item, names)
+        if not isinstance(package, schemas.DocPackageCreationRequest):
+            name = item.get("name") if isinstance(item, dict) else None
+            outcomes.append({"name": name, "status": ImportStatus.invalid, "detail": package})
+            continue
+        names.add(package.name)
+        packages.append(package)
+        outcomes.append(None)
+
+    imported = iter(await crud_docs.import_doc_packages(db, packages) if packages else [])
+    results = [outcome or next(imported) for outcome in outcomes]
+    counts = {status.value: 0 for status in ImportStatus}
+    for result in results:
+        counts[result["status"].value] += 1
+    return FastJSONResponse({"counts": counts, "packages": results})
 
 
 @router.get(
     "/packages/{package_id}",
     name="Get an existing Documentation Package.",
-    responses=common_package_responses,
+    responses={**common_package_responses, **not_modified_responses},
 )
 async def get_doc_package(
-    package_id: int = Path(ge=0, lt=1 << 31), db: AsyncSession = GET_SESSION  # noqa: B008
-) -> dict[str, Any]:
+    request: Request,
+    package_id: int = Path(ge=0, lt=1 << 31),  # noqa: B008
+    db: AsyncSession = GET_SESSION,
+    cache: ResponseCache = GET_RESPONSE_CACHE,
+) -> Response:
     """Get an existing documentation package by ID."""
-    resp = await crud_docs.get_doc_package(db, package_id)
-    if resp is None:
-        raise HTTPException(404, "Package could not be found.")
-    return resp.to_dict(include_sources=True)
+    etag = await table_etag(db, crud_docs.PACKAGES_VERSION, crud_docs.SOURCES_VERSION)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    key = ("package", package_id, etag)
+    response = cache.get(key)
+    if response is None:
+        package = await crud_docs.get_doc_package_dict(db, package_id)
+        if package is None:
+            raise HTTPException(404, "Package could not be found.")
+        response = cache.set(key, package, [package_tag(package_id)])
+    response.headers["ETag"] = etag
+    return response
 
 
 @router.patch(
     "/packages/{package_id}",
     # response_model=schemas.DocPackage,
     name="Modify an existing DocPackage",
-    responses={**common_package_responses, **bad_authorisation_responses},
+    responses={**common_package_responses, **bad_authorisation_responses, **conflict_responses},
     dependencies=[REQUIRE_ADMIN],
 )
 async def edit_doc_package(
@@ -99,8 +298,7 @@ async def edit_doc_package(
     db: AsyncSession = GET_SESSION,
 ) -> dict[str, Any]:
     """Modify an existing Package. The full package must be provided."""
-    resp = await crud_docs.modify_doc_package(db, package_id, package)
-    return resp.to_dict(include_sources=False)
+    return await crud_docs.modify_doc_package(db, package_id, package)
 
 
 @router.delete(
@@ -124,14 +322,25 @@ async def delete_doc_package(
 @router.get(
     "/packages/{package_id}/sources",
     name="Get package sources",
-    responses=common_source_responses,
+    responses={**common_source_responses, **not_modified_responses},
 )
 async def get_doc_package_sources(
-    package_id: int = Path(ge=0, lt=1 << 31), db: AsyncSession = GET_SESSION  # noqa: B008
-) -> list[models.DocSource]:
+    request: Request,
+    package_id: int = Path(ge=0, lt=1 << 31),  # noqa: B008
+    db: AsyncSession = GET_SESSION,
+    cache: ResponseCache = GET_RESPONSE_CACHE,
+) -> Response:
     """Show all sources for a specific package."""
-    db_sources = await crud_docs.get_all_sources_for_package(db, package_id)
-    return db_sources
+    etag = await table_etag(db, crud_docs.SOURCES_VERSION)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    key = ("package sources", package_id, etag)
+    response = cache.get(key)
+    if response is None:
+        sources = await crud_docs.get_doc_source_dicts(db, package_id)
+        response = cache.set(key, sources, [package_tag(package_id)])
+    response.headers["ETag"] = etag
+    return response
 
 
 @router.post(
@@ -140,6 +349,7 @@ async def get_doc_package_sources(
     responses={
         **common_source_responses,
         **bad_authorisation_responses,
+        **conflict_responses,
         400: {"description": "The documentation package does not exist."},
     },
     status_code=201,
@@ -147,36 +357,46 @@ async def get_doc_package_sources(
 )
 async def create_doc_package_source(
     source: schemas.DocSourceCreationRequest, db: AsyncSession = GET_SESSION
-) -> models.DocSource:
+) -> dict[str, Any]:
     """Create a new source for a package."""
-    db_source = await crud_docs.create_doc_source(db, source)
-    return db_source
+    return await crud_docs.create_doc_source(db, source)
 
 
-@router.get("/sources/{source_id}", responses=common_source_responses)
+@router.get("/sources/{source_id}", responses={**common_source_responses, **not_modified_responses})
 async def get_doc_package_source(
-    source_id: int = Path(ge=0, lt=1 << 31), db: AsyncSession = GET_SESSION  # noqa: B008
-) -> dict[str, Any]:
+    request: Request,
+    source_id: int = Path(ge=0, lt=1 << 31),  # noqa: B008
+    db: AsyncSession = GET_SESSION,
+    cache: ResponseCache = GET_RESPONSE_CACHE,
+) -> Response:
     """Get information on the provided source number."""
-    resp = await crud_docs.get_doc_source(db, source_id)
-    if not resp:
-        raise HTTPException(404, "The source could not be found.")
-    return resp.to_dict(include_package=True)
+    etag = await table_etag(db, crud_docs.PACKAGES_VERSION, crud_docs.SOURCES_VERSION)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    key = ("source", source_id, etag)
+    response = cache.get(key)
+    if response is None:
+        source = await crud_docs.get_doc_source_dict(db, source_id)
+        if source is None:
+            raise HTTPException(404, "The source could not be found.")
+        tags = [source_tag(source_id), package_tag(source["package_id"])]
+        response = cache.set(key, source, tags)
+    response.headers["ETag"] = etag
+    return response
 
 
 @router.patch(
     "/sources/{source_id}",
-    responses={**common_source_responses, **bad_authorisation_responses},
+    responses={**common_source_responses, **bad_authorisation_responses, **conflict_responses},
     dependencies=[REQUIRE_ADMIN],
 )
 async def edit_doc_package_source(
     source: schemas.DocSourcePatchRequest,
     source_id: int = Path(ge=0, lt=1 << 31),  # noqa: B008
     db: AsyncSession = GET_SESSION,
-) -> schemas.DocSource:
+) -> dict[str, Any]:
     """Modify the provided source. This will fully replace the last source."""
-    new_source = await crud_docs.modify_doc_source(db, source_id, source)
-    return new_source
+    return await crud_docs.modify_doc_source(db, source_id, source)
 
 
 @router.delete(
@@ -196,5 +416,395 @@ async def delete_doc_package_source(
     return
 
 
-# todo (much later):
-# search routes and all of the different query args that will have
+@router.post(
+    "/sources/{source_id}/refresh",
+    name="Refresh a source's inventory",
+    responses={
+        **common_source_responses,
+        **bad_authorisation_responses,
+        400: {"description": "The source does not have an inventory."},
+        502: {"description": "The inventory could not be fetched or parsed."},
+    },
+    dependencies=[REQUIRE_ADMIN],
+)
+async def refresh_doc_package_source(
+    background_tasks: BackgroundTasks,
+    source_id: int = Path(ge=0, lt=1 << 31),  # noqa: B008
+    db: AsyncSession = GET_SESSION,
+    client: HTTPClient = GET_HTTP_CLIENT,
+    indexes: SymbolIndexes = GET_SYMBOL_INDEXES,
+    files: InventoryFiles = GET_INVENTORY_FILES,
+    *,
+    mode: RefreshMode = RefreshMode.incremental,
+    force: bool = False,
+) -> dict[str, Any]:
+    """
+    Fetch the inventory of the provided source and update its stored symbols.
+
+    By default only the difference to the stored symbols is written, and nothing is written if
+    the inventory is unchanged since the last refresh. `force` refreshes regardless.
+    """
+    async with db.begin():
+        source = await crud_docs.get_doc_source(db, source_id)
+    if not source:
+        raise HTTPException(404, "The source could not be found.")
+    if not source.inventory_url:
+        raise HTTPException(400, "The source does not have an inventory.")
+    try:
+        result = await ingest.ingest_source(db, source, client=client, mode=mode, force=force)
+    except ingest.IngestionError as e:
+        raise HTTPException(502, str(e)) from e
+    if result is None:
+        return {"source_id": source_id, "modified": False}
+    indexes.invalidate(source_id)
+    files.invalidate(source_id)
+    background_tasks.add_task(ingest.collect_garbage, source_id)
+    background_tasks.add_task(indexes.rebuild_file, source_id)
+    return {"source_id": source_id, "modified": True, **result._asdict()}
+
+
+@router.get(
+    "/sources/{source_id}/inventory",
+    name="Get the inventory state of a source",
+    responses={
+        **common_source_responses,
+        **bad_authorisation_responses,
+        **not_modified_responses,
+    },
+    dependencies=[REQUIRE_ADMIN],
+)
+async def get_doc_package_source_inventory(
+    request: Request,
+    response: Response,
+    source_id: int = Path(ge=0, lt=1 << 31),  # noqa: B008
+    db: AsyncSession = GET_SESSION,
+) -> dict[str, Any] | Response:
+    """Show the served generation of a source's symbols and the outcome of its last refresh."""
+    # the symbols only change along with the refresh state of their source
+    etag = await table_etag(db, crud_docs.SOURCE_REFRESHES_VERSION)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    async with db.begin():
+        source = await crud_docs.get_doc_source(db, source_id)
+        if not source:
+            raise HTTPException(404, "The source could not be found.")
+        symbols = 0
+        if source.current_generation is not None:
+            symbols = await crud_symbols.count_symbols(
+                db, source_id, source.current_generation  # type: ignore
+            )
+    return {**source.to_inventory_dict(), "symbols": symbols}
+
+
+inventory_file_responses: dict[str | int, dict[str, Any]] = {
+    200: {
+        "description": "A version 2 Sphinx inventory.",
+        "content": {INVENTORY_MEDIA_TYPE: {}},
+    },
+}
+
+
+@router.get(
+    "/sources/{source_id}/objects.inv",
+    name="Get the inventory of a source",
+    response_class=Response,
+    responses={**common_source_responses, **inventory_file_responses, **not_modified_responses},
+)
+async def get_doc_package_source_objects_inv(
+    request: Request,
+    source_id: int = Path(ge=0, lt=1 << 31),  # noqa: B008
+    db: AsyncSession = GET_SESSION,
+    files: InventoryFiles = GET_INVENTORY_FILES,
+) -> Response:
+    """
+    Download the stored symbols of the source as a Sphinx inventory, for use with intersphinx.
+
+    The inventory is generated once for every refresh of the source which changes its symbols.
+    """
+    async with db.begin():
+        source = await crud_docs.get_doc_source(db, source_id)
+    if not source:
+        raise HTTPException(404, "The source could not be found.")
+    file = await files.get(db, SourceVersion.from_source(source))
+    if etag_matches(request, file.etag):
+        return not_modified(file.etag)
+    return Response(file.content, media_type=INVENTORY_MEDIA_TYPE, headers={"ETag": file.etag})
+
+
+@router.get(
+    "/packages/{package}/objects.inv",
+    name="Get the inventory of a package",
+    response_class=Response,
+    responses={**common_package_responses, **inventory_file_responses, **not_modified_responses},
+)
+async def get_doc_package_objects_inv(
+    request: Request,
+    package: str,
+    db: AsyncSession = GET_SESSION,
+    indexes: SymbolIndexes = GET_SYMBOL_INDEXES,
+    files: InventoryFiles = GET_INVENTORY_FILES,
+) -> Response:
+    """
+    Download the stored symbols of the default source of the named package as a Sphinx inventory.
+
+    The inventory is generated once for every refresh of the source which changes its symbols.
+    """
+    version = await indexes.default_source(db, package)
+    if version is None:
+        raise HTTPException(404, "The package could not be found.")
+    file = await files.get(db, version)
+    if etag_matches(request, file.etag):
+        return not_modified(file.etag)
+    return Response(file.content, media_type=INVENTORY_MEDIA_TYPE, headers={"ETag": file.etag})
+
+
+# these must be registered before the symbol route, which would otherwise match them
+@router.get(
+    "/packages/{package}/symbols/complete",
+    name="Complete a symbol name",
+    responses={**common_package_responses, **not_modified_responses},
+)
+async def complete_package_symbol(
+    request: Request,
+    package: str,
+    db: AsyncSession = GET_SESSION,
+    indexes: SymbolIndexes = GET_SYMBOL_INDEXES,
+    *,
+    q: str = Query(min_length=1, max_length=200),  # noqa: B008
+    limit: int = Query(10, ge=1, le=25),  # noqa: B008
+) -> Response:
+    """
+    Complete the start of a symbol name from the default source of the named package.
+
+    Names starting with the query are matched case-insensitively, and ranked with python objects,
+    higher priorities and then shorter names first.
+    """
+    version = await indexes.default_source(db, package)
+    if version is None:
+        raise HTTPException(404, "The package could not be found.")
+    etag = make_etag(version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    symbols = await indexes.complete(db, version, q, limit)
+    return FastJSONResponse(
+        {
+            "package": package,
+            "source_id": version.source_id,
+            "query": q,
+            "completions": [symbol_to_dict(version, symbol) for symbol in symbols],
+        },
+        headers={"ETag": etag},
+    )
+
+
+@router.get(
+    "/packages/{package}/symbols/search",
+    name="Search for similar symbol names",
+    responses={**common_package_responses, **not_modified_responses},
+)
+async def search_package_symbols(
+    request: Request,
+    package: str,
+    db: AsyncSession = GET_SESSION,
+    indexes: SymbolIndexes = GET_SYMBOL_INDEXES,
+    *,
+    q: str = Query(min_length=1, max_length=200),  # noqa: B008
+    limit: int = Query(10, ge=1, le=25),  # noqa: B008
+    threshold: float = Query(0.3, ge=0, le=1),  # noqa: B008
+) -> Response:
+    """
+    Suggest the symbols of the default source of the named package with names similar to `q`.
+
+    Names are compared by the trigrams they share, so this finds names with typos in them.
+    Suggestions are scored from 0 to 1, and only those scoring at least `threshold` are returned.
+    """
+    version = await indexes.default_source(db, package)
+    if version is None:
+        raise HTTPException(404, "The package could not be found.")
+    etag = make_etag(version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    results = await indexes.search(version, q, limit, threshold)
+    return FastJSONResponse(
+        {
+            "package": package,
+            "source_id": version.source_id,
+            "query": q,
+            "suggestions": [
+                {**symbol_to_dict(version, symbol), "score": round(score, 3)}
+                for score, symbol in results
+            ],
+        },
+        headers={"ETag": etag},
+    )
+
+
+@router.get(
+    "/packages/{package}/symbols/{name:path}",
+    name="Resolve a symbol",
+    responses={**common_symbol_responses, **not_modified_responses},
+)
+async def get_package_symbol(
+    request: Request,
+    package: str,
+    name: str,
+    db: AsyncSession = GET_SESSION,
+    indexes: SymbolIndexes = GET_SYMBOL_INDEXES,
+    *,
+    domain: str | None = None,
+    role: str | None = None,
+) -> Response:
+    """
+    Resolve a symbol of the default source of the named package to its url.
+
+    Every symbol with the name is returned, best match first, optionally filtered by domain and
+    role. Lookups are served from an in-process index of the source's symbols.
+    """
+    version = await indexes.default_source(db, package)
+    if version is None:
+        raise HTTPException(404, "The package could not be found.")
+    etag = make_etag(version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    symbols = await indexes.lookup(db, version, name)
+    matches = [
+        symbol_to_dict(version, symbol)
+        for symbol in symbols
+        if (domain is None or symbol.domain == domain) and (role is None or symbol.role == role)
+    ]
+    if not matches:
+        raise HTTPException(404, "The symbol could not be found.")
+    return FastJSONResponse(
+        {"package": package, "source_id": version.source_id, "name": name, "matches": matches},
+        headers={"ETag": etag},
+    )
+
+
+@router.post("/symbols/resolve", name="Resolve many symbols")
+async def resolve_symbols(
+    request: schemas.SymbolResolutionRequest,
+    db: AsyncSession = GET_SESSION,
+    indexes: SymbolIndexes = GET_SYMBOL_INDEXES,
+) -> dict[str, Any]:
+    """
+    Resolve symbols of the default sources of many packages at once.
+
+    Results are in the order the symbols were requested in. A symbol which could not be found, or
+    whose package could not be found, has no matches. Symbols of the same package are looked up
+    together, with one index pass or database query per package.
+    """
+    names: dict[str, set[str]] = {}
+    for symbol in request.symbols:
+        names.setdefault(symbol.package, set()).add(symbol.name)
+
+    versions = {}
+    found = {}
+    for package, package_names in names.items():
+        version = await indexes.default_source(db, package)
+        if version is None:
+            continue
+        versions[package] = version
+        found[package] = await indexes.lookup_many(db, version, package_names)
+
+    results = []
+    for symbol in request.symbols:
+        version = versions.get(symbol.package)
+        matches = []
+        if version is not None:
+            matches = [
+                symbol_to_dict(version, entry) for entry in found[symbol.package][symbol.name]
+            ]
+        results.append(
+            {
+                "package": symbol.package,
+                "name": symbol.name,
+                "source_id": version.source_id if version else None,
+                "found": bool(matches),
+                "matches": matches,
+            }
+        )
+    return {"results": results}
+
+
+@router.get(
+    "/owners/{name:path}",
+    name="Find the packages documenting a name",
+    responses={**common_symbol_responses, **not_modified_responses},
+)
+async def get_name_owners(
+    request: Request,
+    name: str,
+    db: AsyncSession = GET_SESSION,
+    indexes: SymbolIndexes = GET_SYMBOL_INDEXES,
+) -> Response:
+    """
+    Find which packages document the top-level python module of a dotted name.
+
+    The first owner is the package the name most likely belongs to. Packages documenting the same
+    module are ordered by how many symbols they document within it, then by which was added first.
+    """
+    owners = await indexes.owners(db, name)
+    if not owners:
+        raise HTTPException(404, "No package documents the module of the name.")
+    # the response is rendered from the owners alone, which are already in memory
+    etag = make_etag(*owners)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return FastJSONResponse(
+        {
+            "name": name,
+            "module": name.partition(".")[0],
+            "owner": owners[0]._asdict(),
+            "owners": [owner._asdict() for owner in owners],
+        },
+        headers={"ETag": etag},
+    )
+
+
+@router.get(
+    "/export",
+    name="Export the registry",
+    response_class=StreamingResponse,
+    responses={
+        **bad_authorisation_responses,
+        200: {"description": "Newline delimited json.", "content": {EXPORT_MEDIA_TYPE: {}}},
+    },
+    dependencies=[REQUIRE_ADMIN],
+)
+async def export_registry(
+    db: AsyncSession = GET_SESSION, *, include_symbols: bool = False
+) -> StreamingResponse:
+    """
+    Stream every package with its sources as newline delimited json, for mirroring the registry.
+
+    Every line is an object with a `type`. Packages are `package` lines in order of id, and if
+    `include_symbols` is set, the symbols served by their sources follow them as `symbol` lines.
+    Rows are read through server-side cursors as the response is sent, from one snapshot of the
+    database, so the export is consistent even if sources are refreshed while it is streamed.
+    """
+
+    async def lines() -> AsyncIterator[bytes]:
+        async with db.begin():
+            await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            async for package in crud_docs.stream_doc_packages(db):
+                yield render_json({"type": "package", **package}) + b"\n"
+                if not include_symbols:
+                    continue
+                for source in package["sources"]:
+                    if source["current_generation"] is None:
+                        continue
+                    chunk = bytearray()
+                    async for entry in crud_symbols.stream_symbols(
+                        db, source["id"], source["current_generation"]
+                    ):
+                        line = {"type": "symbol", "source_id": source["id"], **entry._asdict()}
+                        chunk += render_json(line)
+                        chunk += b"\n"
+                        if len(chunk) >= EXPORT_CHUNK_SIZE:
+                            yield bytes(chunk)
+                            chunk.clear()
+                    if chunk:
+                        yield bytes(chunk)
+
+    return StreamingResponse(lines(), media_type=EXPORT_MEDIA_TYPE)
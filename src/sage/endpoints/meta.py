@@ -1,8 +1,13 @@
 from typing import Any
 
 from fastapi import APIRouter, FastAPI, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from sage import database
+from sage.cache import ResponseCache
+from sage.core.dependencies import GET_HTTP_CLIENT, GET_RESPONSE_CACHE, GET_SESSION, REQUIRE_ADMIN
 from sage.core.models.meta import APIMetadata
+from sage.http import HTTPClient
 
 
 router = APIRouter(tags=["meta"])
@@ -13,3 +18,29 @@ async def info(request: Request) -> dict[str, Any]:
     """Return the metadata for the API."""
     app: FastAPI = request.app
     return {"name": app.title, "version": app.version, "contact": app.contact}
+
+
+@router.get("/stats/http", dependencies=[REQUIRE_ADMIN])
+async def http_stats(client: HTTPClient = GET_HTTP_CLIENT) -> dict[str, Any]:
+    """Return statistics on the connection pool used for outbound requests."""
+    return client.stats()
+
+
+@router.get("/stats/cache", dependencies=[REQUIRE_ADMIN])
+async def cache_stats(cache: ResponseCache = GET_RESPONSE_CACHE) -> dict[str, Any]:
+    """Return statistics on the cache of responses to reads of packages and sources."""
+    return cache.stats()
+
+
+@router.get("/stats/database", dependencies=[REQUIRE_ADMIN])
+async def database_stats(db: AsyncSession = GET_SESSION) -> dict[str, Any]:
+    """
+    Return statistics on the database connection pool of this process, and on the server.
+
+    Every process has its own pool, so the server must allow at least the pool size and overflow
+    of every process.
+    """
+    pool: database.MeteredPool = database.engine.sync_engine.pool  # type: ignore
+    # the pool is read before the session checks out a connection to query the server
+    stats = pool.stats()
+    return {**stats, "server": await database.get_server_connections(db)}
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+from starlette.responses import RedirectResponse
+
+from sage.core.dependencies import GET_SESSION, GET_SYMBOL_INDEXES
+from sage.core.inventory.index import SymbolIndexes
+from sage.settings import get_settings
+
+
+router = APIRouter(tags=["redirects"])
+
+
+@router.get(
+    "/r/{package}/{name:path}",
+    name="Redirect to the documentation of a symbol",
+    status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+    response_class=RedirectResponse,
+    responses={
+        307: {"description": "Redirect to the url of the symbol."},
+        404: {"description": "The package or symbol could not be found."},
+    },
+)
+async def redirect_to_symbol(
+    package: str,
+    name: str,
+    db: AsyncSession = GET_SESSION,
+    indexes: SymbolIndexes = GET_SYMBOL_INDEXES,
+) -> RedirectResponse:
+    """
+    Redirect to the url of the best match of a symbol of the default source of the named package.
+
+    The resolved url is cached, and the redirect may be cached by browsers and proxies as well.
+    """
+    url = await indexes.resolve_url(db, package, name)
+    if url is None:
+        raise HTTPException(404, "The symbol could not be found.")
+    max_age = get_settings().index.redirect_max_age
+    return RedirectResponse(
+        url,
+        status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+        headers={"Cache-Control": f"public, max-age={max_age}"},
+    )
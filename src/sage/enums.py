@@ -1,7 +1,7 @@
 import enum
 
 
-__all__ = ("ProgrammingLanguage", "LanguageCode")
+__all__ = ("ProgrammingLanguage", "LanguageCode", "RefreshMode", "ParseMode", "ImportStatus")
 
 
 class ProgrammingLanguage(str, enum.Enum):
@@ -45,3 +45,32 @@ class LanguageCode(str, enum.Enum):
     vi = "vi"
     zh_CN = "zh-CN"
     zh_TW = "zh-TW"
+
+
+class RefreshMode(str, enum.Enum):
+    """How the symbols of a source are replaced when its inventory is refreshed."""
+
+    # only write the symbols which were added, removed or changed
+    incremental = "incremental"
+    # load every symbol as a new generation and swap to it
+    full = "full"
+
+
+class ParseMode(str, enum.Enum):
+    """Where inventories are parsed while they are ingested."""
+
+    # on the event loop, yielding to it between batches
+    inline = "inline"
+    thread = "thread"
+    process = "process"
+
+
+class ImportStatus(str, enum.Enum):
+    """What importing a package or source did to it."""
+
+    created = "created"
+    updated = "updated"
+    # it was already stored exactly as imported, so nothing was written
+    unchanged = "unchanged"
+    # it failed validation, so it was not imported
+    invalid = "invalid"
@@ -0,0 +1,164 @@
+import asyncio
+import contextlib
+import logging
+from collections import defaultdict
+from typing import Any, AsyncIterator
+
+import httpx
+
+from sage.settings import HTTPSettings, get_settings
+
+
+__all__ = ("HTTPClient", "close_http_client", "get_http_client", "start_http_client")
+
+log = logging.getLogger(__name__)
+
+USER_AGENT = "sage (+https://github.com/onerandomusername/sage)"
+# responses with these statuses are retried, as they are usually temporary
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+
+class HTTPClient:
+    """
+    Pooled client for outbound requests, shared for the lifetime of the application.
+
+    Connections are kept alive and reused, and the amount of concurrent requests to a single host
+    is capped so fanning out to many sources on one host does not get us throttled. Requests that
+    fail to connect or receive a temporary error status are retried a bounded amount of times.
+    """
+
+    def __init__(self, settings: HTTPSettings) -> None:
+        self.settings = settings
+        self._transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=settings.max_connections,
+                max_keepalive_connections=settings.max_keepalive_connections,
+                keepalive_expiry=settings.keepalive_expiry,
+            ),
+        )
+        self.client = httpx.AsyncClient(
+            transport=self._transport,
+            timeout=httpx.Timeout(settings.timeout, connect=settings.connect_timeout),
+            headers={"User-Agent": USER_AGENT},
+            follow_redirects=True,
+        )
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+        self._in_flight: defaultdict[str, int] = defaultdict(int)
+        self._waiting: defaultdict[str, int] = defaultdict(int)
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    def _host_limit(self, host: str) -> asyncio.Semaphore:
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.settings.max_connections_per_host)
+        return self._host_limits[host]
+
+    @contextlib.asynccontextmanager
+    async def _host_slot(self, host: str) -> AsyncIterator[None]:
+        self._waiting[host] += 1
+        try:
+            await self._host_limit(host).acquire()
+        finally:
+            self._waiting[host] -= 1
+        self._in_flight[host] += 1
+        try:
+            yield
+        finally:
+            self._in_flight[host] -= 1
+            self._host_limit(host).release()
+
+    async def _send(self, request: httpx.Request) -> httpx.Response:
+        """Send the request, retrying connection errors and temporary error statuses."""
+        attempts = self.settings.retries + 1
+        for attempt in range(1, attempts + 1):
+            self.requests += 1
+            try:
+                response = await self.client.send(request, stream=True)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError):
+                if attempt == attempts:
+                    self.failures += 1
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == attempts:
+                    return response
+                await response.aclose()
+
+            self.retries += 1
+            delay = self.settings.retry_backoff * 2 ** (attempt - 1)
+            log.debug("Retrying %s %s in %.1f seconds", request.method, request.url, delay)
+            await asyncio.sleep(delay)
+        raise AssertionError("unreachable")
+
+    @contextlib.asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """Send a request and stream its response, with the same arguments as httpx."""
+        request = self.client.build_request(method, url, **kwargs)
+        async with self._host_slot(request.url.host):
+            response = await self._send(request)
+            try:
+                yield response
+            finally:
+                await response.aclose()
+
+    def stats(self) -> dict[str, Any]:
+        """Get statistics on the connection pool and the requests made through it."""
+        # the connection pool is not exposed publicly by httpx, so its connections are only
+        # reported while it still has the shape this expects
+        pool = getattr(self._transport, "_pool", None)
+        connections = getattr(pool, "connections", None)
+        total: int | None = None
+        idle: int | None = None
+        active: int | None = None
+        if isinstance(connections, list):
+            total = len(connections)
+            idle = sum(1 for connection in connections if connection.is_idle())
+            active = total - idle
+        hosts = {
+            host: {"in_flight": self._in_flight[host], "waiting": self._waiting[host]}
+            for host in self._host_limits
+        }
+        return {
+            "connections": {
+                "open": total,
+                "idle": idle,
+                "active": active,
+                "max": self.settings.max_connections,
+                "max_keepalive": self.settings.max_keepalive_connections,
+            },
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "max_per_host": self.settings.max_connections_per_host,
+            "hosts": hosts,
+        }
+
+    async def aclose(self) -> None:
+        """Close every pooled connection."""
+        await self.client.aclose()
+
+
+_HTTP_CLIENT: HTTPClient | None = None
+
+
+def start_http_client() -> HTTPClient:
+    """Create the global http client."""
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is None:
+        _HTTP_CLIENT = HTTPClient(get_settings().http)
+    return _HTTP_CLIENT
+
+
+def get_http_client() -> HTTPClient:
+    """Get the global http client, which must have been started."""
+    if _HTTP_CLIENT is None:
+        raise RuntimeError("The http client has not been started.")
+    return _HTTP_CLIENT
+
+
+async def close_http_client() -> None:
+    """Close the global http client, if it was started."""
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is not None:
+        await _HTTP_CLIENT.aclose()
+        _HTTP_CLIENT = None
@@ -0,0 +1,25 @@
+from typing import Any
+
+import orjson
+from starlette.responses import JSONResponse
+
+
+__all__ = ("FastJSONResponse", "render_json")
+
+
+def render_json(content: Any) -> bytes:
+    """
+    Render content made of json types, enums and datetimes as json with orjson.
+
+    Unlike FastAPI's encoder this does not convert the content first, so it must not contain
+    models, but it renders several times faster.
+    """
+    return orjson.dumps(content)
+
+
+class FastJSONResponse(JSONResponse):
+    """A json response which renders its content with `render_json`, skipping FastAPI's encoder."""
+
+    def render(self, content: Any) -> bytes:
+        """Render the content as json."""
+        return render_json(content)
@@ -1,7 +1,20 @@
+from pathlib import Path
+
 from pydantic import BaseSettings, Field, PostgresDsn, SecretBytes
 
+from sage.enums import ParseMode
+
 
-__all__ = ("Settings", "get_settings")
+__all__ = (
+    "Settings",
+    "CacheSettings",
+    "DatabaseSettings",
+    "HTTPSettings",
+    "IndexSettings",
+    "InventorySettings",
+    "RefreshSettings",
+    "get_settings",
+)
 
 
 class AsyncPostgresDsn(PostgresDsn):  # noqa: D101
@@ -20,12 +33,125 @@ class AdminSettings(BaseSettings):
         env_prefix = "SAGE_ADMIN_"
 
 
+class DatabaseSettings(BaseSettings):
+    """Settings for the database engine and its connection pool, within every process."""
+
+    # connections kept open in the pool
+    pool_size: int = 5
+    # connections opened beyond the pool size under load, and closed once returned
+    max_overflow: int = 10
+    # seconds to wait for a connection once every connection is checked out
+    pool_timeout: float = 30.0
+    # seconds after which a connection is replaced when it is next checked out, -1 to never
+    pool_recycle: int = -1
+    # test every connection as it is checked out, to replace those closed by the server
+    pool_pre_ping: bool = False
+    # prepared statements cached by each connection, 0 to disable when behind pgbouncer
+    statement_cache_size: int = 100
+    # log every statement
+    echo: bool = False
+
+    class Config:  # noqa: D106
+        env_prefix = "SAGE_DATABASE_"
+
+
+class HTTPSettings(BaseSettings):
+    """Settings for the client used for outbound requests, such as fetching inventories."""
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    # seconds an idle connection is kept open for reuse
+    keepalive_expiry: float = 30.0
+    # many sources are hosted on the same host, such as readthedocs.io
+    max_connections_per_host: int = 4
+    timeout: float = 30.0
+    connect_timeout: float = 10.0
+    retries: int = 2
+    # seconds to wait before the first retry, doubled for every further retry
+    retry_backoff: float = 0.5
+
+    class Config:  # noqa: D106
+        env_prefix = "SAGE_HTTP_"
+
+
+class RefreshSettings(BaseSettings):
+    """Settings for the scheduler which keeps inventories up to date."""
+
+    # run the scheduler within the api process, rather than with `python -m sage.worker`
+    in_process: bool = False
+    # default seconds between refreshes of a source
+    interval: int = 6 * 60 * 60
+    # fraction by which every delay is randomly lengthened or shortened
+    jitter: float = 0.1
+    # seconds before the first retry of a failing source, doubled with each further failure
+    failure_backoff: int = 5 * 60
+    max_failure_backoff: int = 24 * 60 * 60
+    # maximum amount of sources refreshed at once
+    max_concurrency: int = 8
+    # seconds between checks for due sources
+    poll_interval: float = 30.0
+    # seconds a claimed source is hidden from other schedulers while it is being refreshed
+    lease: int = 10 * 60
+
+    class Config:  # noqa: D106
+        env_prefix = "SAGE_REFRESH_"
+
+
+class InventorySettings(BaseSettings):
+    """Settings for parsing inventories."""
+
+    # process pools keep parsing from stalling other requests, at the cost of holding every parsed
+    # batch of an inventory in memory at once
+    parse_mode: ParseMode = ParseMode.process
+    # defaults to the amount of processors
+    parse_workers: int | None = None
+
+    class Config:  # noqa: D106
+        env_prefix = "SAGE_INVENTORY_"
+
+
+class CacheSettings(BaseSettings):
+    """Settings for the cache of responses to reads of packages and sources."""
+
+    # maximum amount of responses which are cached, 0 to disable caching
+    max_entries: int = 1024
+    # mutations only invalidate the cache of the process they are made in, so entries also expire
+    ttl: float = 60.0
+
+    class Config:  # noqa: D106
+        env_prefix = "SAGE_CACHE_"
+
+
+class IndexSettings(BaseSettings):
+    """Settings for the in-process indexes which serve symbol lookups."""
+
+    # seconds before the default source of a package is checked for new symbols again
+    ttl: float = 10.0
+    # maximum amount of sources which have their symbols indexed at once
+    max_sources: int = 32
+    # maximum amount of resolved symbol urls which are cached for redirects
+    max_urls: int = 100_000
+    # seconds browsers and proxies may cache a redirect to the url of a symbol
+    redirect_max_age: int = 3600
+    # where index files of the symbols of sources are written to, shared by every process using it
+    directory: Path | None = None
+
+    class Config:  # noqa: D106
+        env_prefix = "SAGE_INDEX_"
+
+
 class Settings(BaseSettings):
     """The main configuration for Sage."""
 
     database_bind: AsyncPostgresDsn = Field(env="SAGE_DATABASE_BIND")
     debug: bool = False
     admin: AdminSettings = AdminSettings()  # type: ignore # these are filled by env vars
+    database: DatabaseSettings = DatabaseSettings()
+    http: HTTPSettings = HTTPSettings()
+    cache: CacheSettings = CacheSettings()
+    inventory: InventorySettings = InventorySettings()
+    index: IndexSettings = IndexSettings()
+    refresh: RefreshSettings = RefreshSettings()
 
     class Config:  # noqa: D106
         env_prefix = "SAGE_"
@@ -0,0 +1,39 @@
+"""
+Standalone worker which refreshes inventories outside of the api process.
+
+Run with `python -m sage.worker`. Any amount of workers may run at once.
+"""
+
+import asyncio
+import contextlib
+import signal
+
+from sage.core.inventory.executor import shutdown_parse_executor
+from sage.core.inventory.scheduler import RefreshScheduler
+from sage.http import close_http_client, start_http_client
+from sage.logging import configure_logging
+from sage.settings import get_settings
+
+
+async def main() -> None:
+    """Run the refresh scheduler until interrupted."""
+    configure_logging()
+    scheduler = RefreshScheduler(get_settings().refresh, start_http_client())
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(sig, stop.set)
+
+    scheduler.start()
+    try:
+        await stop.wait()
+    finally:
+        await scheduler.stop()
+        await close_http_client()
+        shutdown_parse_executor()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
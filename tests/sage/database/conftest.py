@@ -0,0 +1,93 @@
+import asyncio
+from pathlib import Path
+from typing import Awaitable, Callable, TypeVar
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import delete, exc, insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from sage.core.database import models
+from sage.enums import LanguageCode, ProgrammingLanguage
+from sage.settings import get_settings
+
+
+T = TypeVar("T")
+
+MIGRATIONS = Path(__file__).parents[3] / "src/sage/core/database/migrations"
+PACKAGE_NAME = "test_database"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def migrated_database() -> None:
+    """Skip unless the configured database is available, and migrate it to the latest revision."""
+
+    async def connect() -> None:
+        engine = create_async_engine(get_settings().database_bind, poolclass=NullPool)
+        try:
+            async with engine.connect():
+                pass
+        finally:
+            await engine.dispose()
+
+    try:
+        asyncio.run(connect())
+    except (OSError, asyncio.TimeoutError, exc.DBAPIError) as e:
+        pytest.skip(f"the database is unavailable: {e}")
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS))
+    command.upgrade(config, "head")
+
+
+async def _run_with_source(test: Callable[[AsyncSession, int], Awaitable[T]]) -> T:
+    engine = create_async_engine(get_settings().database_bind, poolclass=NullPool)
+    Session = sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    try:
+        async with Session() as db:  # type: ignore
+            async with db.begin():
+                package_id = await db.scalar(
+                    insert(models.DocPackage)
+                    .values(
+                        name=PACKAGE_NAME,
+                        homepage="https://example.com",
+                        programming_language=ProgrammingLanguage.python,
+                    )
+                    .returning(models.DocPackage.id)
+                )
+                source_id = await db.scalar(
+                    insert(models.DocSource)
+                    .values(
+                        package_id=package_id,
+                        default=True,
+                        inventory_url="https://example.com/objects.inv",
+                        human_friendly_url="https://example.com",
+                        language_code=LanguageCode.en_US,
+                    )
+                    .returning(models.DocSource.id)
+                )
+                await db.commit()
+            try:
+                return await test(db, source_id)
+            finally:
+                async with db.begin():
+                    await db.execute(
+                        delete(models.DocPackage)
+                        .where(models.DocPackage.id == package_id)
+                        .execution_options(synchronize_session=False)
+                    )
+                    await db.commit()
+    finally:
+        await engine.dispose()
+
+
+@pytest.fixture()
+def with_source() -> Callable[[Callable[[AsyncSession, int], Awaitable[T]]], T]:
+    """
+    Run a test with a new package and source, which are deleted afterwards with their symbols.
+
+    The test is called with a session and the id of the source.
+    """
+    return lambda test: asyncio.run(_run_with_source(test))
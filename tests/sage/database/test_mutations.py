@@ -0,0 +1,192 @@
+import contextlib
+from typing import Any, Callable, Iterator
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from sage.core.database import models, schemas
+from sage.core.database.crud import docs as crud_docs
+from sage.enums import LanguageCode, ProgrammingLanguage
+
+
+CREATED_PACKAGE_NAME = "test_database_created"
+
+
+@contextlib.contextmanager
+def recorded_statements(db: AsyncSession) -> Iterator[list[str]]:
+    """Record every statement the session sends to the database."""
+    statements: list[str] = []
+
+    def record(
+        conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+    ) -> None:
+        statements.append(statement)
+
+    engine = db.bind.sync_engine  # type: ignore
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+async def get_package_id(db: AsyncSession, source_id: int) -> int:
+    """Get the id of the package of the source."""
+    async with db.begin():
+        stmt = select(models.DocSource.package_id).where(models.DocSource.id == source_id)
+        return (await db.execute(stmt)).scalar_one()
+
+
+async def get_defaults(db: AsyncSession, package_id: int) -> dict[int, bool]:
+    """Get whether each source of the package is its default."""
+    async with db.begin():
+        stmt = select(models.DocSource.id, models.DocSource.default).where(
+            models.DocSource.package_id == package_id
+        )
+        return dict((await db.execute(stmt)).all())  # type: ignore
+
+
+def test_create_and_delete_package(with_source: Callable[..., None]) -> None:
+    """Ensure a package and its sources are created, and deleted, with one statement each."""
+    request = schemas.DocPackageCreationRequest(
+        name=CREATED_PACKAGE_NAME,
+        homepage="https://example.com",
+        programming_language=ProgrammingLanguage.python,
+        sources=[
+            {"inventory_url": "https://example.com/1/objects.inv", "language_code": "en-US"},
+            {
+                "inventory_url": "https://example.com/2/objects.inv",
+                "language_code": "en-US",
+                "version": "2",
+                "default": True,
+            },
+        ],
+    )
+
+    async def test(db: AsyncSession, source_id: int) -> None:
+        try:
+            with recorded_statements(db) as statements:
+                package = await crud_docs.create_doc_package(db, request)
+            assert len(statements) == 1
+            async with db.begin():
+                stored = await crud_docs.get_doc_package_dict(db, package["id"])
+            assert package == stored
+            assert [source["human_friendly_url"] for source in package["sources"]] == [
+                "https://example.com/1",
+                "https://example.com/2",
+            ]
+            sources = [source["id"] for source in package["sources"]]
+            assert await get_defaults(db, package["id"]) == {sources[0]: False, sources[1]: True}
+
+            with recorded_statements(db) as statements:
+                await crud_docs.delete_doc_package(db, package["id"])
+            assert len(statements) == 1
+            with pytest.raises(HTTPException) as e:
+                await crud_docs.delete_doc_package(db, package["id"])
+            assert e.value.status_code == 404
+        finally:
+            async with db.begin():
+                await db.execute(
+                    delete(models.DocPackage)
+                    .where(models.DocPackage.name == CREATED_PACKAGE_NAME)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+
+    with_source(test)
+
+
+def test_modify_package(with_source: Callable[..., None]) -> None:
+    """Ensure a package is modified with one statement, which returns the modified package."""
+
+    async def test(db: AsyncSession, source_id: int) -> None:
+        package_id = await get_package_id(db, source_id)
+        request = schemas.DocPackagePatchRequest(
+            name="test_database",
+            homepage="https://example.com/docs",
+            programming_language=ProgrammingLanguage.text,
+        )
+        with recorded_statements(db) as statements:
+            package = await crud_docs.modify_doc_package(db, package_id, request)
+        assert len(statements) == 1
+        assert package == {
+            "id": package_id,
+            "name": "test_database",
+            "homepage": "https://example.com/docs",
+            "programming_language": ProgrammingLanguage.text,
+        }
+
+        with pytest.raises(HTTPException) as e:
+            await crud_docs.modify_doc_package(db, (1 << 31) - 1, request)
+        assert e.value.status_code == 404
+
+    with_source(test)
+
+
+@pytest.mark.parametrize(("default", "statements"), [(False, 1), (True, 2)])
+def test_create_source(with_source: Callable[..., None], default: bool, statements: int) -> None:
+    """Ensure a source is created with one statement, after unsetting the previous default."""
+
+    async def test(db: AsyncSession, source_id: int) -> None:
+        package_id = await get_package_id(db, source_id)
+        request = schemas.DocSourceCreationRequest(
+            package_id=package_id,
+            inventory_url="https://example.com/2/objects.inv",
+            language_code=LanguageCode.en_US,
+            default=default,
+        )
+        with recorded_statements(db) as sent:
+            source = await crud_docs.create_doc_source(db, request)
+        assert len(sent) == statements
+        assert source == {
+            "id": source["id"],
+            "package_id": package_id,
+            # the column defaults of the model still apply
+            "preview": False,
+            "inventory_url": "https://example.com/2/objects.inv",
+            "human_friendly_url": "https://example.com/2",
+            "version": None,
+            "language_code": LanguageCode.en_US,
+            "default": default,
+        }
+        assert await get_defaults(db, package_id) == {source_id: not default, source["id"]: default}
+
+        missing = request.copy(update={"package_id": (1 << 31) - 1})
+        with pytest.raises(HTTPException) as e:
+            await crud_docs.create_doc_source(db, missing)
+        assert e.value.status_code == 400
+
+    with_source(test)
+
+
+def test_modify_and_delete_source(with_source: Callable[..., None]) -> None:
+    """Ensure a source is modified, and deleted, with one statement each."""
+
+    async def test(db: AsyncSession, source_id: int) -> None:
+        package_id = await get_package_id(db, source_id)
+        request = schemas.DocSourcePatchRequest(
+            inventory_url="https://example.com/en/objects.inv",
+            language_code=LanguageCode.en_GB,
+            preview=True,
+        )
+        with recorded_statements(db) as statements:
+            source = await crud_docs.modify_doc_source(db, source_id, request)
+        assert len(statements) == 1
+        async with db.begin():
+            stored = await crud_docs.get_doc_source_dict(db, source_id)
+        assert source == {**stored, "default": True}  # type: ignore
+        assert source["preview"] is True
+        assert source["inventory_url"] == "https://example.com/en/objects.inv"
+        assert source["package"]["id"] == package_id
+
+        with recorded_statements(db) as statements:
+            await crud_docs.delete_doc_source(db, source_id)
+        assert len(statements) == 1
+        assert await get_defaults(db, package_id) == {}
+        with pytest.raises(HTTPException) as e:
+            await crud_docs.modify_doc_source(db, source_id, request)
+        assert e.value.status_code == 404
+
+    with_source(test)
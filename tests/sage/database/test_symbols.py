@@ -0,0 +1,110 @@
+from typing import AsyncIterator, Callable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from sage.core.database import models
+from sage.core.database.crud import symbols as crud_symbols
+from sage.core.inventory import InventoryEntry
+from sage.core.inventory.executor import encode_rows
+
+
+async def batches(source_id: int, entries: list[InventoryEntry]) -> AsyncIterator[bytes]:
+    """Provide the entries as one batch of encoded rows."""
+    yield encode_rows(source_id, entries)
+
+
+async def stored_symbols(db: AsyncSession, source_id: int) -> set[InventoryEntry]:
+    """Get the symbols of the current generation of the source."""
+    async with db.begin():
+        generation = await db.scalar(
+            select(models.DocSource.current_generation).where(models.DocSource.id == source_id)
+        )
+        return set(await crud_symbols.get_symbols(db, source_id, generation))
+
+
+def entry(name: str, uri: str = "api.html#$", display_name: str | None = None) -> InventoryEntry:
+    """Make an entry of a python class."""
+    return InventoryEntry(name, "py", "class", 1, uri, display_name)
+
+
+def test_apply_diff_counts(with_source: Callable[..., None]) -> None:
+    """Ensure only removed, added and changed symbols are written, and counted as such."""
+    first = [entry("disnake.Embed"), entry("disnake.File"), entry("disnake.Role"), entry("Gone")]
+    second = [
+        entry("disnake.Embed"),
+        entry("disnake.File", uri="api/file.html#$"),
+        # a display name which was null is still a change
+        entry("disnake.Role", display_name="Role"),
+        entry("disnake.Thread"),
+    ]
+
+    async def test(db: AsyncSession, source_id: int) -> None:
+        # the source has no generation yet, so one is created
+        generation, staged, diff = await crud_symbols.apply_diff(
+            db, source_id, batches(source_id, first)
+        )
+        assert (staged, diff) == (4, crud_symbols.SymbolDiff(added=4, removed=0, changed=0))
+
+        same_generation, staged, diff = await crud_symbols.apply_diff(
+            db, source_id, batches(source_id, second)
+        )
+        assert same_generation == generation
+        assert (staged, diff) == (4, crud_symbols.SymbolDiff(added=1, removed=1, changed=2))
+        assert await stored_symbols(db, source_id) == set(second)
+
+        _, _, diff = await crud_symbols.apply_diff(db, source_id, batches(source_id, second))
+        assert diff == crud_symbols.SymbolDiff(added=0, removed=0, changed=0)
+
+    with_source(test)
+
+
+def test_apply_diff_drops_duplicate_keys(with_source: Callable[..., None]) -> None:
+    """Ensure only the first of the entries with a name, domain and role is stored."""
+    entries = [
+        entry("disnake.Embed", uri="first.html#$"),
+        entry("disnake.Embed", uri="second.html#$"),
+        InventoryEntry("disnake.Embed", "py", "attribute", 1, "attribute.html#$", None),
+    ]
+
+    async def test(db: AsyncSession, source_id: int) -> None:
+        _, staged, diff = await crud_symbols.apply_diff(db, source_id, batches(source_id, entries))
+        assert (staged, diff.added) == (2, 2)
+        assert await stored_symbols(db, source_id) == {entries[0], entries[2]}
+
+    with_source(test)
+
+
+async def stored_modules(db: AsyncSession, source_id: int) -> dict[str, int]:
+    """Get the amount of symbols in each of the top-level modules of the source."""
+    async with db.begin():
+        stmt = select(models.DocModule.name, models.DocModule.symbols).where(
+            models.DocModule.source_id == source_id
+        )
+        return dict((await db.execute(stmt)).all())  # type: ignore
+
+
+def test_modules_follow_the_served_generation(with_source: Callable[..., None]) -> None:
+    """Ensure the modules of a source are only replaced when a generation is served."""
+
+    async def test(db: AsyncSession, source_id: int) -> None:
+        older, _ = await crud_symbols.load_generation(
+            db, source_id, batches(source_id, [entry("older.Embed")])
+        )
+        newer, _ = await crud_symbols.load_generation(
+            db, source_id, batches(source_id, [entry("newer.Embed"), entry("newer.File")])
+        )
+        # loading a generation does not change which modules are served
+        assert await stored_modules(db, source_id) == {}
+
+        assert await crud_symbols.activate_generation(db, source_id, newer)
+        assert await stored_modules(db, source_id) == {"newer": 2}
+        assert not await crud_symbols.activate_generation(db, source_id, older)
+        assert await stored_modules(db, source_id) == {"newer": 2}
+
+        await crud_symbols.apply_diff(
+            db, source_id, batches(source_id, [entry("newer.Embed"), entry("other.Embed")])
+        )
+        assert await stored_modules(db, source_id) == {"newer": 1, "other": 1}
+
+    with_source(test)
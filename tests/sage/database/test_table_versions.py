@@ -0,0 +1,30 @@
+from datetime import timedelta
+from typing import Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from sage.core.database.crud import docs as crud_docs
+from sage.core.database.crud import symbols as crud_symbols
+
+
+async def refreshes_version(db: AsyncSession) -> int:
+    """Get the version of the refresh state of every source."""
+    async with db.begin():
+        return (await crud_docs.get_table_versions(db))[crud_docs.SOURCE_REFRESHES_VERSION]
+
+
+def test_lease_keeps_refreshes_version(with_source: Callable[..., None]) -> None:
+    """Ensure leasing a source to refresh it does not change the version of its refresh state."""
+
+    async def test(db: AsyncSession, source_id: int) -> None:
+        version = await refreshes_version(db)
+
+        # the new source has never been scheduled, so it is due and leased with any others
+        claimed = await crud_symbols.claim_due_sources(db, limit=100, lease=timedelta(minutes=5))
+        assert source_id in {source.id for source in claimed}
+        assert await refreshes_version(db) == version
+
+        await crud_symbols.schedule_refresh(db, source_id, delay=timedelta(hours=1), error="boom")
+        assert await refreshes_version(db) == version + 1
+
+    with_source(test)
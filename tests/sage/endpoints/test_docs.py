@@ -0,0 +1,396 @@
+import json
+from collections import namedtuple
+from typing import Any, AsyncIterator
+from unittest import mock
+
+import pytest
+from fastapi import FastAPI
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.testclient import TestClient
+
+from sage.cache import ResponseCache, get_response_cache
+from sage.core.database.crud import docs as crud_docs
+from sage.core.database.crud import symbols as crud_symbols
+from sage.core.dependencies.database import get_session
+from sage.core.dependencies.security import require_admin
+from sage.core.inventory import InventoryEntry
+from sage.enums import ImportStatus, ProgrammingLanguage
+from sage.settings import CacheSettings
+
+
+PACKAGES = [
+    {
+        "id": id,
+        "name": f"package{id}",
+        "homepage": "https://example.com",
+        "programming_language": ProgrammingLanguage.python,
+    }
+    for id in range(1, 6)
+]
+
+# the methods of sessions which send statements to the database
+STATEMENT_METHODS = ("execute", "scalar", "scalars", "stream", "stream_scalars", "get", "flush")
+
+PackageRow = namedtuple("PackageRow", ["id", "name", "homepage", "programming_language"])
+SourceRow = namedtuple(
+    "SourceRow",
+    [
+        "id",
+        "package_id",
+        "preview",
+        "inventory_url",
+        "human_friendly_url",
+        "version",
+        "language_code",
+    ],
+)
+# sources returned by mutations also have whether they are the default of their package
+MutatedSourceRow = namedtuple("MutatedSourceRow", [*SourceRow._fields, "default"])
+PACKAGE_ROW = PackageRow(1, "disnake", "https://disnake.dev", "python")
+SOURCE_ROW = SourceRow(
+    2, 1, False, "https://docs.disnake.dev/objects.inv", "https://docs.disnake.dev", None, "en-US"
+)
+SOURCE = {"inventory_url": "https://docs.disnake.dev/objects.inv", "language_code": "en-US"}
+PACKAGE = {"name": "disnake", "homepage": "https://disnake.dev", "programming_language": "python"}
+
+# the request to every mutation, the rows its statements return, the amount of statements it
+# sends, and its status when no rows are returned
+MUTATIONS = [
+    ("POST", "/api/docs/packages", {**PACKAGE, "sources": [SOURCE]}, [SOURCE_ROW], 1, None),
+    ("PATCH", "/api/docs/packages/1", PACKAGE, [PACKAGE_ROW], 1, 404),
+    ("DELETE", "/api/docs/packages/1", None, [PACKAGE_ROW], 1, 404),
+    (
+        "POST",
+        "/api/docs/sources",
+        {**SOURCE, "package_id": 1},
+        [MutatedSourceRow(*SOURCE_ROW, False)],
+        1,
+        400,
+    ),
+    # the previous default of the package is unset first
+    (
+        "POST",
+        "/api/docs/sources",
+        {**SOURCE, "package_id": 1, "default": True},
+        [MutatedSourceRow(*SOURCE_ROW, True)],
+        2,
+        400,
+    ),
+    ("PATCH", "/api/docs/sources/2", SOURCE, [(*SOURCE_ROW, *PACKAGE_ROW, True)], 1, 404),
+    ("DELETE", "/api/docs/sources/2", None, [(1,)], 1, 404),
+]
+
+
+def make_session(rows: list[Any]) -> mock.MagicMock:
+    """Make a session whose statements all return the rows."""
+    result = mock.MagicMock()
+    result.__iter__.side_effect = lambda: iter(rows)
+    result.first.return_value = rows[0] if rows else None
+    result.scalar_one_or_none.return_value = rows[0][0] if rows else None
+    db = mock.MagicMock(spec=AsyncSession)
+    db.begin.return_value = mock.AsyncMock()
+    db.execute.return_value = result
+    return db
+
+
+def count_statements(db: mock.MagicMock) -> int:
+    """Count the statements sent through the session."""
+    return sum(getattr(db, method).await_count for method in STATEMENT_METHODS)
+
+
+def test_packages_are_paged(
+    app: FastAPI, testclient: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Ensure full pages link to the page after their last package, which starts after it."""
+    calls = []
+
+    async def get_all_doc_packages(db: Any, **kwargs: Any) -> list[dict[str, Any]]:
+        calls.append(kwargs)
+        after = kwargs["after"] or 0
+        return [package for package in PACKAGES if package["id"] > after][: kwargs["limit"]]
+
+    async def get_table_versions(db: Any) -> dict[str, int]:
+        return {}
+
+    monkeypatch.setattr(crud_docs, "get_all_doc_packages", get_all_doc_packages)
+    monkeypatch.setattr(crud_docs, "get_table_versions", get_table_versions)
+    db = mock.MagicMock()
+    db.begin.return_value = mock.AsyncMock()
+    monkeypatch.setitem(app.dependency_overrides, get_session, lambda: db)
+    cache = ResponseCache(CacheSettings())
+    monkeypatch.setitem(app.dependency_overrides, get_response_cache, lambda: cache)
+
+    response = testclient.get("/api/docs/packages?limit=3&programming_language=python")
+    assert response.json() == [
+        {**package, "programming_language": "python"} for package in PACKAGES[:3]
+    ]
+    link = '</api/docs/packages?limit=3&programming_language=python&after=3>; rel="next"'
+    assert response.headers["link"] == link
+    assert calls[0]["programming_language"] is ProgrammingLanguage.python
+
+    # cached pages keep their link
+    assert (
+        testclient.get("/api/docs/packages?limit=3&programming_language=python").headers["link"]
+        == link
+    )
+    assert len(calls) == 1
+
+    response = testclient.get("/api/docs/packages?limit=3&programming_language=python&after=3")
+    assert [package["id"] for package in response.json()] == [4, 5]
+    assert "link" not in response.headers
+    assert calls[1]["after"] == 3
+
+
+def test_cached_reads_follow_table_versions(
+    app: FastAPI, testclient: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Ensure a response cached before a mutation in another process is not sent under its etag."""
+    versions = {crud_docs.PACKAGES_VERSION: 1, crud_docs.SOURCES_VERSION: 1}
+    package = {**PACKAGES[0], "sources": []}
+
+    async def get_doc_package_dict(db: Any, id: int) -> dict[str, Any]:
+        return dict(package)
+
+    async def get_table_versions(db: Any) -> dict[str, int]:
+        return dict(versions)
+
+    monkeypatch.setattr(crud_docs, "get_doc_package_dict", get_doc_package_dict)
+    monkeypatch.setattr(crud_docs, "get_table_versions", get_table_versions)
+    monkeypatch.setitem(app.dependency_overrides, get_session, lambda: mock.MagicMock())
+    cache = ResponseCache(CacheSettings())
+    monkeypatch.setitem(app.dependency_overrides, get_response_cache, lambda: cache)
+
+    first = testclient.get("/api/docs/packages/1")
+    assert first.json()["name"] == "package1"
+
+    # another process renames the package, which invalidates only its own cache
+    package["name"] = "renamed"
+    versions[crud_docs.PACKAGES_VERSION] += 1
+    second = testclient.get(
+        "/api/docs/packages/1", headers={"If-None-Match": first.headers["etag"]}
+    )
+    assert second.status_code == 200
+    assert second.json()["name"] == "renamed"
+    assert second.headers["etag"] != first.headers["etag"]
+
+
+def test_package_sources_are_projected(
+    app: FastAPI, testclient: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Ensure the public listing of sources only has the columns of their representation."""
+
+    async def get_table_versions(db: Any) -> dict[str, int]:
+        return {}
+
+    monkeypatch.setattr(crud_docs, "get_table_versions", get_table_versions)
+    db = make_session([SOURCE_ROW])
+    monkeypatch.setitem(app.dependency_overrides, get_session, lambda: db)
+    cache = ResponseCache(CacheSettings())
+    monkeypatch.setitem(app.dependency_overrides, get_response_cache, lambda: cache)
+
+    response = testclient.get("/api/docs/packages/1/sources")
+    assert response.json() == [SOURCE_ROW._asdict()]
+    assert "etag" in response.headers
+    assert testclient.get("/api/docs/packages/1/sources").json() == [SOURCE_ROW._asdict()]
+    assert count_statements(db) == 1
+
+
+def test_export_streams_packages_and_symbols(
+    app: FastAPI, testclient: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Ensure the symbols served by the sources of a package follow its line."""
+    sources = [
+        {"id": 1, "package_id": 1, "current_generation": 3},
+        {"id": 2, "package_id": 1, "current_generation": None},
+    ]
+    entry = InventoryEntry("disnake.Embed", "py", "class", 1, "api.html#$", None)
+
+    async def stream_doc_packages(db: Any) -> AsyncIterator[dict[str, Any]]:
+        yield {**PACKAGES[0], "sources": sources}
+        yield {**PACKAGES[1], "sources": []}
+
+    async def stream_symbols(db: Any, source_id: int, generation: int) -> AsyncIterator[Any]:
+        assert (source_id, generation) == (1, 3)
+        yield entry
+
+    monkeypatch.setattr(crud_docs, "stream_doc_packages", stream_doc_packages)
+    monkeypatch.setattr(crud_symbols, "stream_symbols", stream_symbols)
+    db = mock.MagicMock()
+    db.begin.return_value = mock.AsyncMock()
+    db.connection = mock.AsyncMock()
+    monkeypatch.setitem(app.dependency_overrides, get_session, lambda: db)
+    monkeypatch.setitem(app.dependency_overrides, require_admin, lambda: None)
+
+    response = testclient.get("/api/docs/export?include_symbols=true")
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [(line["type"], line["id"] if "id" in line else line["name"]) for line in lines] == [
+        ("package", 1),
+        ("symbol", "disnake.Embed"),
+        ("package", 2),
+    ]
+    assert lines[1] == {"type": "symbol", "source_id": 1, **entry._asdict()}
+
+
+def test_import_reports_every_package(
+    app: FastAPI, testclient: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Ensure invalid packages are skipped, and outcomes are returned in the order imported."""
+    imported = []
+
+    async def import_doc_packages(db: Any, packages: list[Any]) -> list[dict[str, Any]]:
+        imported.extend(package.name for package in packages)
+        return [
+            {"name": package.name, "id": id, "status": ImportStatus.created, "sources": []}
+            for id, package in enumerate(packages)
+        ]
+
+    monkeypatch.setattr(crud_docs, "import_doc_packages", import_doc_packages)
+    monkeypatch.setitem(app.dependency_overrides, get_session, lambda: mock.MagicMock())
+    monkeypatch.setitem(app.dependency_overrides, require_admin, lambda: None)
+    source = {"inventory_url": "https://docs.disnake.dev/objects.inv", "language_code": "en-US"}
+    packages = [
+        {"name": "disnake", "programming_language": "python", "sources": [source]},
+        {"name": "disnake", "programming_language": "python", "sources": [source]},
+        {"name": "python", "programming_language": "python", "sources": [source, source]},
+        {"name": "aiohttp", "programming_language": "python", "sources": []},
+        {"name": "yarl", "programming_language": "python", "sources": [source]},
+    ]
+
+    body = "\n".join(json.dumps(package) for package in packages)
+    response = testclient.post(
+        "/api/docs/import", content=body, headers={"content-type": "application/x-ndjson"}
+    )
+    assert imported == ["disnake", "yarl"]
+    results = response.json()["packages"]
+    assert [result["status"] for result in results] == [
+        "created",
+        "invalid",
+        "invalid",
+        "invalid",
+        "created",
+    ]
+    assert results[4]["id"] == 1
+    # every invalid package is described by a list of errors, like those of validation
+    assert results[1]["detail"] == [
+        {"loc": ["name"], "msg": "The package is imported more than once.", "type": "value_error"}
+    ]
+    assert [error["loc"] for error in results[2]["detail"]] == [["sources"]]
+    assert results[3]["detail"][0]["loc"] == ["sources"]
+    assert response.json()["counts"] == {"created": 2, "updated": 0, "unchanged": 0, "invalid": 3}
+
+    assert testclient.post("/api/docs/import", json={"name": "disnake"}).status_code == 400
+
+
+@pytest.mark.parametrize(
+    ("method", "path", "body", "rows", "statements", "missing_status"), MUTATIONS
+)
+def test_mutation_statements(
+    app: FastAPI,
+    testclient: TestClient,
+    monkeypatch: pytest.MonkeyPatch,
+    method: str,
+    path: str,
+    body: Any,
+    rows: list[Any],
+    statements: int,
+    missing_status: int | None,
+) -> None:
+    """Ensure mutations send as few statements as they can, and respond with what they return."""
+    monkeypatch.setitem(app.dependency_overrides, require_admin, lambda: None)
+    db = make_session(rows)
+    monkeypatch.setitem(app.dependency_overrides, get_session, lambda: db)
+
+    response = testclient.request(method, path, json=body)
+    assert response.status_code < 300
+    assert count_statements(db) == statements
+    assert db.commit.await_count == 1
+    if method == "PATCH" and "sources" in path:
+        assert response.json()["package"] == PACKAGE_ROW._asdict()
+        assert response.json()["default"] is True
+    elif method != "DELETE":
+        assert response.json()["id"] == (1 if "packages" in path else 2)
+    if method == "POST" and "sources" in path:
+        assert response.json()["default"] is body.get("default", False)
+
+    if missing_status is None:
+        return
+    db = make_session([])
+    monkeypatch.setitem(app.dependency_overrides, get_session, lambda: db)
+    assert testclient.request(method, path, json=body).status_code == missing_status
+    assert count_statements(db) == statements
+    assert db.commit.await_count == 0
+
+
+@pytest.mark.parametrize(
+    ("method", "path", "body", "constraint", "detail"),
+    [
+        (
+            "POST",
+            "/api/docs/packages",
+            {**PACKAGE, "sources": [SOURCE]},
+            crud_docs.PACKAGE_NAME_CONSTRAINT,
+            "A package named 'disnake' already exists.",
+        ),
+        (
+            "PATCH",
+            "/api/docs/packages/1",
+            PACKAGE,
+            crud_docs.PACKAGE_NAME_CONSTRAINT,
+            "A package named 'disnake' already exists.",
+        ),
+        (
+            "POST",
+            "/api/docs/sources",
+            {**SOURCE, "package_id": 1},
+            crud_docs.SOURCE_URL_CONSTRAINT,
+            "The package already has a source with this inventory url.",
+        ),
+        (
+            "PATCH",
+            "/api/docs/sources/2",
+            SOURCE,
+            crud_docs.SOURCE_URL_CONSTRAINT,
+            "The package already has a source with this inventory url.",
+        ),
+    ],
+)
+def test_mutations_conflict(
+    app: FastAPI,
+    testclient: TestClient,
+    monkeypatch: pytest.MonkeyPatch,
+    method: str,
+    path: str,
+    body: Any,
+    constraint: str,
+    detail: str,
+) -> None:
+    """Ensure violating the unique names of packages or urls of sources is a conflict."""
+    monkeypatch.setitem(app.dependency_overrides, require_admin, lambda: None)
+    db = make_session([])
+    # asyncpg reports the constraint on the error which its dbapi adapter's error is raised from
+    cause = Exception()
+    cause.constraint_name = constraint  # type: ignore
+    orig = Exception()
+    orig.__cause__ = cause
+    db.execute.side_effect = IntegrityError("INSERT", {}, orig)
+    monkeypatch.setitem(app.dependency_overrides, get_session, lambda: db)
+
+    response = testclient.request(method, path, json=body)
+    assert response.status_code == 409
+    assert response.json() == {"detail": detail}
+    assert db.commit.await_count == 0
+
+
+def test_package_sources_must_have_distinct_urls(
+    app: FastAPI, testclient: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Ensure a package is not created with two sources serving the same inventory."""
+    monkeypatch.setitem(app.dependency_overrides, require_admin, lambda: None)
+    db = make_session([])
+    monkeypatch.setitem(app.dependency_overrides, get_session, lambda: db)
+
+    response = testclient.post("/api/docs/packages", json={**PACKAGE, "sources": [SOURCE, SOURCE]})
+    assert response.status_code == 400
+    assert count_statements(db) == 0
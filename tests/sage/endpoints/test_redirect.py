@@ -0,0 +1,56 @@
+import time
+from unittest import mock
+
+import pytest
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.testclient import TestClient
+
+from sage.core.database.crud import symbols as crud_symbols
+from sage.core.dependencies.database import get_session
+from sage.core.inventory import InventoryEntry
+from sage.core.inventory.index import SourceVersion, SymbolIndexes, get_symbol_indexes
+from sage.settings import IndexSettings
+
+
+VERSION = SourceVersion(
+    source_id=1, generation=1, refreshed_at=None, base_url="https://docs.disnake.dev/en/stable/"
+)
+ENTRIES = [
+    InventoryEntry("disnake.Embed", "std", "label", 1, "embeds.html", None),
+    InventoryEntry("disnake.Embed", "py", "class", 1, "api.html#$", None),
+]
+
+
+def test_redirect_to_symbol(
+    app: FastAPI, testclient: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Ensure symbols redirect to the url of their best match, which is cached."""
+    queries = []
+
+    async def find_symbols(
+        db: AsyncSession, source_id: int, generation: int, names: set[str]
+    ) -> list[InventoryEntry]:
+        queries.append(names)
+        return [entry for entry in ENTRIES if entry.name in names]
+
+    monkeypatch.setattr(crud_symbols, "find_symbols", find_symbols)
+    db = mock.MagicMock()
+    db.begin.return_value = mock.AsyncMock()
+    indexes = SymbolIndexes(IndexSettings(ttl=60))
+    indexes._defaults["disnake"] = (time.monotonic(), VERSION)
+    # pretend the index is already being built, so lookups use the database
+    indexes._builds[VERSION.source_id] = mock.Mock()
+    monkeypatch.setitem(app.dependency_overrides, get_session, lambda: db)
+    monkeypatch.setitem(app.dependency_overrides, get_symbol_indexes, lambda: indexes)
+
+    for _ in range(2):
+        response = testclient.get("/r/disnake/disnake.Embed", follow_redirects=False)
+        assert response.status_code == 307
+        assert response.headers["location"] == (
+            "https://docs.disnake.dev/en/stable/api.html#disnake.Embed"
+        )
+        assert "max-age=" in response.headers["cache-control"]
+    assert queries == [{"disnake.Embed"}]
+
+    assert testclient.get("/r/disnake/disnake.Intents", follow_redirects=False).status_code == 404
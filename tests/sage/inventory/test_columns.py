@@ -0,0 +1,35 @@
+import pytest
+
+from sage.core.inventory import InventoryEntry
+from sage.core.inventory.columns import EntryColumns, split_uri
+
+
+ENTRIES = [
+    InventoryEntry("disnake.Embed", "py", "class", 1, "api.html#$", None),
+    InventoryEntry("disnake.Embed.title", "py", "attribute", 1, "api.html#$", None),
+    InventoryEntry("intents", "std", "label", -1, "intents.html#intents", "Gateway Intents"),
+    InventoryEntry("intents", "std", "doc", 1, "intents.html", None),
+    InventoryEntry("empty", "std", "label", 1, "", ""),
+]
+
+
+def test_split_uri() -> None:
+    """Ensure uris are split after the last `#`, and uris without an anchor are all page."""
+    assert split_uri("api.html#$") == ("api.html#", "$")
+    assert split_uri("a#b#c") == ("a#b#", "c")
+    assert split_uri("intents.html") == ("intents.html", "")
+
+
+def test_entries_round_trip() -> None:
+    """Ensure every entry is returned exactly as it was stored."""
+    columns = EntryColumns(ENTRIES)
+
+    assert len(columns) == len(ENTRIES)
+    assert list(columns) == ENTRIES
+    assert columns[-1] == ENTRIES[-1]
+    assert columns[1:3] == ENTRIES[1:3]
+    assert [columns.name(position) for position in range(len(columns))] == [
+        entry.name for entry in ENTRIES
+    ]
+    with pytest.raises(IndexError):
+        columns[len(ENTRIES)]
@@ -0,0 +1,75 @@
+import asyncio
+import struct
+import zlib
+
+import pytest
+
+from sage.core.inventory import InvalidInventory, InventoryEntry
+from sage.core.inventory.executor import ParseExecutor, encode_rows
+from sage.enums import ParseMode
+
+
+HEADER = (
+    b"# Sphinx inventory version 2\n"
+    b"# Project: disnake\n"
+    b"# Version: 2.7\n"
+    b"# The remainder of this file is compressed using zlib.\n"
+)
+
+
+def decode_rows(data: bytes) -> list[tuple]:
+    """Decode binary COPY rows of the staging columns."""
+    rows = []
+    offset = 0
+    while offset < len(data):
+        (fields,) = struct.unpack_from("!h", data, offset)
+        offset += 2
+        row = []
+        for index in range(fields):
+            (length,) = struct.unpack_from("!i", data, offset)
+            offset += 4
+            if length == -1:
+                row.append(None)
+                continue
+            value = data[offset : offset + length]
+            offset += length
+            # the source id and priority are the only integer columns
+            row.append(struct.unpack("!i", value)[0] if index in (0, 4) else value.decode())
+        rows.append(tuple(row))
+    return rows
+
+
+def test_encode_rows() -> None:
+    """Ensure entries are encoded with the source id, and NULL display names."""
+    entries = [
+        InventoryEntry("disnake.Embed", "py", "class", 1, "api.html#$", None),
+        InventoryEntry("intents", "std", "label", -1, "intents.html#intents", "Gateway\tIntents"),
+    ]
+    assert decode_rows(encode_rows(3, entries)) == [(3, *entry) for entry in entries]
+
+
+async def collect(executor: ParseExecutor, body: bytes) -> list[bytes]:
+    """Collect every batch of the body, then shut the executor down."""
+    try:
+        return [batch async for batch in executor.copy_batches(body, 1)]
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.parametrize("mode", list(ParseMode))
+def test_modes_batch_identically(mode: ParseMode) -> None:
+    """Ensure every mode produces the same batches."""
+    body = b"".join(b"module.name%d py:function 1 api.html#$ -\n" % i for i in range(12_000))
+    batches = asyncio.run(collect(ParseExecutor(mode, 1), HEADER + zlib.compress(body)))
+
+    assert len(batches) == 3
+    rows = decode_rows(b"".join(batches))
+    assert len(rows) == 12_000
+    assert rows[-1] == (1, "module.name11999", "py", "function", 1, "api.html#$", None)
+
+
+@pytest.mark.parametrize("mode", list(ParseMode))
+def test_invalid_inventory_raises(mode: ParseMode) -> None:
+    """Ensure parsing errors are raised from every mode."""
+    with pytest.raises(InvalidInventory):
+        asyncio.run(collect(ParseExecutor(mode, 1), HEADER + b"definitely not zlib"))
@@ -0,0 +1,58 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from sage.core.database.crud import docs as crud_docs
+from sage.core.database.crud import symbols as crud_symbols
+from sage.core.inventory import InventoryEntry, InventoryParser, iter_inventory
+from sage.core.inventory.export import InventoryFiles, encode_inventory
+from sage.core.inventory.index import SourceVersion
+from sage.settings import IndexSettings
+
+
+ENTRIES = [
+    InventoryEntry("intents", "std", "label", -1, "intents.html#intents", "Gateway Intents"),
+    InventoryEntry("disnake.Embed", "py", "class", 1, "api.html#$", None),
+    InventoryEntry("disnake.Embed.add_field", "py", "method", 1, "api.html#$", None),
+]
+
+
+def test_encode_inventory_round_trips() -> None:
+    """Ensure encoded inventories parse back to the same entries and header."""
+    data = encode_inventory("disnake", "2.7", ENTRIES)
+
+    assert sorted(iter_inventory([data])) == sorted(ENTRIES)
+    parser = InventoryParser()
+    list(parser.feed(data))
+    assert (parser.project, parser.version) == ("disnake", "2.7")
+    # the same symbols always produce the same file
+    assert encode_inventory("disnake", "2.7", reversed(ENTRIES)) == data
+
+
+def test_inventory_files_cached_per_version(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Ensure inventories are only generated again when the source serves other symbols."""
+    loads = []
+
+    async def get_symbols(db: AsyncSession, source_id: int, generation: int) -> list:
+        loads.append(generation)
+        return ENTRIES
+
+    async def get_doc_source(db: AsyncSession, id: int) -> mock.Mock:
+        source = mock.Mock(version="2.7")
+        source.package.name = "disnake"
+        return source
+
+    monkeypatch.setattr(crud_symbols, "get_symbols", get_symbols)
+    monkeypatch.setattr(crud_docs, "get_doc_source", get_doc_source)
+    db = mock.MagicMock()
+    db.begin.return_value = mock.AsyncMock()
+    files = InventoryFiles(IndexSettings())
+    version = SourceVersion(source_id=1, generation=1, refreshed_at=None, base_url="")
+
+    first = asyncio.run(files.get(db, version))
+    assert asyncio.run(files.get(db, version)) is first
+    assert loads == [1]
+    asyncio.run(files.get(db, version._replace(generation=2)))
+    assert loads == [1, 2]
@@ -0,0 +1,155 @@
+import asyncio
+import hashlib
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+import httpx
+import pytest
+
+from sage.core.inventory import iter_inventory
+from sage.core.inventory.fetch import FetchResult, InventoryValidators, fetch_inventory
+from sage.http import HTTPClient
+from sage.settings import HTTPSettings
+
+
+def make_inventory(*lines: str, project: str = "sage", version: str = "1.0") -> bytes:
+    """Build a compressed v2 inventory from the provided entry lines."""
+    header = (
+        "# Sphinx inventory version 2\n"
+        f"# Project: {project}\n"
+        f"# Version: {version}\n"
+        "# The remainder of this file is compressed using zlib.\n"
+    )
+    return header.encode() + zlib.compress("\n".join(lines).encode())
+
+
+class InventoryServer(ThreadingHTTPServer):
+    """A local stand-in for a documentation host, serving fixture inventories."""
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), InventoryRequestHandler)
+        self.inventories: dict[str, bytes] = {}
+        self.conditional = True
+        self.requests: list[dict[str, str]] = []
+
+    def url(self, path: str) -> str:
+        """Get the url the provided path is served at."""
+        return f"http://127.0.0.1:{self.server_port}{path}"
+
+
+class InventoryRequestHandler(BaseHTTPRequestHandler):
+    """Serve inventories with an ETag and Last-Modified header."""
+
+    server: InventoryServer
+
+    def do_GET(self) -> None:  # noqa: N802
+        """Serve the requested inventory, honouring If-None-Match if enabled."""
+        self.server.requests.append(dict(self.headers))
+        body = self.server.inventories.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'  # noqa: S324
+        if self.server.conditional and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        if self.server.conditional:
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", "Sat, 03 Dec 2022 22:16:39 GMT")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        """Silence request logging."""
+
+
+@pytest.fixture
+def inventory_server() -> Iterator[InventoryServer]:
+    """Run an inventory server for the duration of the test."""
+    server = InventoryServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+INVENTORY = make_inventory("sage.app py:module 0 app.html#module-$ -")
+
+
+def fetch(url: str, validators: InventoryValidators | None = None) -> FetchResult:
+    """Synchronously fetch the inventory at the url."""
+
+    async def run() -> FetchResult:
+        client = HTTPClient(HTTPSettings(retries=0))
+        try:
+            return await fetch_inventory(client, url, validators or InventoryValidators())
+        finally:
+            await client.aclose()
+
+    return asyncio.run(run())
+
+
+def test_fetch(inventory_server: InventoryServer) -> None:
+    """Ensure an inventory is fetched along with its validators."""
+    inventory_server.inventories["/objects.inv"] = INVENTORY
+    result = fetch(inventory_server.url("/objects.inv"))
+
+    assert result.body == INVENTORY
+    assert [entry.name for entry in iter_inventory([result.body])] == ["sage.app"]
+    assert result.validators.etag is not None
+    assert result.validators.last_modified == "Sat, 03 Dec 2022 22:16:39 GMT"
+    assert result.validators.sha256 is not None
+
+
+def test_not_modified(inventory_server: InventoryServer) -> None:
+    """Ensure the validators are sent, and a 304 response is not considered modified."""
+    inventory_server.inventories["/objects.inv"] = INVENTORY
+    url = inventory_server.url("/objects.inv")
+    first = fetch(url)
+    second = fetch(url, first.validators)
+
+    assert second.body is None
+    assert second.validators == first.validators
+    headers = inventory_server.requests[-1]
+    assert headers["If-None-Match"] == first.validators.etag
+    assert headers["If-Modified-Since"] == first.validators.last_modified
+
+
+def test_unchanged_hash(inventory_server: InventoryServer) -> None:
+    """Ensure an identical body is not considered modified when the server ignores validators."""
+    inventory_server.inventories["/objects.inv"] = INVENTORY
+    inventory_server.conditional = False
+    url = inventory_server.url("/objects.inv")
+    first = fetch(url)
+    second = fetch(url, first.validators)
+
+    assert first.body is not None
+    assert second.body is None
+    assert second.validators.sha256 == first.validators.sha256
+
+
+def test_modified(inventory_server: InventoryServer) -> None:
+    """Ensure a changed inventory is fetched again."""
+    inventory_server.inventories["/objects.inv"] = INVENTORY
+    url = inventory_server.url("/objects.inv")
+    first = fetch(url)
+    inventory_server.inventories["/objects.inv"] = make_inventory("sage py:module 0 index.html -")
+    second = fetch(url, first.validators)
+
+    assert second.body is not None
+    assert second.validators.etag != first.validators.etag
+    assert second.validators.sha256 != first.validators.sha256
+
+
+def test_missing(inventory_server: InventoryServer) -> None:
+    """Ensure a missing inventory raises."""
+    with pytest.raises(httpx.HTTPStatusError):
+        fetch(inventory_server.url("/missing/objects.inv"))
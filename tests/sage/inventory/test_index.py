@@ -0,0 +1,170 @@
+import asyncio
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from sage.core.database.crud import docs as crud_docs
+from sage.core.database.crud import symbols as crud_symbols
+from sage.core.inventory import InventoryEntry
+from sage.core.inventory.index import (
+    ModuleOwner,
+    SourceVersion,
+    SymbolIndex,
+    SymbolIndexes,
+    symbol_to_dict,
+)
+from sage.settings import IndexSettings
+
+
+VERSION = SourceVersion(
+    source_id=1, generation=1, refreshed_at=None, base_url="https://docs.disnake.dev/en/stable/"
+)
+ENTRIES = [
+    InventoryEntry("disnake.Embed", "py", "class", 1, "api.html#$", None),
+    InventoryEntry("intents", "std", "label", -1, "intents.html#intents", "Gateway Intents"),
+    InventoryEntry("intents", "std", "doc", 1, "intents.html", None),
+    InventoryEntry("intents", "py", "module", 1, "api.html#module-$", None),
+]
+
+
+def test_get_ranks_matches() -> None:
+    """Ensure every symbol with a name is returned, python and higher priorities first."""
+    index = SymbolIndex(VERSION, ENTRIES)
+
+    assert len(index) == 2
+    assert index.get("disnake.Embed") == ENTRIES[:1]
+    assert index.get("intents") == [ENTRIES[3], ENTRIES[2], ENTRIES[1]]
+    assert index.get("disnake.Intents") == []
+
+
+def test_symbol_to_dict_resolves_url() -> None:
+    """Ensure the url is relative to the source, and `$` is replaced with the name."""
+    assert symbol_to_dict(VERSION, ENTRIES[0]) == {
+        "name": "disnake.Embed",
+        "domain": "py",
+        "role": "class",
+        "priority": 1,
+        "display_name": "disnake.Embed",
+        "url": "https://docs.disnake.dev/en/stable/api.html#disnake.Embed",
+    }
+    assert symbol_to_dict(VERSION, ENTRIES[1])["display_name"] == "Gateway Intents"
+
+
+def test_complete_ranks_prefix_matches() -> None:
+    """Ensure completions match case-insensitively, and are ranked before being limited."""
+    entries = [
+        InventoryEntry("disnake.Embed.title", "py", "attribute", 1, "api.html#$", None),
+        InventoryEntry("disnake.Embed", "py", "class", 1, "api.html#$", None),
+        InventoryEntry("disnake.embeds", "std", "doc", 1, "embeds.html", None),
+        InventoryEntry("disnake.Emoji", "py", "class", 1, "api.html#$", None),
+        InventoryEntry("disnake.Embed.add_field", "py", "method", 1, "api.html#$", None),
+    ]
+    index = SymbolIndex(VERSION, entries)
+
+    names = [entry.name for entry in index.complete("DISNAKE.emb", 3)]
+    assert names == ["disnake.Embed", "disnake.Embed.title", "disnake.Embed.add_field"]
+    assert [entry.name for entry in index.complete("disnake.", 1)] == ["disnake.Embed"]
+    assert index.complete("disnake.Intents", 3) == []
+
+
+def test_search_suggests_similar_names() -> None:
+    """Ensure mistyped names find the intended symbol first, with a similarity score."""
+    entries = [
+        InventoryEntry("asyncio.gather", "py", "function", 1, "tasks.html#$", None),
+        InventoryEntry("asyncio.wait", "py", "function", 1, "tasks.html#$", None),
+        InventoryEntry("disnake.Embed", "py", "class", 1, "api.html#$", None),
+    ]
+    index = SymbolIndex(VERSION, entries)
+    index.build_trigrams()
+
+    results = index.search("asyncio.gahter", 5, 0.3)
+    assert [entry.name for _, entry in results] == ["asyncio.gather", "asyncio.wait"]
+    assert 0.3 <= results[1][0] < results[0][0] < 1
+    assert index.search("disnake.Embed", 5, 0.3) == [(1.0, entries[2])]
+    assert index.search("zzzz", 5, 0.3) == []
+
+
+def test_search_without_index_when_build_fails(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Ensure a failed build of the index finds nothing, rather than raising from the search."""
+    indexes = SymbolIndexes(IndexSettings())
+
+    async def build(version: SourceVersion) -> SymbolIndex:
+        raise RuntimeError("the symbols could not be loaded")
+
+    monkeypatch.setattr(indexes, "build", build)
+
+    async def search() -> list[tuple[float, InventoryEntry]]:
+        results = await indexes.search(VERSION, "disnake.Embed", 5, 0.3)
+        # let the build finish, so it is no longer tracked
+        await asyncio.sleep(0)
+        return results
+
+    assert asyncio.run(search()) == []
+    assert not indexes._builds
+
+
+def test_owners_resolve_top_level_module(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Ensure names resolve to the packages documenting their module, in the stored order."""
+    rows = [
+        ("aiohttp", 2, "aiohttp", 3, 900),
+        ("discord", 1, "discord.py", 1, 5000),
+        ("discord", 4, "pycord", 6, 5000),
+    ]
+
+    async def get_module_owners(db: AsyncSession) -> list[tuple[str, int, str, int, int]]:
+        return rows
+
+    monkeypatch.setattr(crud_docs, "get_module_owners", get_module_owners)
+    db = mock.MagicMock()
+    db.begin.return_value = mock.AsyncMock()
+    indexes = SymbolIndexes(IndexSettings(ttl=60))
+
+    owners = asyncio.run(indexes.owners(db, "discord.ext.commands.Bot"))
+    assert owners == [ModuleOwner("discord.py", 1, 1, 5000), ModuleOwner("pycord", 4, 6, 5000)]
+    assert asyncio.run(indexes.owners(db, "aiohttp"))[0].package == "aiohttp"
+    assert asyncio.run(indexes.owners(db, "numpy.ndarray")) == []
+    # the owners are only loaded once within the ttl
+    assert db.begin.call_count == 1
+
+
+def test_lookup_many_falls_back_to_one_query(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Ensure names are looked up with one query when the index is not built, best first."""
+    queries = []
+
+    async def find_symbols(
+        db: AsyncSession, source_id: int, generation: int, names: set[str]
+    ) -> list[InventoryEntry]:
+        queries.append(names)
+        return [entry for entry in ENTRIES if entry.name in names]
+
+    monkeypatch.setattr(crud_symbols, "find_symbols", find_symbols)
+    db = mock.MagicMock()
+    db.begin.return_value = mock.AsyncMock()
+    indexes = SymbolIndexes(IndexSettings())
+    # pretend the index is already being built, so no build is started
+    indexes._builds[VERSION.source_id] = mock.Mock()
+
+    found = asyncio.run(indexes.lookup_many(db, VERSION, ["intents", "disnake.Embed", "missing"]))
+    assert queries == [{"intents", "disnake.Embed", "missing"}]
+    assert found == {
+        "intents": [ENTRIES[3], ENTRIES[2], ENTRIES[1]],
+        "disnake.Embed": ENTRIES[:1],
+        "missing": [],
+    }
+
+
+def test_lookup_many_uses_index_file(tmp_path: Path) -> None:
+    """Ensure lookups are served from an up to date index file, without building an index."""
+    db = mock.MagicMock()
+    writer = SymbolIndexes(IndexSettings(directory=tmp_path))
+    writer.write_file(VERSION, SymbolIndex(VERSION, ENTRIES).entries())
+
+    indexes = SymbolIndexes(IndexSettings(directory=tmp_path))
+    found = asyncio.run(indexes.lookup_many(db, VERSION, ["intents", "missing"]))
+    assert found == {"intents": [ENTRIES[3], ENTRIES[2], ENTRIES[1]], "missing": []}
+    assert not indexes._builds
+    db.begin.assert_not_called()
+    # an outdated file is not used
+    assert indexes.mapped(VERSION._replace(generation=2)) is None
@@ -0,0 +1,58 @@
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+from sage.core.inventory import InventoryEntry
+from sage.core.inventory.mapped import InvalidIndexFile, MappedIndex, write_index_file
+
+
+REFRESHED_AT = datetime(2022, 11, 20, 12, 30, tzinfo=timezone.utc)
+ENTRIES = [
+    InventoryEntry("disnake.Embed", "py", "class", 1, "api.html#$", None),
+    InventoryEntry("disnake.Embed", "std", "label", 1, "embeds.html", "Embeds"),
+    InventoryEntry("disnake.Embed.title", "py", "attribute", 1, "api.html#$", None),
+    InventoryEntry("intents", "std", "label", -1, "intents.html#intents", "Gateway Intents"),
+]
+
+
+def test_lookup_written_entries(tmp_path: Path) -> None:
+    """Ensure every entry with a name is found in the order written, with strings deduplicated."""
+    path = tmp_path / "1.idx"
+    write_index_file(path, 1, 5, REFRESHED_AT, ENTRIES)
+    index = MappedIndex(path)
+
+    assert len(index) == 4
+    assert index.get("disnake.Embed") == ENTRIES[:2]
+    assert index.get("intents") == ENTRIES[3:]
+    assert index.get("disnake") == []
+    assert index.get("zzz") == []
+    assert index.matches(1, 5, REFRESHED_AT)
+    assert not index.matches(1, 5, None)
+    assert not index.matches(1, 6, REFRESHED_AT)
+    # the uri shared by the python entries is only stored once
+    assert path.read_bytes().count(b"api.html#$") == 1
+
+
+def test_rewrite_is_atomic(tmp_path: Path) -> None:
+    """Ensure a mapped file keeps serving its entries after it is replaced."""
+    path = tmp_path / "1.idx"
+    write_index_file(path, 1, 5, None, ENTRIES)
+    old = MappedIndex(path)
+    write_index_file(path, 1, 6, None, ENTRIES[3:])
+
+    assert old.get("disnake.Embed") == ENTRIES[:2]
+    assert MappedIndex(path).get("disnake.Embed") == []
+    assert [file.name for file in tmp_path.iterdir()] == ["1.idx"]
+
+
+def test_invalid_files_raise(tmp_path: Path) -> None:
+    """Ensure files which are not complete index files are rejected."""
+    path = tmp_path / "1.idx"
+    path.write_bytes(b"")
+    with pytest.raises(InvalidIndexFile):
+        MappedIndex(path)
+    write_index_file(path, 1, 5, None, ENTRIES)
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(InvalidIndexFile):
+        MappedIndex(path)
@@ -0,0 +1,92 @@
+import zlib
+from typing import Iterator
+
+import pytest
+
+from sage.core.inventory import InvalidInventory, InventoryEntry, InventoryParser, iter_inventory
+
+
+HEADER = (
+    b"# Sphinx inventory version 2\n"
+    b"# Project: disnake\n"
+    b"# Version: 2.7\n"
+    b"# The remainder of this file is compressed using zlib.\n"
+)
+BODY = (
+    b"disnake.Embed py:class 1 api.html#$ -\n"
+    b"disnake.Embed.title py:attribute 1 api.html#disnake.Embed.title -\n"
+    b"intents std:label -1 intents.html#intents A Primer to Gateway Intents\n"
+    b"not-a-valid-line\n"
+    b"missing_role py 1 api.html#$ -\n"
+    b"std:doc std:doc -1 index.html Welcome!"
+)
+EXPECTED = [
+    InventoryEntry("disnake.Embed", "py", "class", 1, "api.html#$", None),
+    InventoryEntry(
+        "disnake.Embed.title", "py", "attribute", 1, "api.html#disnake.Embed.title", None
+    ),
+    InventoryEntry(
+        "intents", "std", "label", -1, "intents.html#intents", "A Primer to Gateway Intents"
+    ),
+    InventoryEntry("std:doc", "std", "doc", -1, "index.html", "Welcome!"),
+]
+
+
+def chunked(data: bytes, size: int) -> list[bytes]:
+    """Split data into chunks of the provided size."""
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 20])
+def test_parse_chunked(chunk_size: int) -> None:
+    """Ensure entries are parsed identically no matter how the input is split."""
+    data = HEADER + zlib.compress(BODY)
+    parser = InventoryParser()
+    entries = []
+    for chunk in chunked(data, chunk_size):
+        entries.extend(parser.feed(chunk))
+    entries.extend(parser.close())
+
+    assert entries == EXPECTED
+    assert parser.project == "disnake"
+    assert parser.version == "2.7"
+
+
+def test_parse_large_inventory_lazily() -> None:
+    """Ensure entries are yielded before the whole body has been provided."""
+    body = b"".join(b"module.name%d py:function 1 api.html#$ -\n" % i for i in range(100_000))
+    data = HEADER + zlib.compress(body)
+    chunks = chunked(data, 4096)
+
+    consumed = 0
+
+    def counting() -> Iterator[bytes]:
+        nonlocal consumed
+        for chunk in chunks:
+            consumed += 1
+            yield chunk
+
+    entries = iter_inventory(counting())
+    assert next(entries).name == "module.name0"
+    assert consumed < len(chunks)
+    assert sum(1 for _ in entries) == 99_999
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        pytest.param(b"# Sphinx inventory version 1\n# Project: a\n# Version: 1\n", id="v1"),
+        pytest.param(HEADER[:40], id="truncated_header"),
+        pytest.param(HEADER + zlib.compress(BODY)[:-10], id="truncated_body"),
+        pytest.param(HEADER + b"definitely not zlib", id="not_zlib"),
+        pytest.param(b"<html>" * 1000, id="html"),
+        pytest.param(
+            HEADER + zlib.compress(b"disnake.Embed py:class 2147483648 api.html#$ -\n"),
+            id="priority_out_of_range",
+        ),
+    ],
+)
+def test_invalid(data: bytes) -> None:
+    """Ensure invalid inventories raise InvalidInventory."""
+    with pytest.raises(InvalidInventory):
+        list(iter_inventory([data]))
@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+import pytest
+
+from sage.core.database import models
+from sage.core.inventory.scheduler import RefreshScheduler
+from sage.http import HTTPClient
+from sage.settings import HTTPSettings, RefreshSettings
+
+
+@pytest.fixture
+def scheduler() -> RefreshScheduler:
+    """A scheduler with a 10% jitter."""
+    settings = RefreshSettings(
+        interval=1000, jitter=0.1, failure_backoff=60, max_failure_backoff=3600
+    )
+    return RefreshScheduler(settings, HTTPClient(HTTPSettings()))
+
+
+@pytest.mark.parametrize(("interval", "expected"), [(None, 1000), (100, 100)])
+def test_next_delay(scheduler: RefreshScheduler, interval: int | None, expected: int) -> None:
+    """Ensure the delay after a success uses the source interval, with jitter."""
+    source = models.DocSource(refresh_interval=interval, refresh_failures=0)
+    delays = {scheduler.next_delay(source) for _ in range(50)}
+
+    assert all(
+        timedelta(seconds=expected * 0.9) <= d <= timedelta(seconds=expected * 1.1) for d in delays
+    )
+    assert len(delays) > 1
+
+
+@pytest.mark.parametrize(("failures", "expected"), [(0, 60), (1, 120), (3, 480), (10, 3600)])
+def test_failure_delay(scheduler: RefreshScheduler, failures: int, expected: int) -> None:
+    """Ensure failing sources back off exponentially, up to the maximum."""
+    source = models.DocSource(refresh_interval=None, refresh_failures=failures)
+    delay = scheduler.failure_delay(source)
+
+    assert timedelta(seconds=expected * 0.9) <= delay <= timedelta(seconds=expected * 1.1)
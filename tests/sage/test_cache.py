@@ -0,0 +1,86 @@
+import json
+
+import pytest
+from starlette.requests import Request
+
+from sage.cache import PACKAGES_TAG, ResponseCache, etag_matches, make_etag, package_tag, source_tag
+from sage.settings import CacheSettings
+
+
+def test_hits_and_misses() -> None:
+    """Ensure cached responses are rendered once and then served as the same json."""
+    cache = ResponseCache(CacheSettings())
+
+    assert cache.get(("package", 1)) is None
+    response = cache.set(("package", 1), {"id": 1, "name": "disnake"}, [package_tag(1)])
+    assert json.loads(response.body) == {"id": 1, "name": "disnake"}
+    cached = cache.get(("package", 1))
+    assert cached is not None
+    assert cached.body == response.body
+    assert cached.media_type == "application/json"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_are_evicted() -> None:
+    """Ensure only the most recently used responses are kept."""
+    cache = ResponseCache(CacheSettings(max_entries=2))
+    for package_id in range(3):
+        cache.set(("package", package_id), {}, [package_tag(package_id)])
+        # keep the first response in use
+        cache.get(("package", 0))
+
+    assert len(cache) == 2
+    assert cache.evictions == 1
+    assert cache.get(("package", 1)) is None
+    assert cache.get(("package", 0)) is not None
+
+
+def test_invalidate_by_tag() -> None:
+    """Ensure exactly the responses with an invalidated tag are dropped."""
+    cache = ResponseCache(CacheSettings())
+    cache.set(("packages", False), [], [PACKAGES_TAG])
+    cache.set(("package", 1), {}, [package_tag(1)])
+    cache.set(("package", 2), {}, [package_tag(2)])
+    cache.set(("source", 5), {}, [source_tag(5), package_tag(1)])
+
+    cache.invalidate(package_tag(1))
+    assert cache.get(("package", 1)) is None
+    assert cache.get(("source", 5)) is None
+    assert cache.get(("package", 2)) is not None
+    assert cache.get(("packages", False)) is not None
+    assert cache.invalidations == 2
+
+
+def test_entries_expire() -> None:
+    """Ensure responses are not served once they are older than the ttl."""
+    cache = ResponseCache(CacheSettings(ttl=0))
+    cache.set(("package", 1), {}, [package_tag(1)])
+
+    assert cache.get(("package", 1)) is None
+    assert len(cache) == 0
+
+
+def test_etags_change_with_versions() -> None:
+    """Ensure etags only match when every version they were made from is the same."""
+    assert make_etag(1, 2) == make_etag(1, 2)
+    assert make_etag(1, 2) != make_etag(1, 3)
+    assert make_etag(1, 2).startswith('"')
+
+
+@pytest.mark.parametrize(
+    ("header", "matches"),
+    [
+        (None, False),
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"xyz", "abc"', True),
+        ("*", True),
+        ('"xyz"', False),
+        ("abc", False),
+    ],
+)
+def test_etag_matches(header: str | None, matches: bool) -> None:
+    """Ensure `If-None-Match` is compared weakly against the etag, as clients send it."""
+    headers = [] if header is None else [(b"if-none-match", header.encode())]
+    request = Request({"type": "http", "headers": headers})
+    assert etag_matches(request, '"abc"') is matches
@@ -0,0 +1,42 @@
+import asyncio
+from typing import Any
+from unittest import mock
+
+import pytest
+from sqlalchemy import exc
+from sqlalchemy.util import greenlet_spawn
+
+from sage.database import MeteredPool
+
+
+def test_pool_measures_waits() -> None:
+    """Ensure checkouts are counted and measured, apart from those which time out."""
+    pool = MeteredPool(mock.MagicMock, pool_size=1, max_overflow=0, timeout=0.05)
+
+    def checkout() -> dict[str, Any]:
+        connection = pool.connect()
+        stats = pool.stats()
+        with pytest.raises(exc.TimeoutError):
+            pool.connect()
+        connection.close()
+        return stats
+
+    # the pool of an async engine must be used within a greenlet, as it is by the engine
+    stats = asyncio.run(greenlet_spawn(checkout))
+    assert stats["connections"]["checked_out"] == 1
+    assert stats["connections"]["overflow"] == 0
+
+    stats = pool.stats()
+    assert stats["connections"] == {
+        "open": 1,
+        "idle": 1,
+        "checked_out": 0,
+        "overflow": 0,
+        "pool_size": 1,
+        "max_overflow": 0,
+    }
+    assert stats["checkouts"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["waiting"] == 0
+    # the timed out checkout waited for the whole timeout, which is not counted as a wait
+    assert stats["wait"]["max"] < 0.05
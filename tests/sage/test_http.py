@@ -0,0 +1,117 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+import pytest
+
+from sage.http import HTTPClient
+from sage.settings import HTTPSettings
+
+
+class FlakyServer(ThreadingHTTPServer):
+    """Serves 503 for the first `failures` requests, then 200."""
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), FlakyRequestHandler)
+        self.failures = 0
+        self.requests = 0
+        self.delay = 0.0
+
+    def url(self, path: str = "/") -> str:
+        """Get the url the provided path is served at."""
+        return f"http://127.0.0.1:{self.server_port}{path}"
+
+
+class FlakyRequestHandler(BaseHTTPRequestHandler):
+    """Fail as many times as the server is configured to."""
+
+    server: FlakyServer
+
+    def do_GET(self) -> None:  # noqa: N802
+        """Respond with 503 until enough requests have failed."""
+        self.server.requests += 1
+        if self.server.delay:
+            threading.Event().wait(self.server.delay)
+        status = 503 if self.server.requests <= self.server.failures else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args) -> None:
+        """Silence request logging."""
+
+
+@pytest.fixture
+def server() -> Iterator[FlakyServer]:
+    """Run a flaky server for the duration of the test."""
+    server = FlakyServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def get_status(client: HTTPClient, url: str) -> int:
+    """Synchronously request the url, returning the status."""
+
+    async def run() -> int:
+        try:
+            async with client.stream("GET", url) as response:
+                return response.status_code
+        finally:
+            await client.aclose()
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize(("failures", "status"), [(0, 200), (2, 200), (3, 503)])
+def test_retries(server: FlakyServer, failures: int, status: int) -> None:
+    """Ensure temporary errors are retried a bounded amount of times."""
+    server.failures = failures
+    client = HTTPClient(HTTPSettings(retries=2, retry_backoff=0))
+
+    assert get_status(client, server.url()) == status
+    assert server.requests == min(failures + 1, 3)
+    assert client.retries == min(failures, 2)
+
+
+def test_host_limit(server: FlakyServer) -> None:
+    """Ensure no more than the configured amount of requests are made to one host at once."""
+    server.delay = 0.05
+    client = HTTPClient(HTTPSettings(max_connections_per_host=2))
+    peak = 0
+
+    async def request() -> None:
+        nonlocal peak
+        async with client.stream("GET", server.url()):
+            peak = max(peak, client.stats()["hosts"]["127.0.0.1"]["in_flight"])
+
+    async def run() -> dict:
+        try:
+            await asyncio.gather(*(request() for _ in range(6)))
+            return client.stats()
+        finally:
+            await client.aclose()
+
+    stats = asyncio.run(run())
+    assert peak == 2
+    assert stats["requests"] == 6
+    assert stats["connections"]["open"] <= 2
+    assert stats["hosts"]["127.0.0.1"] == {"in_flight": 0, "waiting": 0}
+
+
+def test_stats_without_pool(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Ensure the connections of the pool are reported as unknown if httpx no longer exposes it."""
+    client = HTTPClient(HTTPSettings())
+    monkeypatch.delattr(client._transport, "_pool")
+
+    stats = client.stats()
+    assert stats["connections"]["open"] is None
+    assert stats["connections"]["idle"] is None
+    assert stats["connections"]["active"] is None
+    assert stats["requests"] == 0
@@ -0,0 +1,23 @@
+import datetime
+import json
+
+from sage import responses
+from sage.enums import ProgrammingLanguage
+
+
+CONTENT = {
+    "name": "disnäke",
+    "programming_language": ProgrammingLanguage.python,
+    "refreshed_at": datetime.datetime(2022, 11, 20, 12, 30, tzinfo=datetime.timezone.utc),
+    "sources": [{"id": 1, "version": None, "preview": False}],
+}
+
+
+def test_render_json() -> None:
+    """Ensure enums and datetimes are rendered as FastAPI's encoder would render them."""
+    assert json.loads(responses.render_json(CONTENT)) == {
+        "name": "disnäke",
+        "programming_language": "python",
+        "refreshed_at": "2022-11-20T12:30:00+00:00",
+        "sources": [{"id": 1, "version": None, "preview": False}],
+    }